@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Cache of final answers for repeated questions
+Exact and MinHash near-duplicate matches on the normalized question, tagged
+with a catalog data version that any mutating tool call bumps
+
+    python3 answer_cache.py [--clear]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from strands.hooks import AfterToolCallEvent, BeforeInvocationEvent
+
+from intent_router import PET_TYPES
+from petstore_tools import GET_PET_BY_ID, LIST_PETS
+from tool_selection import SEARCH_TOOL
+
+DEFAULT_PATH = 'answer-cache.db'
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_AGE = 600
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 64
+BANDS = 16                  # 16 bands × 4 rows: candidates from ~0.5 Jaccard up
+MERSENNE = (1 << 61) - 1
+
+READ_ONLY_TOOLS = {LIST_PETS, GET_PET_BY_ID, 'list_pets', 'get_pet_by_id', 'get_pets_by_ids', SEARCH_TOOL}
+FILLER = {
+    'a', 'an', 'the', 'please', 'can', 'could', 'would', 'you', 'me', 'tell', 'show', 'what', 'which',
+    'do', 'does', 'is', 'are', 'there', 'have', 'has', 'got', 'any', 'some', 'i', 'we', 'us', 'your',
+    'of', 'for', 'to', 'right', 'now', 'currently', 'today', 'hi', 'hello', 'hey', 'thanks', 'thank',
+}
+# Words and phrases that point at an earlier turn; such questions have no context-free answer
+CONTEXTUAL = {'it', 'its', 'they', 'them', 'their', 'those', 'these', 'he', 'she', 'him', 'her', 'again',
+              'else', 'previous', 'above', 'that one', 'this one', 'the same', 'how about', 'what about'}
+# Requests to change data; the reply reports an action, not a reusable answer
+WRITE_INTENT = {'add', 'create', 'buy', 'purchase', 'adopt', 'order', 'register', 'reserve', 'sell',
+                'delete', 'remove', 'update', 'change', 'rename'}
+
+
+def words(question):
+    text = question.casefold().replace("n't", " not").replace("'s", "")
+    return re.findall(r'[a-z0-9]+(?:\.[0-9]+)?', text)
+
+
+def normalize(question):
+    """Canonical form of a question: lowercase content words, no punctuation"""
+    return " ".join(w for w in words(question) if w not in FILLER)
+
+
+def is_contextual(question):
+    tokens = words(question)
+    return any(w in CONTEXTUAL for w in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+
+def is_write_intent(question):
+    return any(w in WRITE_INTENT for w in words(question))
+
+
+def shingles(normalized):
+    """Word unigrams and bigrams of a normalized question"""
+    tokens = normalized.split()
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def key_terms(normalized):
+    """Numbers and pet types: near-duplicates must agree on these exactly"""
+    terms = set()
+    for w in normalized.split():
+        if w[0].isdigit():
+            terms.add(w)
+        elif w.rstrip('s') in PET_TYPES:
+            terms.add(w.rstrip('s'))
+    return terms
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    """MinHash signatures with NUM_PERM universal hash permutations"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, MERSENNE), rng.randrange(0, MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, items):
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big') for item in items]
+        if not hashes:
+            return (0,) * len(self.params)
+        return tuple(min((a * h + b) % MERSENNE for h in hashes) for a, b in self.params)
+
+    def bands(self, signature, bands=BANDS):
+        rows = len(signature) // bands
+        return [(i, signature[i * rows:(i + 1) * rows]) for i in range(bands)]
+
+
+class AnswerCache:
+    """Bounded, persistent question → answer cache with data-version invalidation"""
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE,
+                 threshold=DEFAULT_THRESHOLD, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.threshold = threshold
+        self._clock = clock
+        self._hasher = MinHasher()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()       # normalized -> (answer, version, created_at, seconds, shingles)
+        self._buckets = defaultdict(set)    # (band, rows) -> normalized questions
+        self._mutating = set()              # ids of agents whose current turn changed data
+        self._looked_up = set()             # ids of agents whose current turn read pet data
+
+        self.exact_hits = self.near_hits = self.misses = self.skipped = 0
+        self.stores = self.invalidations = self.evictions = 0
+        self.saved_seconds = 0.0
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                normalized TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                seconds REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.version = self._stored_version()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            path=config.get('answer_cache_path', DEFAULT_PATH),
+            max_entries=config.get('answer_cache_max_entries', DEFAULT_MAX_ENTRIES),
+            max_age=config.get('answer_cache_max_age_seconds', DEFAULT_MAX_AGE),
+            threshold=config.get('answer_cache_threshold', DEFAULT_THRESHOLD)
+        )
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _stored_version(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _sync_version(self):
+        """Adopt a version bumped by another process sharing the file"""
+        stored = self._stored_version()
+        if stored > self.version:
+            self.version = stored
+            self._entries.clear()
+            self._buckets.clear()
+            self.invalidations += 1
+
+    def _load(self):
+        oldest = self._clock() - self.max_age
+        self._db.execute("DELETE FROM answers WHERE version != ? OR created_at < ?", (self.version, oldest))
+        rows = self._db.execute(
+            "SELECT normalized, answer, version, created_at, seconds FROM answers ORDER BY used_at").fetchall()
+        for normalized, answer, version, created_at, seconds in rows:
+            self._index(normalized, (answer, version, created_at, seconds, shingles(normalized)))
+
+    def _index(self, normalized, entry):
+        self._entries[normalized] = entry
+        self._entries.move_to_end(normalized)
+        for band in self._hasher.bands(self._hasher.signature(entry[4])):
+            self._buckets[band].add(normalized)
+
+    def _drop(self, normalized):
+        entry = self._entries.pop(normalized)
+        for band in self._hasher.bands(self._hasher.signature(entry[4])):
+            self._buckets[band].discard(normalized)
+        self._db.execute("DELETE FROM answers WHERE normalized = ?", (normalized,))
+
+    def _fresh(self, entry):
+        return entry[1] == self.version and entry[2] >= self._clock() - self.max_age
+
+    def _find(self, normalized):
+        """(key, kind) of the best fresh match, or None"""
+        entry = self._entries.get(normalized)
+        if entry is not None:
+            return (normalized, 'exact') if self._fresh(entry) else None
+        wanted = shingles(normalized)
+        candidates = set()
+        for band in self._hasher.bands(self._hasher.signature(wanted)):
+            candidates |= self._buckets.get(band, set())
+        best, best_score = None, self.threshold
+        for key in candidates:
+            entry = self._entries[key]
+            if not self._fresh(entry) or key_terms(key) != key_terms(normalized):
+                continue
+            score = jaccard(wanted, entry[4])
+            if score >= best_score:
+                best, best_score = key, score
+        return (best, 'near') if best is not None else None
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+    def get(self, question, agent=None):
+        """Cached answer for ``question`` (or a near-duplicate), else None
+
+        With ``agent`` the cached turn is appended to its history, so
+        follow-up questions still have the context.
+        """
+        normalized = normalize(question)
+        if not normalized or is_contextual(question) or is_write_intent(question):
+            with self._lock:
+                self.skipped += 1
+            return None
+        with self._lock:
+            self._sync_version()
+            found = self._find(normalized)
+            if found is None:
+                self.misses += 1
+                return None
+            key, kind = found
+            answer, _, _, seconds, _ = self._entries[key]
+            self._entries.move_to_end(key)
+            self._db.execute("UPDATE answers SET used_at = ? WHERE normalized = ?", (self._clock(), key))
+            if kind == 'exact':
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+            self.saved_seconds += seconds
+        if agent is not None:
+            agent.messages.extend([
+                {"role": "user", "content": [{"text": question}]},
+                {"role": "assistant", "content": [{"text": answer}]},
+            ])
+        return answer
+
+    def put(self, question, answer, seconds=0.0, agent=None):
+        """Remember an answer unless the turn changed data, read none, or depends on earlier turns"""
+        if agent is not None and (id(agent) in self._mutating or id(agent) not in self._looked_up):
+            return False
+        normalized = normalize(question)
+        if not normalized or not answer or is_contextual(question) or is_write_intent(question):
+            return False
+        now = self._clock()
+        with self._lock:
+            self._sync_version()
+            if normalized in self._entries:
+                self._drop(normalized)
+            self._index(normalized, (answer, self.version, now, seconds, shingles(normalized)))
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers (normalized, question, answer, version, created_at, used_at, seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", (normalized, question, answer, self.version, now, now, seconds))
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def bump(self):
+        """The catalog changed: retire every cached answer"""
+        with self._lock:
+            self.version = max(self.version, self._stored_version()) + 1
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('data_version', ?)",
+                             (str(self.version),))
+            self._db.execute("DELETE FROM answers")
+            self._entries.clear()
+            self._buckets.clear()
+            self.invalidations += 1
+
+    def clear(self):
+        self.bump()
+
+    # ------------------------------------------------------------------
+    # Agent hooks: a mutating tool call bumps the version and marks the turn;
+    # a turn that never read pet data (a greeting, a refusal) is not cached
+    # ------------------------------------------------------------------
+    def attach(self, agent):
+        agent.hooks.add_callback(BeforeInvocationEvent, self._on_turn_start)
+        agent.hooks.add_callback(AfterToolCallEvent, self._on_tool_call)
+        return self
+
+    def _on_turn_start(self, event):
+        self._mutating.discard(id(event.agent))
+        self._looked_up.discard(id(event.agent))
+
+    def _on_tool_call(self, event):
+        name = event.tool_use['name']
+        if name != SEARCH_TOOL:
+            self._looked_up.add(id(event.agent))
+        if name not in READ_ONLY_TOOLS:
+            self._mutating.add(id(event.agent))
+            self.bump()
+
+    # ------------------------------------------------------------------
+    def stats(self):
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "data_version": self.version,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"💬 Answer cache: {s['exact_hits']} exact + {s['near_hits']} near hits / {s['misses']} misses "
+                f"({s['hit_rate']:.0%} hit rate, ~{s['saved_seconds']:.1f}s saved), {s['entries']} entries, "
+                f"data version {s['data_version']}")
+
+    def close(self):
+        self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the answer cache")
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--clear', action='store_true', help="drop every cached answer")
+    args = parser.parse_args()
+
+    try:
+        with open('deployment-config.json') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    cache = AnswerCache.from_config({**config, 'answer_cache_path': args.path})
+    if args.clear:
+        cache.clear()
+        print(f"🧹 Cleared {args.path}")
+    else:
+        print(f"💬 {len(cache._entries)} cached answers in {args.path} (data version {cache.version})")
+        for normalized, entry in reversed(cache._entries.items()):
+            print(f"   {normalized:<40} {entry[0][:60]!r}")
+    cache.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
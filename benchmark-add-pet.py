@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark: POST /pets id allocation as the table grows
+
+Compares the old allocator (scan every id, take the max, unconditional
+put) with the atomic counter in petstore_lambda.py, at several table
+sizes, then runs concurrent writers to count lost writes.
+
+By default it uses the in-process DynamoDB stand-in in local_dynamodb.py,
+which charges a round trip per request and reads scan pages of up to
+1 MB at a fixed throughput, so the numbers model latency rather than
+measure it. Point it at DynamoDB Local for real requests:
+
+    python3 benchmark-add-pet.py
+    python3 benchmark-add-pet.py --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from local_dynamodb import LocalTable
+from petstore_lambda import COUNTER_ID, IdAllocator, add_pet
+
+
+def scan_max_add_pet(table, name, pet_type, price):
+    """The previous allocator: full-table scan for the highest id, then put"""
+    existing_ids = []
+    kwargs = {'ProjectionExpression': 'id'}
+    while True:
+        response = table.scan(**kwargs)
+        existing_ids.extend(int(item['id']) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    next_id = max(existing_ids) + 1 if existing_ids else 1
+    pet = {'id': next_id, 'name': name, 'type': pet_type, 'price': Decimal(str(price))}
+    table.put_item(Item=pet)
+    return pet
+
+
+def seed_items(size):
+    items = [{'id': i, 'name': f"Pet {i}", 'type': 'dog', 'price': Decimal('19.99')} for i in range(1, size + 1)]
+    items.append({'id': COUNTER_ID, 'last_id': size})
+    return items
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+def local_backend(args):
+    def make_table(size):
+        table = LocalTable(rtt=args.rtt_ms / 1000)
+        table.load(seed_items(size))
+        return table
+    return make_table, lambda table: None
+
+
+def dynamodb_local_backend(args):
+    import boto3
+    resource = boto3.resource('dynamodb', endpoint_url=args.endpoint_url, region_name='us-east-1')
+    counter = iter(range(1, 10_000))
+
+    def make_table(size):
+        table = resource.create_table(
+            TableName=f"PetStoreBench{next(counter)}",
+            AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'N'}],
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table.wait_until_exists()
+        with table.batch_writer() as batch:
+            for item in seed_items(size):
+                batch.put_item(Item=item)
+        return table
+
+    return make_table, lambda table: table.delete()
+
+
+# ----------------------------------------------------------------------
+# Runs
+# ----------------------------------------------------------------------
+def time_adds(add, count):
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        add(f"Bench {i}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def latency_table(make_table, drop_table, sizes, adds):
+    print(f"\n📈 Sequential add latency ({adds} adds per size, ms)")
+    print(f"   {'table size':>10}  {'scan+max p50':>12}  {'p95':>7}  {'counter p50':>11}  {'p95':>7}  {'block10 p50':>11}")
+    for size in sizes:
+        row = []
+        for mode in ('scan', 'counter', 'block'):
+            table = make_table(size)
+            if mode == 'scan':
+                samples = time_adds(lambda name: scan_max_add_pet(table, name, 'frog', 20), adds)
+            else:
+                allocator = IdAllocator(table, block_size=10 if mode == 'block' else 1)
+                samples = time_adds(lambda name: add_pet(table, allocator, name, 'frog', 20), adds)
+            row.append(samples)
+            drop_table(table)
+        scan, counter, block = row
+        print(f"   {size:>10,}  {statistics.median(scan):>12.1f}  {percentile(scan, 0.95):>7.1f}  "
+              f"{statistics.median(counter):>11.1f}  {percentile(counter, 0.95):>7.1f}  "
+              f"{statistics.median(block):>11.1f}")
+
+
+def race(make_table, drop_table, size, threads, adds_per_thread):
+    print(f"\n🏁 Concurrent writers ({threads} threads × {adds_per_thread} adds, table of {size:,})")
+    total = threads * adds_per_thread
+    for label in ('scan+max', 'counter'):
+        table = make_table(size)
+        allocator = IdAllocator(table)
+
+        def writer(worker):
+            for i in range(adds_per_thread):
+                name = f"w{worker}-{i}"
+                if label == 'scan+max':
+                    scan_max_add_pet(table, name, 'frog', 20)
+                else:
+                    add_pet(table, allocator, name, 'frog', 20)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(writer, range(threads)))
+
+        names = [item.get('name', '') for item in _all_items(table)]
+        stored = sum(1 for name in names if name.startswith('w'))
+        lost = total - stored
+        print(f"   {label:<9} {stored}/{total} pets stored, {lost} overwritten by a duplicate id")
+        drop_table(table)
+
+
+def _all_items(table):
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='100,1000,10000,50000',
+                        help="comma-separated table sizes (default: 100,1000,10000,50000)")
+    parser.add_argument('--adds', type=int, default=30, help="adds per table size (default: 30)")
+    parser.add_argument('--rtt-ms', type=float, default=5.0,
+                        help="simulated round trip per request for the local stand-in (default: 5)")
+    parser.add_argument('--threads', type=int, default=8, help="concurrent writers (default: 8)")
+    parser.add_argument('--endpoint-url', help="use DynamoDB Local at this URL instead of the stand-in")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.endpoint_url:
+        print(f"🗄️  DynamoDB Local at {args.endpoint_url}")
+        make_table, drop_table = dynamodb_local_backend(args)
+    else:
+        print(f"🗄️  In-process stand-in: {args.rtt_ms:g} ms per request, 1 MB scan pages")
+        make_table, drop_table = local_backend(args)
+
+    latency_table(make_table, drop_table, sizes, args.adds)
+    race(make_table, drop_table, sizes[0], args.threads, 25)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the chat tool layer against an MCP gateway
+
+Drives the same tools the chat scripts give the agent (generated from
+tools/list by gateway_tools.py, plus the batch tool) at several
+concurrency levels and reports throughput and p50/p95/p99 latency per
+scenario. By default the gateway is the local emulator (gateway_emulator.py)
+with injected latency, so runs are reproducible; results are saved as
+JSON, tagged with the git commit, for comparison across commits.
+
+    python3 benchmark-gateway.py
+    python3 benchmark-gateway.py --concurrency 1,8,32 --latency-ms 40 --error-rate 0.01
+    python3 benchmark-gateway.py --compare benchmark-results/gateway-<commit>-<time>.json
+    python3 benchmark-gateway.py --url http://127.0.0.1:8765/mcp   # emulator in another process
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from gateway_client import DEFAULT_MAX_CONCURRENCY, GatewayClient
+from gateway_emulator import GatewayEmulator
+from gateway_tools import GatewayToolset
+from petstore_tools import ADD_PET, GET_PET_BY_ID, LIST_PETS, build_batch_tools
+from result_encoding import FORMATS, ResultEncoder
+from tool_cache import ToolResultCache
+
+RESULTS_DIR = 'benchmark-results'
+PET_TYPES = ['dog', 'cat', 'fish', 'bird', None]
+
+
+# ----------------------------------------------------------------------
+# Scenarios: each picks one (tool name, input) per request
+# ----------------------------------------------------------------------
+def get_pet(rng):
+    return GET_PET_BY_ID, {"petId": str(rng.randint(1, 15))}
+
+
+def list_pets(rng):
+    args = {"limit": "10"}
+    pet_type = rng.choice(PET_TYPES)
+    if pet_type:
+        args["type"] = pet_type
+    if rng.random() < 0.5:
+        args["max_price"] = str(rng.choice([50, 100, 200]))
+    return LIST_PETS, args
+
+
+def add_pet(rng):
+    return ADD_PET, {"name": f"Bench {rng.randint(1, 10 ** 6)}", "type": "frog", "price": 20}
+
+
+def mixed(rng):
+    roll = rng.random()
+    return get_pet(rng) if roll < 0.7 else list_pets(rng) if roll < 0.95 else add_pet(rng)
+
+
+def batch(rng):
+    return "get_pets_by_ids", {"pet_ids": rng.sample(range(1, 16), 5)}
+
+
+SCENARIOS = {"get": get_pet, "list": list_pets, "mixed": mixed, "batch": batch}
+
+
+# ----------------------------------------------------------------------
+# Runs
+# ----------------------------------------------------------------------
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def invoke(tool, tool_use_id, arguments):
+    """Run one agent tool the way Strands does; True if it reported success"""
+    event = None
+    async for event in tool.stream({"toolUseId": tool_use_id, "name": tool.tool_name, "input": arguments}, {}):
+        pass
+    return event["tool_result"]["status"] == "success"
+
+
+async def run_scenario(tools, pick, concurrency, total, seed):
+    rng = random.Random(seed)
+    requests = [pick(rng) for _ in range(total)]
+    next_request = iter(enumerate(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for i, (name, arguments) in next_request:
+            started = time.perf_counter()
+            try:
+                ok = await invoke(tools[name], f"bench-{i}", arguments)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(total / seconds, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def load_tools(mcp_client, cache_dir):
+    toolset = GatewayToolset(mcp_client, cache_dir=cache_dir, refresh_seconds=0)
+    tools = {tool.tool_name: tool for tool in toolset.load() + build_batch_tools(mcp_client)}
+    return toolset, tools
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(previous_path, results):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(r['scenario'], r['concurrency']): r for r in previous['results']}
+    print(f"\n🔍 Compared with {previous.get('commit') or previous_path}")
+    print(f"   {'scenario':<8} {'conc':>4}  {'rps':>14}  {'p50 ms':>14}  {'p95 ms':>14}")
+    for r in results:
+        old = before.get((r['scenario'], r['concurrency']))
+        if old is None:
+            continue
+        cells = [f"{old[key]:g}→{r[key]:g}" for key in ('throughput_rps', 'p50_ms', 'p95_ms')]
+        print(f"   {r['scenario']:<8} {r['concurrency']:>4}  {cells[0]:>14}  {cells[1]:>14}  {cells[2]:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--concurrency', default='1,8,32', help="comma-separated levels (default: 1,8,32)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario and level (default: 200)")
+    parser.add_argument('--url', help="benchmark this MCP endpoint instead of an in-process emulator")
+    parser.add_argument('--token', default='local', help="bearer token for --url (default: local)")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="emulator delay per call (default: 20)")
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help="emulator ± jitter (default: 5)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="emulator error rate (default: 0)")
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help=f"client in-flight request cap (default: {DEFAULT_MAX_CONCURRENCY})")
+    parser.add_argument('--cache', action='store_true', help="enable the tool result cache")
+    parser.add_argument('--format', choices=FORMATS, default='table', help="tool result format (default: table)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help=f"results file (default: {RESULTS_DIR}/gateway-<commit>-<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    levels = [int(level) for level in args.concurrency.split(',')]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    emulator = None
+    if args.url:
+        url = args.url
+        print(f"🌐 Gateway at {url}")
+    else:
+        emulator = GatewayEmulator(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                   error_rate=args.error_rate, token=args.token, seed=args.seed)
+        url = emulator.start()
+        print(f"🧪 Emulator: {args.latency_ms:g}±{args.jitter_ms:g} ms per call, {args.error_rate:.0%} errors")
+
+    mcp_client = GatewayClient(url, access_token=args.token, max_concurrency=args.max_concurrency,
+                               cache=ToolResultCache() if args.cache else None,
+                               encoder=ResultEncoder(fmt=args.format))
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        toolset, tools = load_tools(mcp_client, cache_dir)
+        print(f"   {len(tools)} tools, client cap {args.max_concurrency} in flight, "
+              f"cache {'on' if args.cache else 'off'}, {args.format} results\n")
+        print(f"   {'scenario':<8} {'conc':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for scenario, concurrency in itertools.product(scenarios, levels):
+            if mcp_client.cache is not None:
+                mcp_client.cache.clear()
+            r = asyncio.run(run_scenario(tools, SCENARIOS[scenario], concurrency, args.requests, args.seed))
+            r = {"scenario": scenario, "concurrency": concurrency, **r}
+            results.append(r)
+            print(f"   {scenario:<8} {concurrency:>4} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} "
+                  f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}")
+        toolset.close()
+    mcp_client.close()
+    if emulator is not None:
+        emulator.stop()
+
+    commit, dirty = git_commit()
+    report = {
+        "benchmark": "gateway",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "settings": {
+            "url": args.url or "emulator",
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "requests": args.requests,
+            "max_concurrency": args.max_concurrency,
+            "cache": args.cache,
+            "format": args.format,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"gateway-{commit or 'nogit'}{'-dirty' if dirty else ''}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Load test: serve-chat.py against the previous single-threaded server
+
+Starts both servers as subprocesses on free ports and hits the chat page
+from concurrent keep-alive clients sending browser-like headers, once as
+a first load and once as a revalidation (If-None-Match/If-Modified-Since
+from the first response). Then a client that sends half a request and
+stalls is left connected while another client asks for the page.
+
+    python3 benchmark-serve-chat.py
+    python3 benchmark-serve-chat.py --requests 5000 --concurrency 32
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+PAGE = '/web-chat-with-memory.html'
+
+# What serve-chat.py used to be
+LEGACY_SERVER = """
+import http.server, socketserver, sys
+class Handler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=sys.argv[2], **kwargs)
+    def log_message(self, *args):
+        pass
+with socketserver.TCPServer(("127.0.0.1", int(sys.argv[1])), Handler) as httpd:
+    httpd.serve_forever()
+"""
+
+BROWSER_HEADERS = {'Accept-Encoding': 'gzip, deflate, br', 'Accept': 'text/html'}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start(kind):
+    port = free_port()
+    if kind == 'legacy':
+        command = [sys.executable, '-c', LEGACY_SERVER, str(port), DIRECTORY]
+    else:
+        command = [sys.executable, os.path.join(DIRECTORY, 'serve-chat.py'), '--host', '127.0.0.1',
+                   '--port', str(port), '--quiet', '--no-api']
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+def fetch(connection, headers):
+    connection.request('GET', PAGE, headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    return response.status, len(body), response
+
+
+def validators(port):
+    """Headers a browser would send when revalidating the page"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    _, _, response = fetch(connection, BROWSER_HEADERS)
+    connection.close()
+    headers = dict(BROWSER_HEADERS)
+    if response.getheader('ETag'):
+        headers['If-None-Match'] = response.getheader('ETag')
+    if response.getheader('Last-Modified'):
+        headers['If-Modified-Since'] = response.getheader('Last-Modified')
+    return headers
+
+
+def load(port, headers, total, concurrency):
+    """Returns (requests/s, p50 ms, p95 ms, mean bytes per response, status counts)"""
+    counter = iter(range(total))
+    latencies, sizes, statuses = [], [], {}
+    lock = threading.Lock()
+
+    def client(_):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        for _ in counter:
+            started = time.perf_counter()
+            status, size, _ = fetch(connection, headers)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                sizes.append(size)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return (total / seconds, statistics.median(latencies), latencies[int(len(latencies) * 0.95)],
+            statistics.mean(sizes), statuses)
+
+
+def stalled_client(port, timeout):
+    """Time a normal request while another connection has sent only half a request"""
+    stalled = socket.create_connection(('127.0.0.1', port))
+    stalled.sendall(b"GET " + PAGE.encode() + b" HTTP/1.1\r\nHost: localhost\r\n")
+    time.sleep(0.1)
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        started = time.perf_counter()
+        fetch(connection, BROWSER_HEADERS)
+        connection.close()
+        return f"{(time.perf_counter() - started) * 1000:.1f} ms"
+    except OSError:
+        return f"blocked (no answer within {timeout:g}s)"
+    finally:
+        stalled.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000, help="requests per run (default: 2000)")
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent clients (default: 16)")
+    parser.add_argument('--stall-timeout', type=float, default=3.0,
+                        help="how long the stalled-client probe waits (default: 3s)")
+    args = parser.parse_args()
+
+    print(f"🏋️  {args.requests} requests for {PAGE}, {args.concurrency} concurrent keep-alive clients\n")
+    print(f"   {'server':<8} {'request':<11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>7}  status")
+    for kind in ('legacy', 'threaded'):
+        process, port = start(kind)
+        try:
+            runs = [('first load', BROWSER_HEADERS), ('revalidate', validators(port))]
+            for label, headers in runs:
+                rps, p50, p95, size, statuses = load(port, headers, args.requests, args.concurrency)
+                codes = ' '.join(f"{code}×{count}" for code, count in sorted(statuses.items()))
+                print(f"   {kind:<8} {label:<11} {rps:>8.0f} {p50:>8.2f} {p95:>8.2f} {size:>7.0f}  {codes}")
+            print(f"   {kind:<8} {'stalled client present':<32} → page in {stalled_client(port, args.stall_timeout)}")
+        finally:
+            process.kill()
+            process.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
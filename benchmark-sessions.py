@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per chat session in the session pool
+
+Builds sessions the way serve-chat.py does (one Agent per session over
+shared tools and model client, see chat_service.py) with a conversation of
+``--turns`` realistic turns each: a question, a ListPets tool call against
+the local gateway emulator, its encoded result and an answer. Measures the
+memory a live session holds and what is left once it is spilled
+(session_pool.py), and how many sessions of each kind fit in 1 GiB.
+No AWS calls are made.
+
+    python3 benchmark-sessions.py
+    python3 benchmark-sessions.py --sessions 500 --turns 20
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import tracemalloc
+
+from strands.models import BedrockModel
+
+from chat_service import ChatService
+from gateway_client import GatewayClient
+from gateway_emulator import GatewayEmulator
+from gateway_tools import GatewayToolset
+from petstore_tools import LIST_PETS, build_batch_tools, format_result
+from result_encoding import ResultEncoder
+
+GIB = 1024 ** 3
+ANSWER = ("Here is what I found, cheapest first: {names}. Prices start at ${price}. "
+          "Would you like more details on any of them, or should I look for another type?")
+
+
+def tool_results(mcp_client, count):
+    """Distinct encoded ListPets results, as the agent would have read them"""
+    results = []
+    for i in range(count):
+        arguments = {"limit": str(5 + i % 10), "max_price": str(50 + 25 * i)}
+        result = mcp_client.call_tool_sync(LIST_PETS, arguments)
+        pets = json.loads(result['result']['content'][0]['text'])['pets']
+        results.append((arguments, format_result(result, mcp_client.encoder, LIST_PETS), pets))
+    return results
+
+
+def conversation(session, turns, results):
+    """Strands message history for ``turns`` question → tool call → answer turns"""
+    messages = []
+    for turn in range(turns):
+        arguments, text, pets = results[(session + turn) % len(results)]
+        tool_use_id = f"tooluse_{session:04d}{turn:04d}"
+        messages += [
+            {"role": "user", "content": [{"text": f"What pets do you have under ${arguments['max_price']}?"}]},
+            {"role": "assistant", "content": [
+                {"text": "Let me check the catalog."},
+                {"toolUse": {"toolUseId": tool_use_id, "name": LIST_PETS, "input": arguments}}]},
+            {"role": "user", "content": [
+                {"toolResult": {"toolUseId": tool_use_id, "status": "success", "content": [{"text": text}]}}]},
+            {"role": "assistant", "content": [{"text": ANSWER.format(
+                names=", ".join(p['name'] for p in pets) or "nothing", price=pets[0]['price'] if pets else 0)}]},
+        ]
+    return messages
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sessions', type=int, default=200, help="sessions to build (default: 200)")
+    parser.add_argument('--turns', type=int, default=10, help="turns of history per session (default: 10)")
+    parser.add_argument('--spill-dir', help="spill to files here instead of memory")
+    args = parser.parse_args()
+
+    emulator = GatewayEmulator(token='local')
+    mcp_client = GatewayClient(emulator.start(), access_token='local', encoder=ResultEncoder())
+    with tempfile.TemporaryDirectory() as cache_dir:
+        toolset = GatewayToolset(mcp_client, cache_dir=cache_dir, refresh_seconds=0)
+        batch_tools = build_batch_tools(mcp_client)
+        tools = toolset.load() + batch_tools
+        results = tool_results(mcp_client, 12)
+
+        service = ChatService(mcp_client, batch_tools, model=BedrockModel(region_name='us-east-1'),
+                              max_live=args.sessions, spill_dir=args.spill_dir, toolset=toolset)
+        service._new_session("warm-up", None, None)   # import-time and first-use allocations
+
+        mean_result = sum(len(text) for _, text, _ in results) / len(results)
+        print(f"🧪 {args.sessions} sessions × {args.turns} turns "
+              f"(tool results ~{mean_result:.0f} chars; shared: {len(tools)} tools, 1 gateway client)\n")
+        tracemalloc.start()
+        empty_start = traced_bytes()
+        empty = [service._new_session(f"empty-{i}", None, None) for i in range(args.sessions)]
+        per_empty = (traced_bytes() - empty_start) / args.sessions
+        del empty
+
+        start = traced_bytes()
+        for i in range(args.sessions):
+            with service.pool.checkout(f"session-{i}") as session:
+                session.agent.messages = conversation(i, args.turns, results)
+        per_live = (traced_bytes() - start) / args.sessions
+
+        service.pool.spill_all()
+        per_spilled = (traced_bytes() - start) / args.sessions
+        tracemalloc.stop()
+
+        stats = service.pool.stats()
+        print(f"   {'':<28} {'per session':>12} {'sessions/GiB':>14}")
+        for label, size in (("live, no history", per_empty),
+                            (f"live, {args.turns} turns", per_live),
+                            (f"spilled, {args.turns} turns", per_spilled)):
+            per_gib = f"{GIB / size:,.0f}" if size > 64 else "(on disk)"
+            print(f"   {label:<28} {size / 1024:>9.1f} KB {per_gib:>14}")
+        spilled_each = stats['spilled_bytes'] / max(stats['spilled'], 1)
+        print(f"\n   history as JSON in the Agent ≈ {(per_live - per_empty) / 1024:.1f} KB, "
+              f"compressed when spilled: {spilled_each / 1024:.1f} KB "
+              f"({'on disk' if args.spill_dir else 'in memory'})")
+        print(f"   pool: {stats['live']} live, {stats['spilled']} spilled, {stats['spills']} spills")
+        toolset.close()
+    mcp_client.close()
+    emulator.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Server-side chat sessions for the web page (used by serve-chat.py)
+Every session shares one GatewayClient (connection pool, token manager,
+result cache), one set of tools and one model client; each browser
+session only adds its own Agent and conversation, kept in a SessionPool
+(session_pool.py) that spills idle sessions to compact serialized state.
+Session agents are built like the one in interactive-chat.py: a
+token-budgeted history (context_budget.py), per-turn tool selection
+(tool_selection.py) and tools kept current by the toolset's watcher.
+"""
+
+import asyncio
+import threading
+import time
+
+from strands import Agent
+from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+from strands.models import BedrockModel
+
+from answer_cache import AnswerCache
+from context_budget import RollingSummaryManager
+from gateway_client import GatewayClient
+from gateway_tools import GatewayToolset
+from intent_router import IntentRouter
+from petstore_tools import SYSTEM_PROMPT, build_batch_tools
+from session_pool import DEFAULT_IDLE_SECONDS, DEFAULT_MAX_LIVE, SessionBusy, SessionPool
+from tool_selection import ToolSelector
+
+
+class ChatSession:
+    """One conversation: an Agent plus the stream it is currently answering into"""
+
+    def __init__(self, session_id, agent):
+        self.session_id = session_id
+        self.agent = agent
+        self._emit = None
+        self._tool_started = {}
+        agent.hooks.add_callback(BeforeToolCallEvent, self._on_tool_start)
+        agent.hooks.add_callback(AfterToolCallEvent, self._on_tool_end)
+
+    def _on_tool_start(self, event):
+        self._tool_started[event.tool_use['toolUseId']] = time.perf_counter()
+        if self._emit is not None:
+            self._emit('tool', {"name": event.tool_use['name'], "status": "running"})
+
+    def _on_tool_end(self, event):
+        started = self._tool_started.pop(event.tool_use['toolUseId'], None)
+        if self._emit is not None:
+            self._emit('tool', {
+                "name": event.tool_use['name'],
+                "status": event.result.get('status', 'success'),
+                "ms": round((time.perf_counter() - started) * 1000) if started is not None else None,
+            })
+
+    async def stream(self, message, emit):
+        """Answer ``message``, calling ``emit(event, data)`` for each text delta and tool call
+
+        Returns the full answer with first-token and total timings. Only
+        call it on a session checked out of the pool; one agent cannot run
+        two turns at once.
+        """
+        self._emit = emit
+        started = time.perf_counter()
+        first_token = None
+        result = None
+        try:
+            async for event in self.agent.stream_async(message):
+                if 'data' in event:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    emit('token', {"text": event['data']})
+                elif 'result' in event:
+                    result = event['result']
+        finally:
+            self._emit = None
+        return {
+            "answer": str(result) if result is not None else "",
+            "ttft_ms": round((first_token - started) * 1000) if first_token is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+
+class ChatService:
+    """Agents per session id over shared tools, in a bounded SessionPool
+
+    With a ``toolset`` its tools are watched for schema changes and
+    ``tools`` only needs the extra (hand-written) ones. ``config`` supplies
+    the context budget and tool selection settings of each session.
+    """
+
+    def __init__(self, mcp_client, tools, model=None, max_live=DEFAULT_MAX_LIVE,
+                 idle_seconds=DEFAULT_IDLE_SECONDS, spill_dir=None, router=None, answers=None,
+                 toolset=None, config=None):
+        self.mcp_client = mcp_client
+        self.router = router
+        self.answers = answers
+        self.tools = tools
+        self.toolset = toolset
+        self.config = config or {}
+        self.model = model if model is not None else BedrockModel()
+        self.pool = SessionPool(self._new_session, max_live=max_live, idle_seconds=idle_seconds,
+                                spill_dir=spill_dir)
+        self._lock = threading.Lock()
+        self.turns = 0
+
+    @classmethod
+    def from_config(cls, config):
+        mcp_client = GatewayClient.from_config(config)
+        toolset = GatewayToolset.from_config(mcp_client, config)
+        toolset.load()
+        return cls(
+            mcp_client,
+            build_batch_tools(mcp_client),
+            max_live=config.get('chat_max_live_sessions', DEFAULT_MAX_LIVE),
+            idle_seconds=config.get('chat_idle_seconds', DEFAULT_IDLE_SECONDS),
+            spill_dir=config.get('chat_spill_dir'),
+            router=IntentRouter.from_config(mcp_client, config),
+            answers=AnswerCache.from_config(config),
+            toolset=toolset,
+            config=config
+        )
+
+    def catalog(self):
+        """Every tool a session may be offered (the gateway's current ones plus ``tools``)"""
+        if self.toolset is None:
+            return list(self.tools)
+        return list(self.toolset.tools.values()) + self.tools
+
+    def _new_session(self, session_id, messages, state):
+        # The summary lives in the messages, so a restored session resumes its budget too
+        agent = Agent(
+            name="PetStoreAssistant",
+            model=self.model,
+            system_prompt=SYSTEM_PROMPT,
+            tools=self.catalog(),
+            messages=messages,
+            state=state,
+            conversation_manager=RollingSummaryManager.from_config(self.config),
+            callback_handler=None
+        )
+        if self.toolset is not None:
+            self.toolset.watch(agent)
+        ToolSelector.from_config(self.catalog, self.mcp_client, self.config).attach(agent)
+        if self.answers is not None:
+            self.answers.attach(agent)
+        return ChatSession(session_id, agent)
+
+    async def chat(self, session_id, message, emit):
+        """Run one turn for ``session_id``; raises SessionBusy if one is already running"""
+        with self.pool.checkout(session_id) as session:
+            started = time.perf_counter()
+            text = None
+            shortcut = "fast_path"
+            if self.router is not None:
+                text = await asyncio.to_thread(self.router.answer, message, session.agent)
+            if text is None and self.answers is not None:
+                text, shortcut = self.answers.get(message, session.agent), "cached"
+            if text is not None:
+                emit('token', {"text": text})
+                millis = round((time.perf_counter() - started) * 1000)
+                reply = {"answer": text, "ttft_ms": millis, "total_ms": millis, shortcut: True}
+            else:
+                reply = await session.stream(message, emit)
+                seconds = time.perf_counter() - started
+                if self.router is not None:
+                    self.router.record_agent_turn(seconds)
+                if self.answers is not None:
+                    self.answers.put(message, reply['answer'], seconds, session.agent)
+        with self._lock:
+            self.turns += 1
+        return reply
+
+    def stats(self):
+        stats = {"turns": self.turns, **self.pool.stats()}
+        if self.router is not None:
+            stats["fast_path"] = self.router.stats()
+        if self.answers is not None:
+            stats["answer_cache"] = self.answers.stats()
+        return stats
+
+    def close(self):
+        if self.pool.spill_dir:
+            self.pool.spill_all()
+        if self.answers is not None:
+            self.answers.close()
+        if self.toolset is not None:
+            self.toolset.close()
+        self.mcp_client.close()
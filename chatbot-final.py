@@ -5,97 +5,34 @@ Demonstrates MCP protocol with Strands Agent framework
 """
 
 import json
+import time
 from strands import Agent
-from strands.tools import tool
-import httpx
+
+from answer_cache import AnswerCache
+from gateway_client import GatewayClient
+from gateway_tools import GatewayToolset
+from petstore_tools import SYSTEM_PROMPT, build_batch_tools
 
 # Load config
 with open('deployment-config.json') as f:
     config = json.load(f)
 
-with open('access-token.txt') as f:
-    access_token = f.read().strip()
-
-# Create MCP client
-mcp_client = httpx.Client(
-    base_url=config['gateway_url'],
-    headers={
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    },
-    timeout=30.0
-)
-
-@tool
-def list_pets() -> str:
-    """List all available pets in the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___ListPets",
-            "arguments": {}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-@tool
-def get_pet_by_id(pet_id: int) -> str:
-    """Get details of a specific pet by ID"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___GetPetById",
-            "arguments": {"petId": str(pet_id)}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
+# Create MCP client (shared async connection pool, see gateway_client.py)
+mcp_client = GatewayClient.from_config(config)
 
-@tool
-def add_pet(name: str, pet_type: str, price: float) -> str:
-    """Add a new pet to the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___AddPet",
-            "arguments": {
-                "name": name,
-                "type": pet_type,
-                "price": price
-            }
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
+# Tools are generated from the gateway's tools/list schema (cached on disk)
+toolset = GatewayToolset.from_config(mcp_client, config)
 
 # Create agent
 agent = Agent(
     name="PetStoreAssistant",
-    system_prompt="""You are a helpful pet store assistant. You can help customers:
-    - Browse available pets
-    - Get details about specific pets
-    - Add new pets to the store
-    - Answer questions about pets
-    
-    Always be friendly and helpful!""",
-    tools=[list_pets, get_pet_by_id, add_pet]
+    system_prompt=SYSTEM_PROMPT,
+    tools=toolset.load() + build_batch_tools(mcp_client)
 )
+toolset.watch(agent)
+
+# Answers to repeated questions are reused until the catalog changes (see answer_cache.py)
+answers = AnswerCache.from_config(config).attach(agent)
 
 print("=" * 80)
 print("🤖 AI Pet Store Assistant (AgentCore Gateway + API Gateway)")
@@ -121,7 +58,13 @@ print("\n🧪 Running test queries...\n")
 for i, query in enumerate(test_queries, 1):
     print(f"\n[Query {i}] {query}")
     print("-" * 80)
-    response = agent(query)
+    started = time.perf_counter()
+    response = answers.get(query, agent)
+    if response is None:
+        response = agent(query)
+        answers.put(query, str(response), time.perf_counter() - started, agent)
+    else:
+        print(f"💬 Cached answer ({(time.perf_counter() - started) * 1000:.0f} ms)")
     print(response)
     print()
 
@@ -129,4 +72,9 @@ print("=" * 80)
 print("✅ Demo complete! All components working together.")
 print("=" * 80)
 
+print(mcp_client.cache.format_stats())
+print(mcp_client.encoder.format_stats())
+print(answers.format_stats())
+answers.close()
+toolset.close()
 mcp_client.close()
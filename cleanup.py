@@ -1,12 +1,27 @@
 #!/usr/bin/env python3
 """
 Cleanup Script - Deletes all deployed resources
+
+Independent resources are deleted in parallel; deletion is only polled
+where something depends on it (gateway targets before the gateway, the
+gateway before its IAM role, the Lambda function before its role).
+
+Usage:
+    python3 cleanup.py          # asks for confirmation
+    python3 cleanup.py --yes    # no prompt (CI / test stacks)
 """
 
+import argparse
 import boto3
 import json
+import os
 import sys
-import time
+
+from botocore.exceptions import ClientError
+
+from task_graph import TaskFailed, TaskGraph, log, wait_until
+
+NOT_FOUND_CODES = {'NoSuchEntity', 'NotFoundException', 'ResourceNotFoundException'}
 
 # Load deployment config
 try:
@@ -21,118 +36,184 @@ apigw = boto3.client('apigateway', region_name=config['region'])
 cognito = boto3.client('cognito-idp', region_name=config['region'])
 lambda_client = boto3.client('lambda', region_name=config['region'])
 agentcore = boto3.client('bedrock-agentcore-control', region_name=config['region'])
+dynamodb = boto3.client('dynamodb', region_name=config['region'])
+
+
+def delete(call, **kwargs):
+    """Run a delete call; returns False if the resource was already gone"""
+    try:
+        call(**kwargs)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in NOT_FOUND_CODES:
+            return False
+        raise
 
-print("=" * 70)
-print("🧹 Cleaning Up AgentCore Gateway Deployment")
-print("=" * 70)
-print("\n⚠️  This will delete ALL deployed resources!")
-confirm = input("Type 'DELETE' to confirm: ")
 
-if confirm != 'DELETE':
-    print("❌ Cleanup cancelled")
-    sys.exit(0)
+def is_gone(call, **kwargs):
+    """True once a describe/get call reports the resource as not found"""
+    try:
+        call(**kwargs)
+        return False
+    except ClientError as e:
+        if e.response['Error']['Code'] in NOT_FOUND_CODES:
+            return True
+        raise
+
 
 # ============================================================================
-# Delete Gateway Target
+# Delete steps
 # ============================================================================
-print("\n[1/7] Deleting Gateway Target...")
-try:
-    agentcore.delete_gateway_target(
-        gatewayIdentifier=config['gateway_id'],
-        targetId=config['target_id']
+def delete_targets(ctx):
+    """Delete every target on the gateway and wait until they are gone"""
+    gateway_id = config['gateway_id']
+    try:
+        targets = agentcore.list_gateway_targets(gatewayIdentifier=gateway_id, maxResults=100)['items']
+    except ClientError as e:
+        if e.response['Error']['Code'] in NOT_FOUND_CODES:
+            log('targets', "ℹ️  Gateway already deleted")
+            return
+        raise
+
+    for target in targets:
+        delete(agentcore.delete_gateway_target, gatewayIdentifier=gateway_id, targetId=target['targetId'])
+    for target in targets:
+        wait_until(
+            lambda: is_gone(agentcore.get_gateway_target, gatewayIdentifier=gateway_id, targetId=target['targetId']),
+            timeout=300, base=0.5, cap=5.0, description=f"target {target['targetId']} deletion"
+        )
+        log('targets', f"✅ Target deleted: {target['targetId']}")
+
+
+def delete_gateway(ctx):
+    gateway_id = config['gateway_id']
+    if not delete(agentcore.delete_gateway, gatewayIdentifier=gateway_id):
+        log('gateway', f"ℹ️  Gateway already deleted: {gateway_id}")
+        return
+    # The gateway role must outlive the gateway
+    wait_until(
+        lambda: is_gone(agentcore.get_gateway, gatewayIdentifier=gateway_id),
+        timeout=300, base=0.5, cap=5.0, description="gateway deletion"
     )
-    print(f"   ✅ Target deleted: {config['target_id']}")
-    time.sleep(5)
-except Exception as e:
-    print(f"   ⚠️  Error: {e}")
+    log('gateway', f"✅ Gateway deleted: {gateway_id}")
 
-# ============================================================================
-# Delete Gateway
-# ============================================================================
-print("\n[2/7] Deleting AgentCore Gateway...")
-try:
-    agentcore.delete_gateway(gatewayIdentifier=config['gateway_id'])
-    print(f"   ✅ Gateway deleted: {config['gateway_id']}")
-    time.sleep(5)
-except Exception as e:
-    print(f"   ⚠️  Error: {e}")
 
-# ============================================================================
-# Delete API Gateway
-# ============================================================================
-print("\n[3/7] Deleting API Gateway...")
-try:
-    apigw.delete_rest_api(restApiId=config['api_gateway_id'])
-    print(f"   ✅ API Gateway deleted: {config['api_gateway_id']}")
-except Exception as e:
-    print(f"   ⚠️  Error: {e}")
+def delete_gateway_role(ctx):
+    delete(iam.delete_role_policy, RoleName='AgentCoreGatewayRole', PolicyName='APIGatewayAccess')
+    if delete(iam.delete_role, RoleName='AgentCoreGatewayRole'):
+        log('gateway_role', "✅ Gateway role deleted")
+    else:
+        log('gateway_role', "ℹ️  Gateway role already deleted")
 
-# ============================================================================
-# Delete Lambda Function
-# ============================================================================
-print("\n[4/7] Deleting Lambda Function...")
-try:
-    lambda_client.delete_function(FunctionName=config['lambda_function_name'])
-    print(f"   ✅ Lambda deleted: {config['lambda_function_name']}")
-except Exception as e:
-    print(f"   ⚠️  Error: {e}")
 
-# ============================================================================
-# Delete IAM Roles
-# ============================================================================
-print("\n[5/7] Deleting IAM Roles...")
+def delete_api(ctx):
+    if delete(apigw.delete_rest_api, restApiId=config['api_gateway_id']):
+        log('api', f"✅ API Gateway deleted: {config['api_gateway_id']}")
+    else:
+        log('api', f"ℹ️  API Gateway already deleted: {config['api_gateway_id']}")
 
-# Delete Gateway Role
-try:
-    iam.delete_role_policy(
-        RoleName='AgentCoreGatewayRole',
-        PolicyName='APIGatewayAccess'
-    )
-    iam.delete_role(RoleName='AgentCoreGatewayRole')
-    print(f"   ✅ Gateway role deleted")
-except Exception as e:
-    print(f"   ⚠️  Gateway role error: {e}")
 
-# Delete Lambda Role
-try:
-    iam.detach_role_policy(
-        RoleName='PetStoreLambdaRole',
-        PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
-    )
-    iam.delete_role(RoleName='PetStoreLambdaRole')
-    print(f"   ✅ Lambda role deleted")
-except Exception as e:
-    print(f"   ⚠️  Lambda role error: {e}")
+def delete_lambda(ctx):
+    if delete(lambda_client.delete_function, FunctionName=config['lambda_function_name']):
+        log('lambda', f"✅ Lambda deleted: {config['lambda_function_name']}")
+    else:
+        log('lambda', f"ℹ️  Lambda already deleted: {config['lambda_function_name']}")
 
-# ============================================================================
-# Delete Cognito User Pool
-# ============================================================================
-print("\n[6/7] Deleting Cognito User Pool...")
-try:
-    cognito.delete_user_pool(UserPoolId=config['user_pool_id'])
-    print(f"   ✅ User pool deleted: {config['user_pool_id']}")
-except Exception as e:
-    print(f"   ⚠️  Error: {e}")
 
-# ============================================================================
-# Delete Config Files
-# ============================================================================
-print("\n[7/7] Deleting Config Files...")
-import os
-try:
-    os.remove('deployment-config.json')
-    print(f"   ✅ Deleted: deployment-config.json")
-except:
-    pass
+def delete_table(ctx):
+    table_name = config.get('table_name', 'PetStore')
+    if delete(dynamodb.delete_table, TableName=table_name):
+        log('table', f"✅ DynamoDB table deleted: {table_name}")
+    else:
+        log('table', f"ℹ️  DynamoDB table already deleted: {table_name}")
 
-try:
-    os.remove('jwt-token.txt')
-    print(f"   ✅ Deleted: jwt-token.txt")
-except:
-    pass
-
-print("\n" + "=" * 70)
-print("✅ CLEANUP COMPLETE!")
-print("=" * 70)
-print("\nAll resources have been deleted from your AWS account.")
-print("=" * 70)
+
+def delete_lambda_role(ctx):
+    delete(iam.delete_role_policy, RoleName='PetStoreLambdaRole', PolicyName='DynamoDBAccess')
+    delete(
+        iam.detach_role_policy,
+        RoleName='PetStoreLambdaRole',
+        PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+    )
+    if delete(iam.delete_role, RoleName='PetStoreLambdaRole'):
+        log('lambda_role', "✅ Lambda role deleted")
+    else:
+        log('lambda_role', "ℹ️  Lambda role already deleted")
+
+
+def delete_user_pool(ctx):
+    if delete(cognito.delete_user_pool, UserPoolId=config['user_pool_id']):
+        log('cognito', f"✅ User pool deleted: {config['user_pool_id']}")
+    else:
+        log('cognito', f"ℹ️  User pool already deleted: {config['user_pool_id']}")
+
+
+def build_graph(keep_data=False):
+    """Teardown steps and what has to be gone before each one"""
+    graph = TaskGraph()
+    graph.add('targets', delete_targets)
+    graph.add('gateway', delete_gateway, deps=['targets'])
+    graph.add('gateway_role', delete_gateway_role, deps=['gateway'])
+    graph.add('api', delete_api)
+    graph.add('lambda', delete_lambda)
+    graph.add('lambda_role', delete_lambda_role, deps=['lambda'])
+    if not keep_data:
+        graph.add('table', delete_table)
+    graph.add('cognito', delete_user_pool)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete the deployed Pet Store stack")
+    parser.add_argument('--yes', action='store_true', help="skip the confirmation prompt")
+    parser.add_argument('--keep-data', action='store_true', help="keep the DynamoDB table and its pets")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧹 Cleaning Up AgentCore Gateway Deployment")
+    print("=" * 70)
+    if not args.yes:
+        print("\n⚠️  This will delete ALL deployed resources!")
+        if args.keep_data:
+            print("   The DynamoDB table is kept (--keep-data)")
+        else:
+            table_name = config.get('table_name', 'PetStore')
+            print(f"   This includes the DynamoDB table '{table_name}': every pet stored in it is lost")
+            print("   (re-run with --keep-data to keep it)")
+        confirm = input("Type 'DELETE' to confirm: ")
+
+        if confirm != 'DELETE':
+            print("❌ Cleanup cancelled")
+            sys.exit(0)
+
+    graph = build_graph(args.keep_data)
+    print(f"\nDeleting {len(graph.tasks)} resources (independent ones in parallel)...\n")
+    try:
+        graph.run()
+    except TaskFailed as e:
+        graph.report("Teardown timing")
+        print(f"\n❌ Cleanup incomplete: {e}")
+        print("   deployment-config.json was kept so cleanup can be re-run")
+        sys.exit(1)
+    graph.report("Teardown timing")
+
+    # ========================================================================
+    # Delete Config Files
+    # ========================================================================
+    print("\nDeleting Config Files...")
+    for path in ('deployment-config.json', 'jwt-token.txt', 'access-token.txt', 'refresh-token.txt'):
+        try:
+            os.remove(path)
+            print(f"   ✅ Deleted: {path}")
+        except FileNotFoundError:
+            pass
+
+    print("\n" + "=" * 70)
+    print("✅ CLEANUP COMPLETE!")
+    print("=" * 70)
+    print("\nAll resources have been deleted from your AWS account.")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
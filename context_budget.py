@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Bounded conversation context for the chat agents
+RollingSummaryManager is a Strands conversation manager that keeps the
+prompt inside a token budget instead of letting the history grow every
+turn:
+
+  - the last ``keep_turns`` turns are sent verbatim;
+  - tool results in older turns are replaced by short stubs (the agent
+    can call the tool again if it needs the data);
+  - when the history is still over ``max_tokens``, the oldest turns are
+    folded into a rolling summary, updated incrementally from the previous
+    summary plus the turns being dropped.
+
+The summary travels as the first text block of the oldest kept user
+message, so it is saved and restored with the messages themselves.
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from strands.agent.conversation_manager import ConversationManager
+from strands.hooks import BeforeInvocationEvent, BeforeModelCallEvent
+from strands.types.exceptions import ContextWindowOverflowException
+
+from result_encoding import estimate_tokens
+import tracing
+
+DEFAULT_MAX_TOKENS = 4000
+DEFAULT_KEEP_TURNS = 3
+# After a fold the history should be well under budget, so folds stay rare
+FOLD_TARGET_RATIO = 0.6
+SUMMARY_MARKER = "[Summary of the conversation so far]"
+SUMMARY_MAX_CHARS = 1500
+STUB_SUFFIX = "chars of tool output omitted; call the tool again if needed]"
+SUMMARY_PROMPT = (
+    "You keep a running summary of a pet store chat. Rewrite the current summary so it also "
+    "covers the new turns. Keep what the user may refer back to: pet names, ids, types and "
+    "prices mentioned, pets added, and the user's preferences. Plain text, at most 120 words."
+)
+
+
+# ----------------------------------------------------------------------
+# Message helpers
+# ----------------------------------------------------------------------
+def message_tokens(message):
+    return estimate_tokens(json.dumps(message['content'], separators=(',', ':'), default=str))
+
+
+def history_tokens(messages):
+    return sum(message_tokens(message) for message in messages)
+
+
+def turn_starts(messages):
+    """Indexes of the user messages that open a turn (not tool results)"""
+    return [
+        i for i, message in enumerate(messages)
+        if message['role'] == 'user' and not any('toolResult' in block for block in message['content'])
+    ]
+
+
+def stub_tool_results(message):
+    """Replace tool result content with a one-line stub; returns how many were replaced"""
+    stubbed = 0
+    for block in message['content']:
+        result = block.get('toolResult')
+        if result is None:
+            continue
+        parts = result['content']
+        if len(parts) == 1 and parts[0].get('text', '').endswith(STUB_SUFFIX):
+            continue
+        chars = sum(len(part['text']) if 'text' in part else len(json.dumps(part.get('json', ''))) for part in parts)
+        result['content'] = [{"text": f"[{chars} {STUB_SUFFIX}"}]
+        stubbed += 1
+    return stubbed
+
+
+def transcript(messages):
+    """Compact text rendering of turns, for the summarizer"""
+    lines = []
+    for message in messages:
+        for block in message['content']:
+            if 'text' in block:
+                speaker = "User" if message['role'] == 'user' else "Assistant"
+                lines.append(f"{speaker}: {block['text'].strip()}")
+            elif 'toolUse' in block:
+                tool_use = block['toolUse']
+                lines.append(f"(tool {tool_use['name']} {json.dumps(tool_use.get('input', {}))})")
+    return "\n".join(lines)
+
+
+def extractive_summary(previous, messages):
+    """Summary without a model call: one line per folded turn, newest kept when too long"""
+    lines = previous.splitlines() if previous else []
+    question = None
+    for message in messages:
+        texts = [block['text'].strip() for block in message['content'] if 'text' in block]
+        if not texts:
+            continue
+        if message['role'] == 'user':
+            question = texts[0][:120]
+        elif question is not None:
+            answer = " ".join(texts).split(". ")[0][:160]
+            lines.append(f"- Q: {question} → A: {answer}")
+            question = None
+    while lines and len("\n".join(lines)) > SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ModelSummarizer:
+    """Summaries written by a model (the agent's own unless one is given)"""
+
+    def __init__(self, model=None):
+        self.model = model
+
+    async def _summarize(self, model, previous, messages):
+        request = [{"role": "user", "content": [{"text": (
+            f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript(messages)}"
+        )}]}]
+        text = []
+        async for event in model.stream(request, system_prompt=SUMMARY_PROMPT):
+            delta = event.get('contentBlockDelta', {}).get('delta', {})
+            if 'text' in delta:
+                text.append(delta['text'])
+        return "".join(text).strip()[:SUMMARY_MAX_CHARS]
+
+    def __call__(self, previous, messages, agent):
+        # Called from inside the agent's event loop, so the model call gets its own
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self._summarize(self.model or agent.model, previous, messages)).result()
+
+
+# ----------------------------------------------------------------------
+# Conversation manager
+# ----------------------------------------------------------------------
+class RollingSummaryManager(ConversationManager):
+    """Token-budgeted history: recent turns verbatim, older tool results stubbed, oldest summarized
+
+    ``summarizer(previous_summary, folded_messages, agent)`` returns the new
+    summary text; it defaults to the agent's model, with the extractive
+    summary as the fallback if the model call fails.
+    """
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, keep_turns=DEFAULT_KEEP_TURNS, summarizer=None):
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summarizer = summarizer if summarizer is not None else ModelSummarizer()
+        self.summary = ""
+        self.folds = 0
+        self.stubbed = 0
+        self.turn_prompt_tokens = 0     # largest prompt of the current turn
+        self.prompt_tokens = []         # largest prompt per finished turn
+
+    @classmethod
+    def from_config(cls, config):
+        summarizer = extractive_summary if config.get('context_summarizer') == 'extractive' else None
+        return cls(
+            max_tokens=config.get('context_max_tokens', DEFAULT_MAX_TOKENS),
+            keep_turns=config.get('context_keep_turns', DEFAULT_KEEP_TURNS),
+            summarizer=summarizer
+        )
+
+    def register_hooks(self, registry, **kwargs):
+        super().register_hooks(registry, **kwargs)
+        registry.add_callback(BeforeInvocationEvent, self._on_turn_start)
+        registry.add_callback(BeforeModelCallEvent, self._on_model_call)
+
+    def _on_turn_start(self, event):
+        self.turn_prompt_tokens = 0
+
+    def _on_model_call(self, event):
+        system = event.agent.system_prompt or ""
+        tokens = history_tokens(event.agent.messages) + estimate_tokens(system)
+        self.turn_prompt_tokens = max(self.turn_prompt_tokens, tokens)
+
+    def get_state(self):
+        return {**super().get_state(), "summary": self.summary, "folds": self.folds}
+
+    def restore_from_session(self, state):
+        super().restore_from_session(state)
+        self.summary = state.get("summary", "")
+        self.folds = state.get("folds", 0)
+        return None
+
+    # ------------------------------------------------------------------
+    def _take_summary(self, messages):
+        """Remove the summary block from the first message; returns the summary text"""
+        if messages and messages[0]['content']:
+            text = messages[0]['content'][0].get('text', '')
+            if text.startswith(SUMMARY_MARKER):
+                messages[0]['content'].pop(0)
+                self.summary = self.summary or text[len(SUMMARY_MARKER):].strip()
+        return self.summary
+
+    def _fold(self, agent, keep_turns, target_tokens):
+        """Summarize turns from the front until the rest fits ``target_tokens``; True if any were folded"""
+        messages = agent.messages
+        starts = turn_starts(messages)
+        if len(starts) <= keep_turns:
+            return False
+        summary_tokens = estimate_tokens(self.summary) + 20
+        cut = starts[-keep_turns]
+        for start in starts[1:len(starts) - keep_turns + 1]:
+            if history_tokens(messages[start:]) + summary_tokens <= target_tokens:
+                cut = start
+                break
+
+        with tracing.span("context fold", **{"context.folded_messages": cut}):
+            previous = self._take_summary(messages)
+            folded = messages[:cut]
+            try:
+                summary = self.summarizer(previous, folded, agent)
+            except Exception:
+                summary = None
+            self.summary = summary or extractive_summary(previous, folded)
+            del messages[:cut]
+            messages[0]['content'].insert(0, {"text": f"{SUMMARY_MARKER}\n{self.summary}"})
+        self.removed_message_count += cut
+        self.folds += 1
+        return True
+
+    def apply_management(self, agent, **kwargs):
+        """After each turn: stub tool results outside the last turns, fold if over budget"""
+        if self.turn_prompt_tokens:
+            self.prompt_tokens.append(self.turn_prompt_tokens)
+        messages = agent.messages
+        starts = turn_starts(messages)
+        if len(starts) <= self.keep_turns:
+            return
+        for message in messages[:starts[-self.keep_turns]]:
+            self.stubbed += stub_tool_results(message)
+        if history_tokens(messages) > self.max_tokens:
+            self._fold(agent, self.keep_turns, int(self.max_tokens * FOLD_TARGET_RATIO))
+
+    def reduce_context(self, agent, e=None, **kwargs):
+        """Context overflow: stub every tool result but the newest, then fold all but the last turn"""
+        for message in agent.messages[:-1]:
+            self.stubbed += stub_tool_results(message)
+        if not self._fold(agent, 1, int(self.max_tokens * FOLD_TARGET_RATIO)) and e is not None:
+            raise ContextWindowOverflowException("History is already reduced to the current turn") from e
+
+    # ------------------------------------------------------------------
+    def format_turn(self, agent):
+        """One line about the prompt size of the last turn"""
+        prompt = self.prompt_tokens[-1] if self.prompt_tokens else 0
+        return (f"📏 Prompt ~{prompt} tokens · history {history_tokens(agent.messages)} tokens "
+                f"in {len(agent.messages)} messages · summary ~{estimate_tokens(self.summary)} tokens "
+                f"({self.folds} folds, {self.stubbed} tool results stubbed)")
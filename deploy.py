@@ -1,20 +1,42 @@
 #!/usr/bin/env python3
 """
 Complete AgentCore Gateway Deployment Script
-Deploys: Lambda, API Gateway, Cognito, IAM Roles, AgentCore Gateway
+Deploys: DynamoDB, Lambda, API Gateway, Cognito, IAM Roles, AgentCore Gateway
 Account: 114805761158
 Region: us-east-1
+
+Steps run as a dependency graph: the Lambda role/function, the Cognito
+user pool and the API Gateway resource tree are created concurrently, and
+eventual-consistency waits poll with backoff instead of sleeping.
+
+Re-running is incremental: live resources are discovered (using the ids in
+deployment-config.json, then well-known names), diffed against the desired
+state, and only missing or changed resources are created or updated.
+
+Usage:
+    python3 deploy.py          # plan, then apply the changes
+    python3 deploy.py plan     # only show what would change
 """
 
+import argparse
+import base64
 import boto3
+import hashlib
 import json
-import time
+import os
 import zipfile
+from functools import partial
 from io import BytesIO
 
+from botocore.exceptions import ClientError
+
+from petstore_lambda import CATALOG, CATALOG_INDEX, COUNTER_ID, TYPE_INDEX
+from task_graph import TaskFailed, TaskGraph, log, retry, wait_until
+
 # Configuration
 ACCOUNT_ID = "114805761158"
 REGION = "us-east-1"
+CONFIG_PATH = 'deployment-config.json'
 
 # Initialize AWS clients
 iam = boto3.client('iam', region_name=REGION)
@@ -22,392 +44,994 @@ apigw = boto3.client('apigateway', region_name=REGION)
 cognito = boto3.client('cognito-idp', region_name=REGION)
 lambda_client = boto3.client('lambda', region_name=REGION)
 agentcore = boto3.client('bedrock-agentcore-control', region_name=REGION)
+dynamodb = boto3.client('dynamodb', region_name=REGION)
 
-print("=" * 70)
-print("🚀 AgentCore Gateway Deployment")
-print("=" * 70)
-print(f"Account: {ACCOUNT_ID}")
-print(f"Region: {REGION}")
-print("=" * 70)
+# Resource names used to find existing resources
+TABLE_NAME = 'PetStore'
+LAMBDA_ROLE_NAME = 'PetStoreLambdaRole'
+LAMBDA_POLICY_NAME = 'DynamoDBAccess'
+LAMBDA_FUNCTION_NAME = 'PetStoreFunction'
+LAMBDA_ARN = f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{LAMBDA_FUNCTION_NAME}"
+API_NAME = 'PetStoreAPI'
+API_STAGE = 'prod'
+GATEWAY_ROLE_NAME = 'AgentCoreGatewayRole'
+GATEWAY_POLICY_NAME = 'APIGatewayAccess'
+USER_POOL_NAME = 'AgentCoreUserPool'
+USER_POOL_CLIENT_NAME = 'AgentCoreClient'
+GATEWAY_NAME = 'PetStoreGateway'
+TARGET_NAME = 'PetStoreTarget'
 
-# ============================================================================
-# STEP 1: Create Lambda Function for Pet Store Backend
-# ============================================================================
-print("\n[1/6] Creating Lambda Function...")
-
-lambda_code = '''import json
-
-def lambda_handler(event, context):
-    path = event.get('path', '')
-    method = event.get('httpMethod', '')
-    
-    pets = [
-        {"id": 1, "type": "dog", "name": "Buddy", "price": 249.99},
-        {"id": 2, "type": "cat", "name": "Whiskers", "price": 124.99},
-        {"id": 3, "type": "fish", "name": "Nemo", "price": 0.99}
-    ]
-    
-    if path == '/pets' and method == 'GET':
-        return {
-            'statusCode': 200,
-            'body': json.dumps(pets),
-            'headers': {'Content-Type': 'application/json'}
-        }
-    elif path.startswith('/pets/') and method == 'GET':
-        pet_id = int(path.split('/')[-1])
-        pet = next((p for p in pets if p['id'] == pet_id), None)
-        if pet:
-            return {
-                'statusCode': 200,
-                'body': json.dumps(pet),
-                'headers': {'Content-Type': 'application/json'}
-            }
-        return {'statusCode': 404, 'body': json.dumps({'error': 'Pet not found'})}
-    
-    return {'statusCode': 404, 'body': json.dumps({'error': 'Not found'})}
-'''
+NOT_FOUND_CODES = {'NoSuchEntity', 'NotFoundException', 'ResourceNotFoundException'}
 
-# Create Lambda execution role
-lambda_trust_policy = {
-    "Version": "2012-10-17",
-    "Statement": [{
-        "Effect": "Allow",
-        "Principal": {"Service": "lambda.amazonaws.com"},
-        "Action": "sts:AssumeRole"
-    }]
+# API routes served by the Lambda (path, method)
+API_ROUTES = [('/pets', 'GET'), ('/pets/{petId}', 'GET'), ('/pets', 'POST')]
+
+# Declared query parameters end up in the tool schema the gateway generates
+METHOD_PARAMETERS = {
+    ('/pets', 'GET'): {
+        f"method.request.querystring.{name}": False
+        for name in ('type', 'min_price', 'max_price', 'limit', 'cursor')
+    }
 }
 
-try:
-    lambda_role = iam.create_role(
-        RoleName='PetStoreLambdaRole',
-        AssumeRolePolicyDocument=json.dumps(lambda_trust_policy),
-        Description='Execution role for Pet Store Lambda function'
-    )
-    lambda_role_arn = lambda_role['Role']['Arn']
-    print(f"   ✅ Lambda role created: {lambda_role_arn}")
-    
-    iam.attach_role_policy(
-        RoleName='PetStoreLambdaRole',
-        PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
-    )
-    time.sleep(10)
-except iam.exceptions.EntityAlreadyExistsException:
-    lambda_role_arn = f"arn:aws:iam::{ACCOUNT_ID}:role/PetStoreLambdaRole"
-    print(f"   ℹ️  Lambda role already exists: {lambda_role_arn}")
-
-# Package Lambda code
-zip_buffer = BytesIO()
-with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-    zip_file.writestr('lambda_function.py', lambda_code)
-zip_buffer.seek(0)
-
-try:
-    lambda_func = lambda_client.create_function(
-        FunctionName='PetStoreFunction',
-        Runtime='python3.12',
-        Role=lambda_role_arn,
-        Handler='lambda_function.lambda_handler',
-        Code={'ZipFile': zip_buffer.read()},
-        Timeout=30,
-        Description='Pet Store API backend'
-    )
-    lambda_arn = lambda_func['FunctionArn']
-    print(f"   ✅ Lambda function created: {lambda_arn}")
-except lambda_client.exceptions.ResourceConflictException:
-    lambda_arn = f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:PetStoreFunction"
-    print(f"   ℹ️  Lambda function already exists: {lambda_arn}")
+# GSIs behind GET /pets (see petstore_lambda.query_pets)
+TABLE_ATTRIBUTES = [
+    {'AttributeName': 'id', 'AttributeType': 'N'},
+    {'AttributeName': 'price', 'AttributeType': 'N'},
+    {'AttributeName': 'type', 'AttributeType': 'S'},
+    {'AttributeName': 'catalog', 'AttributeType': 'S'},
+]
+TABLE_INDEXES = [
+    {
+        'IndexName': index_name,
+        'KeySchema': [{'AttributeName': hash_key, 'KeyType': 'HASH'},
+                      {'AttributeName': 'price', 'KeyType': 'RANGE'}],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+    for index_name, hash_key in ((CATALOG_INDEX, 'catalog'), (TYPE_INDEX, 'type'))
+]
 
-# ============================================================================
-# STEP 2: Create API Gateway REST API
-# ============================================================================
-print("\n[2/6] Creating API Gateway...")
-
-api = apigw.create_rest_api(
-    name='PetStoreAPI',
-    description='Sample Pet Store API for AgentCore Gateway',
-    endpointConfiguration={'types': ['REGIONAL']}
-)
-api_id = api['id']
-print(f"   ✅ API Gateway created: {api_id}")
-
-# Get root resource
-resources = apigw.get_resources(restApiId=api_id)
-root_id = resources['items'][0]['id']
-
-# Create /pets resource
-pets_resource = apigw.create_resource(
-    restApiId=api_id,
-    parentId=root_id,
-    pathPart='pets'
-)
-pets_resource_id = pets_resource['id']
-
-# Create /pets/{petId} resource
-pet_id_resource = apigw.create_resource(
-    restApiId=api_id,
-    parentId=pets_resource_id,
-    pathPart='{petId}'
-)
-pet_id_resource_id = pet_id_resource['id']
-
-# Add GET method to /pets
-apigw.put_method(
-    restApiId=api_id,
-    resourceId=pets_resource_id,
-    httpMethod='GET',
-    authorizationType='AWS_IAM'
-)
-
-apigw.put_integration(
-    restApiId=api_id,
-    resourceId=pets_resource_id,
-    httpMethod='GET',
-    type='AWS_PROXY',
-    integrationHttpMethod='POST',
-    uri=f'arn:aws:apigateway:{REGION}:lambda:path/2015-03-31/functions/{lambda_arn}/invocations'
-)
-
-# Add GET method to /pets/{petId}
-apigw.put_method(
-    restApiId=api_id,
-    resourceId=pet_id_resource_id,
-    httpMethod='GET',
-    authorizationType='AWS_IAM'
-)
-
-apigw.put_integration(
-    restApiId=api_id,
-    resourceId=pet_id_resource_id,
-    httpMethod='GET',
-    type='AWS_PROXY',
-    integrationHttpMethod='POST',
-    uri=f'arn:aws:apigateway:{REGION}:lambda:path/2015-03-31/functions/{lambda_arn}/invocations'
-)
-
-# Grant API Gateway permission to invoke Lambda
-try:
-    lambda_client.add_permission(
-        FunctionName='PetStoreFunction',
-        StatementId='apigateway-invoke',
-        Action='lambda:InvokeFunction',
-        Principal='apigateway.amazonaws.com',
-        SourceArn=f'arn:aws:execute-api:{REGION}:{ACCOUNT_ID}:{api_id}/*/*'
-    )
-except lambda_client.exceptions.ResourceConflictException:
-    pass
-
-# Deploy API
-deployment = apigw.create_deployment(
-    restApiId=api_id,
-    stageName='prod',
-    description='Production deployment'
-)
-print(f"   ✅ API deployed to stage: prod")
-print(f"   🔗 Endpoint: https://{api_id}.execute-api.{REGION}.amazonaws.com/prod")
+# Seed data for a new table
+INITIAL_PETS = [
+    (1, "Buddy", "dog", "249.99"), (2, "Whiskers", "cat", "124.99"), (3, "Nemo", "fish", "0.99"),
+    (4, "Tweety", "bird", "49.99"), (5, "Fluffy", "hamster", "29.99"), (6, "Thumper", "rabbit", "89.99"),
+    (7, "Max", "dog", "299.99"), (8, "Luna", "cat", "149.99"), (9, "Goldie", "fish", "1.99"),
+    (10, "Polly", "bird", "79.99"), (11, "Shelly", "turtle", "39.99"), (12, "Squeaky", "guinea pig", "34.99"),
+    (13, "Charlie", "dog", "279.99"), (14, "Mittens", "cat", "134.99"), (15, "Spike", "lizard", "59.99"),
+]
 
 # ============================================================================
-# STEP 3: Create IAM Role for AgentCore Gateway
+# Lambda Function for Pet Store Backend
 # ============================================================================
-print("\n[3/6] Creating IAM Role for AgentCore Gateway...")
+# Source lives in petstore_lambda.py; it is shipped as lambda_function.py
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'petstore_lambda.py')) as f:
+    lambda_code = f.read()
 
-gateway_trust_policy = {
+
+def package_lambda(code):
+    """Zip the handler reproducibly (fixed timestamp) so equal code hashes equal"""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        info = zipfile.ZipInfo('lambda_function.py', date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        zip_file.writestr(info, code)
+    return zip_buffer.getvalue()
+
+
+def code_sha256(zip_bytes):
+    """Same encoding as Lambda's ``CodeSha256`` (base64 of the SHA-256 digest)"""
+    return base64.b64encode(hashlib.sha256(zip_bytes).digest()).decode()
+
+
+LAMBDA_ZIP = package_lambda(lambda_code)
+LAMBDA_CODE_SHA256 = code_sha256(LAMBDA_ZIP)
+
+lambda_trust_policy = {
     "Version": "2012-10-17",
     "Statement": [{
         "Effect": "Allow",
-        "Principal": {"Service": "bedrock-agentcore.amazonaws.com"},
+        "Principal": {"Service": "lambda.amazonaws.com"},
         "Action": "sts:AssumeRole"
     }]
 }
 
-gateway_policy = {
+gateway_trust_policy = {
     "Version": "2012-10-17",
     "Statement": [{
         "Effect": "Allow",
-        "Action": ["execute-api:Invoke"],
-        "Resource": f"arn:aws:execute-api:{REGION}:{ACCOUNT_ID}:{api_id}/prod/*/*"
+        "Principal": {"Service": "bedrock-agentcore.amazonaws.com"},
+        "Action": "sts:AssumeRole"
     }]
 }
 
-try:
-    gateway_role = iam.create_role(
-        RoleName='AgentCoreGatewayRole',
-        AssumeRolePolicyDocument=json.dumps(gateway_trust_policy),
-        Description='Service role for AgentCore Gateway'
-    )
-    gateway_role_arn = gateway_role['Role']['Arn']
-    
-    iam.put_role_policy(
-        RoleName='AgentCoreGatewayRole',
-        PolicyName='APIGatewayAccess',
-        PolicyDocument=json.dumps(gateway_policy)
-    )
-    print(f"   ✅ Gateway role created: {gateway_role_arn}")
-    time.sleep(10)
-except iam.exceptions.EntityAlreadyExistsException:
-    gateway_role_arn = f"arn:aws:iam::{ACCOUNT_ID}:role/AgentCoreGatewayRole"
-    print(f"   ℹ️  Gateway role already exists: {gateway_role_arn}")
 
 # ============================================================================
-# STEP 4: Create Cognito User Pool
+# Desired state
 # ============================================================================
-print("\n[4/6] Creating Cognito User Pool...")
-
-try:
-    user_pool = cognito.create_user_pool(
-        PoolName='AgentCoreUserPool',
-        AutoVerifiedAttributes=['email'],
-        Policies={
-            'PasswordPolicy': {
-                'MinimumLength': 8,
-                'RequireUppercase': True,
-                'RequireLowercase': True,
-                'RequireNumbers': True,
-                'RequireSymbols': True
+def lambda_policy():
+    # UpdateItem is the atomic id counter used by POST /pets
+    return {
+        "Version": "2012-10-17",
+        "Statement": [{
+            "Effect": "Allow",
+            "Action": [
+                "dynamodb:GetItem",
+                "dynamodb:PutItem",
+                "dynamodb:UpdateItem",
+                "dynamodb:Scan",
+                "dynamodb:Query"
+            ],
+            "Resource": [
+                f"arn:aws:dynamodb:{REGION}:{ACCOUNT_ID}:table/{TABLE_NAME}",
+                f"arn:aws:dynamodb:{REGION}:{ACCOUNT_ID}:table/{TABLE_NAME}/index/*"
+            ]
+        }]
+    }
+
+
+LAMBDA_ENVIRONMENT = {'Variables': {'PETSTORE_TABLE': TABLE_NAME}}
+
+
+def integration_uri(lambda_arn):
+    return f"arn:aws:apigateway:{REGION}:lambda:path/2015-03-31/functions/{lambda_arn}/invocations"
+
+
+def gateway_policy(api_id):
+    return {
+        "Version": "2012-10-17",
+        "Statement": [{
+            "Effect": "Allow",
+            "Action": ["execute-api:Invoke"],
+            "Resource": f"arn:aws:execute-api:{REGION}:{ACCOUNT_ID}:{api_id}/{API_STAGE}/*/*"
+        }]
+    }
+
+
+def gateway_auth_config(client_id, discovery_url):
+    return {
+        "customJWTAuthorizer": {
+            "allowedClients": [client_id],
+            "discoveryUrl": discovery_url
+        }
+    }
+
+
+def target_config(api_id):
+    return {
+        "mcp": {
+            "apiGateway": {
+                "restApiId": api_id,
+                "stage": API_STAGE,
+                "apiGatewayToolConfiguration": {
+                    "toolFilters": [
+                        {"filterPath": "/pets", "methods": ["GET", "POST"]},
+                        {"filterPath": "/pets/{petId}", "methods": ["GET"]}
+                    ],
+                    "toolOverrides": [
+                        {
+                            "name": "ListPets",
+                            "path": "/pets",
+                            "method": "GET",
+                            "description": (
+                                "Lists pets, cheapest first, one page at a time. Optional query "
+                                "parameters: type (e.g. dog), min_price, max_price, limit (1-100, "
+                                "default 25) and cursor (the nextCursor of the previous page). "
+                                "Filter instead of listing everything."
+                            )
+                        },
+                        {
+                            "name": "GetPetById",
+                            "path": "/pets/{petId}",
+                            "method": "GET",
+                            "description": "Retrieve a specific pet by its ID"
+                        },
+                        {
+                            "name": "AddPet",
+                            "path": "/pets",
+                            "method": "POST",
+                            "description": "Add a new pet to the store (body: name, type, price)"
+                        }
+                    ]
+                }
             }
         }
-    )
-    user_pool_id = user_pool['UserPool']['Id']
-    
-    app_client = cognito.create_user_pool_client(
-        UserPoolId=user_pool_id,
-        ClientName='AgentCoreClient',
-        GenerateSecret=False,
-        ExplicitAuthFlows=['ALLOW_USER_PASSWORD_AUTH', 'ALLOW_REFRESH_TOKEN_AUTH']
-    )
-    client_id = app_client['UserPoolClient']['ClientId']
-    
-    discovery_url = f"https://cognito-idp.{REGION}.amazonaws.com/{user_pool_id}/.well-known/openid-configuration"
-    print(f"   ✅ Cognito User Pool created: {user_pool_id}")
-    print(f"   ✅ Client ID: {client_id}")
-except Exception as e:
-    print(f"   ⚠️  Cognito creation error: {e}")
-    user_pool_id = "us-east-1_RNmMBC87g"
-    client_id = "435iqd7cgbn2slmgn0a36fo9lf"
-    discovery_url = f"https://cognito-idp.{REGION}.amazonaws.com/{user_pool_id}/.well-known/openid-configuration"
-    print(f"   ℹ️  Using existing pool: {user_pool_id}")
+    }
+
+
+def is_role_propagation_error(error):
+    """A freshly created IAM role that another service cannot assume yet"""
+    message = str(error).lower()
+    return 'assume' in message or ('role' in message and ('not authorized' in message or 'invalid' in message))
+
 
 # ============================================================================
-# STEP 5: Create AgentCore Gateway
+# Discovery: what exists right now
 # ============================================================================
-print("\n[5/6] Creating AgentCore Gateway...")
+def lookup(call, **kwargs):
+    """``call(**kwargs)``, or None when the resource does not exist"""
+    try:
+        return call(**kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] in NOT_FOUND_CODES:
+            return None
+        raise
+
 
-auth_config = {
-    "customJWTAuthorizer": {
-        "allowedClients": [client_id],
-        "discoveryUrl": discovery_url
+def discover_roles(state, live):
+    lambda_role = lookup(iam.get_role, RoleName=LAMBDA_ROLE_NAME)
+    gateway_role = lookup(iam.get_role, RoleName=GATEWAY_ROLE_NAME)
+    lambda_policy = policy = None
+    if lambda_role:
+        lambda_policy = lookup(iam.get_role_policy, RoleName=LAMBDA_ROLE_NAME, PolicyName=LAMBDA_POLICY_NAME)
+    if gateway_role:
+        policy = lookup(iam.get_role_policy, RoleName=GATEWAY_ROLE_NAME, PolicyName=GATEWAY_POLICY_NAME)
+    return {
+        "lambda_role": lambda_role and lambda_role['Role'],
+        "lambda_policy": lambda_policy and lambda_policy['PolicyDocument'],
+        "gateway_role": gateway_role and gateway_role['Role'],
+        "gateway_policy": policy and policy['PolicyDocument']
     }
-}
 
-gateway = agentcore.create_gateway(
-    name='PetStoreGateway',
-    roleArn=gateway_role_arn,
-    protocolType='MCP',
-    protocolConfiguration={
-        'mcp': {
-            'supportedVersions': ['2025-03-26'],
-            'searchType': 'SEMANTIC'
-        }
-    },
-    authorizerType='CUSTOM_JWT',
-    authorizerConfiguration=auth_config,
-    description='AgentCore Gateway for Pet Store API'
-)
-
-gateway_id = gateway['gatewayId']
-gateway_url = gateway['gatewayUrl']
-print(f"   ✅ Gateway created: {gateway_id}")
-print(f"   🔗 Gateway URL: {gateway_url}")
-
-# Wait for gateway to be ready
-print("   ⏳ Waiting for gateway to be READY...")
-for i in range(20):
-    time.sleep(10)
-    gw = agentcore.get_gateway(gatewayIdentifier=gateway_id)
-    status = gw['status']
-    print(f"      Attempt {i+1}/20: Status = {status}")
-    if status == 'READY':
-        print("   ✅ Gateway is READY!")
-        break
-    elif status == 'FAILED':
-        print("   ❌ Gateway creation failed")
-        exit(1)
+
+def discover_table(state, live):
+    table = lookup(dynamodb.describe_table, TableName=TABLE_NAME)
+    return {"table": table and table['Table']}
+
+
+def discover_lambda(state, live):
+    function = lookup(lambda_client.get_function, FunctionName=LAMBDA_FUNCTION_NAME)
+    return {"lambda_function": function and function['Configuration']}
+
+
+def discover_api(state, live):
+    api = None
+    if state.get('api_gateway_id'):
+        api = lookup(apigw.get_rest_api, restApiId=state['api_gateway_id'])
+    if api is None:
+        matches = [item for item in apigw.get_rest_apis(limit=500)['items'] if item['name'] == API_NAME]
+        if len(matches) > 1:
+            log('discover', f"⚠️  {len(matches)} {API_NAME} APIs found; using the newest")
+        api = max(matches, key=lambda item: item['createdDate'], default=None)
+    if api is None:
+        return {"api": None, "api_resources": {}, "api_stage": None}
+
+    items = apigw.get_resources(restApiId=api['id'], limit=500, embed=['methods'])['items']
+    return {
+        "api": api,
+        "api_resources": {item['path']: item for item in items},
+        "api_stage": lookup(apigw.get_stage, restApiId=api['id'], stageName=API_STAGE)
+    }
+
+
+def discover_cognito(state, live):
+    pool = None
+    if state.get('user_pool_id'):
+        pool = lookup(cognito.describe_user_pool, UserPoolId=state['user_pool_id'])
+        pool = pool and pool['UserPool']
+    if pool is None:
+        pools = cognito.list_user_pools(MaxResults=60)['UserPools']
+        pool = next((p for p in pools if p['Name'] == USER_POOL_NAME), None)
+    if pool is None:
+        return {"user_pool": None, "user_pool_client": None}
+
+    clients = cognito.list_user_pool_clients(UserPoolId=pool['Id'], MaxResults=60)['UserPoolClients']
+    preferred = state.get('client_id')
+    client = (next((c for c in clients if c['ClientId'] == preferred), None)
+              or next((c for c in clients if c['ClientName'] == USER_POOL_CLIENT_NAME), None))
+    return {"user_pool": pool, "user_pool_client": client}
+
+
+def discover_gateway(state, live):
+    gateway = None
+    if state.get('gateway_id'):
+        gateway = lookup(agentcore.get_gateway, gatewayIdentifier=state['gateway_id'])
+    if gateway is None:
+        items = agentcore.list_gateways(maxResults=100)['items']
+        match = next((item for item in items if item['name'] == GATEWAY_NAME), None)
+        if match:
+            gateway = agentcore.get_gateway(gatewayIdentifier=match['gatewayId'])
+    if gateway is None:
+        return {"gateway": None, "target": None}
+
+    items = agentcore.list_gateway_targets(gatewayIdentifier=gateway['gatewayId'], maxResults=100)['items']
+    match = next((item for item in items if item['name'] == TARGET_NAME), None)
+    target = None
+    if match:
+        target = agentcore.get_gateway_target(gatewayIdentifier=gateway['gatewayId'], targetId=match['targetId'])
+    return {"gateway": gateway, "target": target}
+
+
+def discover(state):
+    """Look up every resource concurrently; returns the ``live`` snapshot"""
+    graph = TaskGraph()
+    for name, fn in (('roles', discover_roles), ('table', discover_table), ('lambda', discover_lambda),
+                     ('api', discover_api), ('cognito', discover_cognito), ('gateway', discover_gateway)):
+        graph.add(name, partial(fn, state))
+    return graph.run()
+
+
+def known_ids(live):
+    """Ids of resources that already exist, in the shape the steps return"""
+    ids = {}
+    if live['table']:
+        ids['table_name'] = live['table']['TableName']
+    if live['lambda_role']:
+        ids['lambda_role_arn'] = live['lambda_role']['Arn']
+    if live['lambda_function']:
+        ids['lambda_arn'] = live['lambda_function']['FunctionArn']
+    if live['api']:
+        ids['api_id'] = live['api']['id']
+        ids['pets_resource_id'] = live['api_resources'].get('/pets', {}).get('id')
+        ids['pet_id_resource_id'] = live['api_resources'].get('/pets/{petId}', {}).get('id')
+    if live['gateway_role']:
+        ids['gateway_role_arn'] = live['gateway_role']['Arn']
+    if live['user_pool'] and live['user_pool_client']:
+        ids['user_pool_id'] = live['user_pool']['Id']
+        ids['client_id'] = live['user_pool_client']['ClientId']
+        ids['discovery_url'] = discovery_url(ids['user_pool_id'])
+    if live['gateway']:
+        ids['gateway_id'] = live['gateway']['gatewayId']
+        ids['gateway_url'] = live['gateway']['gatewayUrl']
+    if live['target']:
+        ids['target_id'] = live['target']['targetId']
+    return ids
+
+
+def discovery_url(user_pool_id):
+    return f"https://cognito-idp.{REGION}.amazonaws.com/{user_pool_id}/.well-known/openid-configuration"
+
 
 # ============================================================================
-# STEP 6: Create Gateway Target
+# Diff: what each step has to do
 # ============================================================================
-print("\n[6/6] Creating Gateway Target...")
-
-target_config = {
-    "mcp": {
-        "apiGateway": {
-            "restApiId": api_id,
-            "stage": "prod",
-            "apiGatewayToolConfiguration": {
-                "toolFilters": [
-                    {"filterPath": "/pets", "methods": ["GET"]},
-                    {"filterPath": "/pets/{petId}", "methods": ["GET"]}
-                ],
-                "toolOverrides": [
-                    {
-                        "name": "ListPets",
-                        "path": "/pets",
-                        "method": "GET",
-                        "description": "Retrieves all available pets in the store"
-                    },
-                    {
-                        "name": "GetPetById",
-                        "path": "/pets/{petId}",
-                        "method": "GET",
-                        "description": "Retrieve a specific pet by its ID"
-                    }
-                ]
-            }
-        }
-    }
+# Each check returns (action, reason) with action 'create', 'update' or 'ok'.
+# ``ctx`` holds the ids the step would use: discovered ids when planning,
+# the outputs of upstream steps when applying.
+
+def check_table(live, ctx):
+    if live['table'] is None:
+        return 'create', "table not found"
+    existing = {index['IndexName'] for index in live['table'].get('GlobalSecondaryIndexes', [])}
+    missing = [index['IndexName'] for index in TABLE_INDEXES if index['IndexName'] not in existing]
+    if missing:
+        return 'update', f"index {', '.join(missing)} missing"
+    return 'ok', ""
+
+
+def check_lambda_role(live, ctx):
+    if live['lambda_role'] is None:
+        return 'create', "role not found"
+    if live['lambda_policy'] != lambda_policy():
+        return 'update', "DynamoDB access policy differs"
+    return 'ok', ""
+
+
+def check_lambda_function(live, ctx):
+    function = live['lambda_function']
+    if function is None:
+        return 'create', "function not found"
+    if function['CodeSha256'] != LAMBDA_CODE_SHA256:
+        return 'update', f"code changed ({function['CodeSha256'][:8]}… → {LAMBDA_CODE_SHA256[:8]}…)"
+    if function['Role'] != ctx.get('lambda_role_arn'):
+        return 'update', "execution role changed"
+    if function.get('Environment', {}).get('Variables', {}) != LAMBDA_ENVIRONMENT['Variables']:
+        return 'update', "environment changed"
+    return 'ok', ""
+
+
+def check_api_resources(live, ctx):
+    if live['api'] is None:
+        return 'create', "REST API not found"
+    for path, method in API_ROUTES:
+        resource = live['api_resources'].get(path)
+        if resource is None or method not in resource.get('resourceMethods', {}):
+            return 'update', f"{method} {path} missing"
+        declared = resource['resourceMethods'][method].get('requestParameters') or {}
+        if any(name not in declared for name in METHOD_PARAMETERS.get((path, method), {})):
+            return 'update', f"{method} {path} query parameters missing"
+    return 'ok', ""
+
+
+def check_api_integrations(live, ctx):
+    if live['api'] is None or ctx.get('api_id') != live['api']['id']:
+        return 'create', "new REST API"
+    # When applying, api_changed says the api_resources step just edited methods
+    if ctx.get('api_changed') or check_api_resources(live, ctx)[0] != 'ok':
+        return 'update', "API methods changed"
+    uri = integration_uri(ctx.get('lambda_arn') or LAMBDA_ARN)
+    for path, method in API_ROUTES:
+        settings = live['api_resources'].get(path, {}).get('resourceMethods', {}).get(method, {})
+        if settings.get('methodIntegration', {}).get('uri') != uri:
+            return 'update', f"{method} {path} integration differs"
+    if live['api_stage'] is None:
+        return 'update', f"stage {API_STAGE} not deployed"
+    return 'ok', ""
+
+
+def check_gateway_role(live, ctx):
+    if live['gateway_role'] is None:
+        return 'create', "role not found"
+    if live['gateway_policy'] != gateway_policy(ctx.get('api_id')):
+        return 'update', "API access policy differs"
+    return 'ok', ""
+
+
+def check_cognito(live, ctx):
+    if live['user_pool'] is None:
+        return 'create', "user pool not found"
+    if live['user_pool_client'] is None:
+        return 'create', "app client not found"
+    return 'ok', ""
+
+
+def check_gateway(live, ctx):
+    gateway = live['gateway']
+    if gateway is None:
+        return 'create', "gateway not found"
+    if gateway.get('roleArn') != ctx.get('gateway_role_arn'):
+        return 'update', "service role changed"
+    authorizer = gateway.get('authorizerConfiguration', {}).get('customJWTAuthorizer', {})
+    wanted = gateway_auth_config(ctx.get('client_id'), ctx.get('discovery_url'))['customJWTAuthorizer']
+    if (authorizer.get('allowedClients') != wanted['allowedClients']
+            or authorizer.get('discoveryUrl') != wanted['discoveryUrl']):
+        return 'update', "JWT authorizer differs"
+    return 'ok', ""
+
+
+def check_target(live, ctx):
+    if live['gateway'] is None or ctx.get('gateway_id') != live['gateway']['gatewayId']:
+        return 'create', "new gateway"
+    if live['target'] is None:
+        return 'create', "target not found"
+    current = live['target'].get('targetConfiguration', {}).get('mcp', {}).get('apiGateway', {})
+    wanted = target_config(ctx.get('api_id'))['mcp']['apiGateway']
+    if any(current.get(key) != wanted[key] for key in wanted):
+        return 'update', "target configuration differs"
+    return 'ok', ""
+
+
+CHECKS = {
+    'table': check_table,
+    'lambda_role': check_lambda_role,
+    'lambda_function': check_lambda_function,
+    'cognito': check_cognito,
+    'api_resources': check_api_resources,
+    'api_integrations': check_api_integrations,
+    'gateway_role': check_gateway_role,
+    'gateway': check_gateway,
+    'target': check_target,
 }
 
-target = agentcore.create_gateway_target(
-    name='PetStoreTarget',
-    gatewayIdentifier=gateway_id,
-    targetConfiguration=target_config,
-    credentialProviderConfigurations=[{"credentialProviderType": "GATEWAY_IAM_ROLE"}]
-)
 
-target_id = target['targetId']
-print(f"   ✅ Target created: {target_id}")
+def make_plan(live):
+    ctx = known_ids(live)
+    return {step: check(live, ctx) for step, check in CHECKS.items()}
+
+
+def print_plan(plan):
+    symbols = {'create': '+', 'update': '~', 'ok': '='}
+    width = max(len(step) for step in plan)
+    print("\n📋 Plan")
+    for step, (action, reason) in plan.items():
+        detail = f"{action}: {reason}" if action != 'ok' else "unchanged"
+        print(f"   {symbols[action]} {step:<{width}}  {detail}")
+    counts = {action: sum(1 for a, _ in plan.values() if a == action) for action in symbols}
+    print(f"   {counts['create']} to create, {counts['update']} to update, {counts['ok']} unchanged")
+
+
+def step_action(step, ctx):
+    """Re-check a step against the outputs of the steps it depends on"""
+    action, reason = CHECKS[step](ctx['live'], ctx)
+    if action == 'ok':
+        log(step, "= unchanged")
+    else:
+        log(step, f"{'+' if action == 'create' else '~'} {action}: {reason}")
+    return action
+
 
 # ============================================================================
-# Save Configuration
+# Apply: create or update
 # ============================================================================
-config = {
-    "account_id": ACCOUNT_ID,
-    "region": REGION,
-    "api_gateway_id": api_id,
-    "api_gateway_stage": "prod",
-    "api_gateway_endpoint": f"https://{api_id}.execute-api.{REGION}.amazonaws.com/prod",
-    "lambda_function_name": "PetStoreFunction",
-    "lambda_arn": lambda_arn,
-    "lambda_role_arn": lambda_role_arn,
-    "gateway_role_arn": gateway_role_arn,
-    "user_pool_id": user_pool_id,
-    "client_id": client_id,
-    "discovery_url": discovery_url,
-    "gateway_id": gateway_id,
-    "gateway_url": gateway_url,
-    "target_id": target_id
-}
+def ensure_table(ctx):
+    if step_action('table', ctx) == 'ok':
+        return {"table_name": TABLE_NAME}
+
+    if ctx['live']['table'] is not None:
+        add_table_indexes(ctx['live']['table'])
+        return {"table_name": TABLE_NAME}
+
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        AttributeDefinitions=TABLE_ATTRIBUTES,
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        GlobalSecondaryIndexes=TABLE_INDEXES,
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.get_waiter('table_exists').wait(TableName=TABLE_NAME)
+
+    # Seed the pets plus the id counter POST /pets allocates from
+    items = [
+        {'id': {'N': str(pet_id)}, 'name': {'S': name}, 'type': {'S': pet_type}, 'price': {'N': price},
+         'catalog': {'S': CATALOG}}
+        for pet_id, name, pet_type, price in INITIAL_PETS
+    ]
+    items.append({'id': {'N': str(COUNTER_ID)}, 'last_id': {'N': str(max(pet[0] for pet in INITIAL_PETS))}})
+    for start in range(0, len(items), 25):
+        requests = {TABLE_NAME: [{'PutRequest': {'Item': item}} for item in items[start:start + 25]]}
+        while requests:
+            requests = dynamodb.batch_write_item(RequestItems=requests).get('UnprocessedItems')
+    log('table', f"✅ DynamoDB table created: {TABLE_NAME} ({len(INITIAL_PETS)} pets)")
+    return {"table_name": TABLE_NAME}
+
+
+def add_table_indexes(table):
+    """Add missing GSIs to an existing table (one per UpdateTable call) and backfill catalog"""
+    existing = {index['IndexName'] for index in table.get('GlobalSecondaryIndexes', [])}
+    for index in TABLE_INDEXES:
+        if index['IndexName'] in existing:
+            continue
+        dynamodb.update_table(
+            TableName=TABLE_NAME,
+            AttributeDefinitions=TABLE_ATTRIBUTES,
+            GlobalSecondaryIndexUpdates=[{'Create': index}]
+        )
+        log('table', f"⏳ Building index {index['IndexName']}...")
+
+        def index_active(name=index['IndexName']):
+            indexes = dynamodb.describe_table(TableName=TABLE_NAME)['Table'].get('GlobalSecondaryIndexes', [])
+            return any(i['IndexName'] == name and i['IndexStatus'] == 'ACTIVE' for i in indexes)
+
+        wait_until(index_active, timeout=1800, cap=30.0, description=f"index {index['IndexName']}")
+        log('table', f"✅ Index ready: {index['IndexName']}")
+
+    # Pets written before the catalog index existed have no catalog attribute
+    backfilled = 0
+    kwargs = {'TableName': TABLE_NAME, 'ProjectionExpression': 'id', 'FilterExpression': 'attribute_not_exists(catalog)'}
+    while True:
+        page = dynamodb.scan(**kwargs)
+        for item in page.get('Items', []):
+            if int(item['id']['N']) == COUNTER_ID:
+                continue
+            dynamodb.update_item(
+                TableName=TABLE_NAME,
+                Key={'id': item['id']},
+                UpdateExpression='SET catalog = :catalog',
+                ExpressionAttributeValues={':catalog': {'S': CATALOG}}
+            )
+            backfilled += 1
+        if 'LastEvaluatedKey' not in page:
+            break
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    log('table', f"✅ Backfilled catalog on {backfilled} pets")
+
+
+def ensure_lambda_role(ctx):
+    action = step_action('lambda_role', ctx)
+    if action == 'ok':
+        return {"lambda_role_arn": ctx['live']['lambda_role']['Arn']}
+
+    if action == 'create':
+        lambda_role = iam.create_role(
+            RoleName=LAMBDA_ROLE_NAME,
+            AssumeRolePolicyDocument=json.dumps(lambda_trust_policy),
+            Description='Execution role for Pet Store Lambda function'
+        )
+        lambda_role_arn = lambda_role['Role']['Arn']
+        log('lambda_role', f"✅ Lambda role created: {lambda_role_arn}")
+
+        iam.attach_role_policy(
+            RoleName=LAMBDA_ROLE_NAME,
+            PolicyArn='arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+        )
+    else:
+        lambda_role_arn = ctx['live']['lambda_role']['Arn']
+
+    iam.put_role_policy(
+        RoleName=LAMBDA_ROLE_NAME,
+        PolicyName=LAMBDA_POLICY_NAME,
+        PolicyDocument=json.dumps(lambda_policy())
+    )
+    if action == 'create':
+        iam.get_waiter('role_exists').wait(RoleName=LAMBDA_ROLE_NAME)
+    else:
+        log('lambda_role', "✅ DynamoDB access policy updated")
+    return {"lambda_role_arn": lambda_role_arn}
+
+
+def ensure_lambda_function(ctx):
+    action = step_action('lambda_function', ctx)
+    function = ctx['live']['lambda_function']
+    if action == 'ok':
+        return {"lambda_arn": function['FunctionArn']}
+
+    # A new role takes a few seconds before Lambda can assume it
+    retry_if_role = (lambda e: isinstance(e, lambda_client.exceptions.InvalidParameterValueException)
+                     and is_role_propagation_error(e))
+
+    if action == 'create':
+        lambda_func = retry(
+            lambda: lambda_client.create_function(
+                FunctionName=LAMBDA_FUNCTION_NAME,
+                Runtime='python3.12',
+                Role=ctx['lambda_role_arn'],
+                Handler='lambda_function.lambda_handler',
+                Code={'ZipFile': LAMBDA_ZIP},
+                Environment=LAMBDA_ENVIRONMENT,
+                Timeout=30,
+                Description='Pet Store API backend'
+            ),
+            retry_if=retry_if_role
+        )
+        lambda_arn = lambda_func['FunctionArn']
+        lambda_client.get_waiter('function_active_v2').wait(FunctionName=LAMBDA_FUNCTION_NAME)
+        log('lambda_function', f"✅ Lambda function created: {lambda_arn}")
+        return {"lambda_arn": lambda_arn}
+
+    if function['CodeSha256'] != LAMBDA_CODE_SHA256:
+        lambda_client.update_function_code(FunctionName=LAMBDA_FUNCTION_NAME, ZipFile=LAMBDA_ZIP)
+        lambda_client.get_waiter('function_updated_v2').wait(FunctionName=LAMBDA_FUNCTION_NAME)
+        log('lambda_function', "✅ Lambda code updated")
+    if (function['Role'] != ctx['lambda_role_arn']
+            or function.get('Environment', {}).get('Variables', {}) != LAMBDA_ENVIRONMENT['Variables']):
+        retry(
+            lambda: lambda_client.update_function_configuration(
+                FunctionName=LAMBDA_FUNCTION_NAME,
+                Role=ctx['lambda_role_arn'],
+                Environment=LAMBDA_ENVIRONMENT
+            ),
+            retry_if=retry_if_role
+        )
+        lambda_client.get_waiter('function_updated_v2').wait(FunctionName=LAMBDA_FUNCTION_NAME)
+        log('lambda_function', "✅ Lambda configuration updated")
+    return {"lambda_arn": function['FunctionArn']}
+
+
+def ensure_api_resources(ctx):
+    action = step_action('api_resources', ctx)
+    if action == 'ok':
+        return {key: ctx[key] for key in ('api_id', 'pets_resource_id', 'pet_id_resource_id')}
+
+    if action == 'create':
+        api = apigw.create_rest_api(
+            name=API_NAME,
+            description='Sample Pet Store API for AgentCore Gateway',
+            endpointConfiguration={'types': ['REGIONAL']}
+        )
+        api_id = api['id']
+        log('api_resources', f"✅ API Gateway created: {api_id}")
+        resources = {item['path']: item for item in apigw.get_resources(restApiId=api_id)['items']}
+    else:
+        api_id = ctx['live']['api']['id']
+        resources = dict(ctx['live']['api_resources'])
+
+    # Create /pets and /pets/{petId} if they are missing
+    if '/pets' not in resources:
+        resources['/pets'] = apigw.create_resource(
+            restApiId=api_id,
+            parentId=resources['/']['id'],
+            pathPart='pets'
+        )
+    if '/pets/{petId}' not in resources:
+        resources['/pets/{petId}'] = apigw.create_resource(
+            restApiId=api_id,
+            parentId=resources['/pets']['id'],
+            pathPart='{petId}'
+        )
+
+    # Add GET /pets, GET /pets/{petId} and POST /pets
+    for path, method in API_ROUTES:
+        parameters = METHOD_PARAMETERS.get((path, method), {})
+        existing = resources[path].get('resourceMethods', {})
+        if method not in existing:
+            apigw.put_method(
+                restApiId=api_id,
+                resourceId=resources[path]['id'],
+                httpMethod=method,
+                authorizationType='AWS_IAM',
+                requestParameters=parameters
+            )
+            continue
+        declared = existing[method].get('requestParameters') or {}
+        missing = [name for name in parameters if name not in declared]
+        if missing:
+            apigw.update_method(
+                restApiId=api_id,
+                resourceId=resources[path]['id'],
+                httpMethod=method,
+                patchOperations=[
+                    {'op': 'add', 'path': f"/requestParameters/{name}", 'value': str(parameters[name]).lower()}
+                    for name in missing
+                ]
+            )
+            log('api_resources', f"✅ {method} {path}: declared {len(missing)} query parameters")
+
+    return {
+        "api_id": api_id,
+        "api_changed": True,
+        "pets_resource_id": resources['/pets']['id'],
+        "pet_id_resource_id": resources['/pets/{petId}']['id']
+    }
+
+
+def ensure_api_integrations(ctx):
+    if step_action('api_integrations', ctx) == 'ok':
+        return
+
+    api_id = ctx['api_id']
+    resource_ids = {'/pets': ctx['pets_resource_id'], '/pets/{petId}': ctx['pet_id_resource_id']}
+    for path, method in API_ROUTES:
+        apigw.put_integration(
+            restApiId=api_id,
+            resourceId=resource_ids[path],
+            httpMethod=method,
+            type='AWS_PROXY',
+            integrationHttpMethod='POST',
+            uri=integration_uri(ctx['lambda_arn'])
+        )
+
+    # Grant API Gateway permission to invoke Lambda
+    try:
+        lambda_client.add_permission(
+            FunctionName=LAMBDA_FUNCTION_NAME,
+            StatementId=f'apigateway-invoke-{api_id}',
+            Action='lambda:InvokeFunction',
+            Principal='apigateway.amazonaws.com',
+            SourceArn=f'arn:aws:execute-api:{REGION}:{ACCOUNT_ID}:{api_id}/*/*'
+        )
+    except lambda_client.exceptions.ResourceConflictException:
+        pass
+
+    # Deploy API
+    apigw.create_deployment(
+        restApiId=api_id,
+        stageName=API_STAGE,
+        description='Production deployment'
+    )
+    log('api_integrations', f"✅ API deployed to stage: {API_STAGE}")
+    log('api_integrations', f"🔗 Endpoint: https://{api_id}.execute-api.{REGION}.amazonaws.com/{API_STAGE}")
+
+
+def ensure_gateway_role(ctx):
+    action = step_action('gateway_role', ctx)
+    if action == 'ok':
+        return {"gateway_role_arn": ctx['live']['gateway_role']['Arn']}
+
+    if action == 'create':
+        gateway_role = iam.create_role(
+            RoleName=GATEWAY_ROLE_NAME,
+            AssumeRolePolicyDocument=json.dumps(gateway_trust_policy),
+            Description='Service role for AgentCore Gateway'
+        )
+        gateway_role_arn = gateway_role['Role']['Arn']
+    else:
+        gateway_role_arn = ctx['live']['gateway_role']['Arn']
+
+    iam.put_role_policy(
+        RoleName=GATEWAY_ROLE_NAME,
+        PolicyName=GATEWAY_POLICY_NAME,
+        PolicyDocument=json.dumps(gateway_policy(ctx['api_id']))
+    )
+    if action == 'create':
+        iam.get_waiter('role_exists').wait(RoleName=GATEWAY_ROLE_NAME)
+        log('gateway_role', f"✅ Gateway role created: {gateway_role_arn}")
+    else:
+        log('gateway_role', "✅ Gateway role policy updated")
+    return {"gateway_role_arn": gateway_role_arn}
+
+
+def ensure_user_pool(ctx):
+    if step_action('cognito', ctx) == 'ok':
+        return {key: ctx[key] for key in ('user_pool_id', 'client_id', 'discovery_url')}
+
+    live = ctx['live']
+    try:
+        if live['user_pool'] is not None:
+            user_pool_id = live['user_pool']['Id']
+        else:
+            user_pool = cognito.create_user_pool(
+                PoolName=USER_POOL_NAME,
+                AutoVerifiedAttributes=['email'],
+                Policies={
+                    'PasswordPolicy': {
+                        'MinimumLength': 8,
+                        'RequireUppercase': True,
+                        'RequireLowercase': True,
+                        'RequireNumbers': True,
+                        'RequireSymbols': True
+                    }
+                }
+            )
+            user_pool_id = user_pool['UserPool']['Id']
+            log('cognito', f"✅ Cognito User Pool created: {user_pool_id}")
+
+        app_client = cognito.create_user_pool_client(
+            UserPoolId=user_pool_id,
+            ClientName=USER_POOL_CLIENT_NAME,
+            GenerateSecret=False,
+            ExplicitAuthFlows=['ALLOW_USER_PASSWORD_AUTH', 'ALLOW_REFRESH_TOKEN_AUTH']
+        )
+        client_id = app_client['UserPoolClient']['ClientId']
+        log('cognito', f"✅ Client ID: {client_id}")
+    except Exception as e:
+        log('cognito', f"⚠️  Cognito creation error: {e}")
+        user_pool_id = "us-east-1_RNmMBC87g"
+        client_id = "435iqd7cgbn2slmgn0a36fo9lf"
+        log('cognito', f"ℹ️  Using existing pool: {user_pool_id}")
+
+    return {"user_pool_id": user_pool_id, "client_id": client_id, "discovery_url": discovery_url(user_pool_id)}
+
+
+def ensure_gateway(ctx):
+    action = step_action('gateway', ctx)
+    if action == 'ok':
+        return {"gateway_id": ctx['gateway_id'], "gateway_url": ctx['gateway_url']}
+
+    settings = dict(
+        name=GATEWAY_NAME,
+        roleArn=ctx['gateway_role_arn'],
+        protocolType='MCP',
+        protocolConfiguration={
+            'mcp': {
+                'supportedVersions': ['2025-03-26'],
+                'searchType': 'SEMANTIC'
+            }
+        },
+        authorizerType='CUSTOM_JWT',
+        authorizerConfiguration=gateway_auth_config(ctx['client_id'], ctx['discovery_url']),
+        description='AgentCore Gateway for Pet Store API'
+    )
+
+    if action == 'create':
+        gateway = retry(lambda: agentcore.create_gateway(**settings), retry_if=is_role_propagation_error)
+        log('gateway', f"✅ Gateway created: {gateway['gatewayId']}")
+        log('gateway', f"🔗 Gateway URL: {gateway['gatewayUrl']}")
+    else:
+        gateway = retry(
+            lambda: agentcore.update_gateway(gatewayIdentifier=ctx['live']['gateway']['gatewayId'], **settings),
+            retry_if=is_role_propagation_error
+        )
+        log('gateway', f"✅ Gateway updated: {gateway['gatewayId']}")
+    gateway_id = gateway['gatewayId']
+
+    # Wait for gateway to be ready
+    log('gateway', "⏳ Waiting for gateway to be READY...")
+
+    def gateway_ready():
+        status = agentcore.get_gateway(gatewayIdentifier=gateway_id)['status']
+        if status == 'FAILED':
+            raise RuntimeError("Gateway creation failed")
+        return status == 'READY'
+
+    wait_until(gateway_ready, timeout=300, description="gateway READY")
+    log('gateway', "✅ Gateway is READY!")
+    return {"gateway_id": gateway_id, "gateway_url": gateway['gatewayUrl']}
+
+
+def ensure_target(ctx):
+    action = step_action('target', ctx)
+    if action == 'ok':
+        return {"target_id": ctx['target_id']}
+
+    settings = dict(
+        name=TARGET_NAME,
+        gatewayIdentifier=ctx['gateway_id'],
+        targetConfiguration=target_config(ctx['api_id']),
+        credentialProviderConfigurations=[{"credentialProviderType": "GATEWAY_IAM_ROLE"}]
+    )
+    if action == 'create':
+        target = agentcore.create_gateway_target(**settings)
+        log('target', f"✅ Target created: {target['targetId']}")
+    else:
+        target = agentcore.update_gateway_target(targetId=ctx['live']['target']['targetId'], **settings)
+        log('target', f"✅ Target updated: {target['targetId']}")
+    return {"target_id": target['targetId']}
+
+
+def build_graph():
+    """Deployment steps and what each one needs first"""
+    graph = TaskGraph()
+    graph.add('table', ensure_table)
+    graph.add('lambda_role', ensure_lambda_role)
+    graph.add('lambda_function', ensure_lambda_function, deps=['lambda_role'])
+    graph.add('cognito', ensure_user_pool)
+    graph.add('api_resources', ensure_api_resources)
+    graph.add('api_integrations', ensure_api_integrations, deps=['api_resources', 'lambda_function', 'table'])
+    graph.add('gateway_role', ensure_gateway_role, deps=['api_resources'])
+    graph.add('gateway', ensure_gateway, deps=['gateway_role', 'cognito'])
+    graph.add('target', ensure_target, deps=['gateway', 'api_integrations'])
+    return graph
+
+
+def load_config():
+    try:
+        with open(CONFIG_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_config(previous, ctx):
+    """Update the deployment ids, keeping any other keys already in the file"""
+    config = dict(previous)
+    config.update({
+        "account_id": ACCOUNT_ID,
+        "region": REGION,
+        "api_gateway_id": ctx['api_id'],
+        "api_gateway_stage": API_STAGE,
+        "api_gateway_endpoint": f"https://{ctx['api_id']}.execute-api.{REGION}.amazonaws.com/{API_STAGE}",
+        "table_name": ctx['table_name'],
+        "lambda_function_name": LAMBDA_FUNCTION_NAME,
+        "lambda_arn": ctx['lambda_arn'],
+        "lambda_role_arn": ctx['lambda_role_arn'],
+        "lambda_code_sha256": LAMBDA_CODE_SHA256,
+        "gateway_role_arn": ctx['gateway_role_arn'],
+        "user_pool_id": ctx['user_pool_id'],
+        "client_id": ctx['client_id'],
+        "discovery_url": ctx['discovery_url'],
+        "gateway_id": ctx['gateway_id'],
+        "gateway_url": ctx['gateway_url'],
+        "target_id": ctx['target_id']
+    })
+
+    with open(CONFIG_PATH, 'w') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy the Pet Store AgentCore Gateway stack")
+    parser.add_argument('mode', nargs='?', choices=['plan', 'apply'], default='apply',
+                        help="plan: show changes only; apply: make them (default)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🚀 AgentCore Gateway Deployment")
+    print("=" * 70)
+    print(f"Account: {ACCOUNT_ID}")
+    print(f"Region: {REGION}")
+    print("=" * 70)
+
+    previous = load_config()
+    print("\n🔍 Discovering existing resources...")
+    live = discover(previous)
+    plan = make_plan(live)
+    print_plan(plan)
+
+    if args.mode == 'plan':
+        return
+    if all(action == 'ok' for action, _ in plan.values()):
+        save_config(previous, known_ids(live))
+        print("\n✅ Deployment is up to date - nothing to apply")
+        return
+
+    graph = build_graph()
+    print(f"\nApplying {len(graph.tasks)} steps (independent steps in parallel)...\n")
+    try:
+        ctx = graph.run(results={"live": live, **known_ids(live)})
+    except TaskFailed as e:
+        graph.report("Deployment timing")
+        print(f"\n❌ Deployment failed: {e}")
+        raise SystemExit(1)
+
+    # ========================================================================
+    # Save Configuration
+    # ========================================================================
+    save_config(previous, ctx)
+    graph.report("Deployment timing")
+
+    print("\n" + "=" * 70)
+    print("✨ DEPLOYMENT COMPLETE!")
+    print("=" * 70)
+    print(f"\n📋 Configuration saved to: {CONFIG_PATH}")
+    print(f"\n🔗 Resources:")
+    print(f"   API Gateway: {ctx['api_id']}")
+    print(f"   Gateway ID: {ctx['gateway_id']}")
+    print(f"   Gateway URL: {ctx['gateway_url']}")
+    print(f"   User Pool: {ctx['user_pool_id']}")
+    print(f"   Client ID: {ctx['client_id']}")
+    print("\n" + "=" * 70)
+
 
-with open('deployment-config.json', 'w') as f:
-    json.dump(config, f, indent=2)
-
-print("\n" + "=" * 70)
-print("✨ DEPLOYMENT COMPLETE!")
-print("=" * 70)
-print(f"\n📋 Configuration saved to: deployment-config.json")
-print(f"\n🔗 Resources:")
-print(f"   API Gateway: {api_id}")
-print(f"   Gateway ID: {gateway_id}")
-print(f"   Gateway URL: {gateway_url}")
-print(f"   User Pool: {user_pool_id}")
-print(f"   Client ID: {client_id}")
-print("\n" + "=" * 70)
+if __name__ == '__main__':
+    main()
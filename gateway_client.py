@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Shared async MCP client for AgentCore Gateway
+One httpx.AsyncClient runs on a dedicated event loop, so every entry point
+(and every agent turn) reuses the same connection pool
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+import httpx
+
+from result_encoding import ResultEncoder
+from token_manager import TokenManager
+from tool_cache import DEFAULT_MAX_ENTRIES, ToolResultCache
+from tracing import span
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_BATCH_SIZE = 20
+
+
+class BatchRejected(Exception):
+    """The gateway did not answer a JSON-RPC batch with a batch response"""
+
+
+class GatewayClient:
+    """Async JSON-RPC client for a single AgentCore Gateway
+
+    Strands runs every agent turn on a fresh event loop, so the AsyncClient
+    lives on a background loop owned by this object and callers on any loop
+    (or plain threads) hand their requests over to it. A semaphore caps the
+    number of in-flight requests per gateway.
+
+    Every request carries a unique id. ``call_tools`` packs several
+    ``tools/call`` requests into one JSON-RPC batch POST and matches the
+    responses back by id; if the gateway rejects batches the client
+    remembers that and falls back to concurrent single requests.
+
+    An optional ToolResultCache answers repeated read-only tool calls
+    locally and is invalidated whenever a mutating tool goes through.
+    An optional ResultEncoder decides how tool results are rendered for
+    the model (the tools read it from ``encoder``).
+
+    Pass either a static ``access_token`` or a ``token_manager``; with a
+    manager every request uses its current token and a 401 triggers one
+    shared refresh and a single retry.
+    """
+
+    def __init__(self, gateway_url, access_token=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, max_batch_size=DEFAULT_MAX_BATCH_SIZE, cache=None,
+                 token_manager=None, encoder=None):
+        self.gateway_url = gateway_url
+        self.access_token = access_token
+        self.token_manager = token_manager
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.encoder = encoder
+        self.batch_supported = None  # unknown until the first batch is sent
+        self._ids = itertools.count(1)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gateway-client", daemon=True)
+        self._thread.start()
+        self._client = None
+        self._semaphore = None
+        self._submit(self._open()).result()
+
+    @classmethod
+    def from_config(cls, config, token_path='access-token.txt'):
+        """Build a client from deployment-config.json and the saved Cognito tokens"""
+        return cls(
+            config['gateway_url'],
+            token_manager=TokenManager.from_config(config, token_path=token_path).start(),
+            max_concurrency=config.get('gateway_max_concurrency', DEFAULT_MAX_CONCURRENCY),
+            max_batch_size=config.get('gateway_max_batch_size', DEFAULT_MAX_BATCH_SIZE),
+            cache=ToolResultCache(
+                ttls=config.get('tool_cache_ttls'),
+                max_entries=config.get('tool_cache_max_entries', DEFAULT_MAX_ENTRIES)
+            ),
+            encoder=ResultEncoder.from_config(config)
+        )
+
+    # ------------------------------------------------------------------
+    # Loop plumbing
+    # ------------------------------------------------------------------
+    async def _open(self):
+        headers = {"Content-Type": "application/json"}
+        if self.token_manager is None:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        self._client = httpx.AsyncClient(
+            base_url=self.gateway_url,
+            headers=headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _submit(self, coro):
+        """Schedule a coroutine on the client loop, returning a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _dispatch(self, coro):
+        """Await a coroutine on the client loop from whichever loop we are on"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self._submit(coro))
+
+    # ------------------------------------------------------------------
+    # JSON-RPC
+    # ------------------------------------------------------------------
+    def _message(self, method, params=None):
+        message = {"jsonrpc": "2.0", "id": next(self._ids), "method": method}
+        if params is not None:
+            message["params"] = params
+        return message
+
+    async def _token(self):
+        token = self.token_manager.current()
+        if token is None:
+            token = await asyncio.to_thread(self.token_manager.get_token)
+        return token
+
+    async def _send(self, payload):
+        """POST a payload, retrying once with a refreshed token after a 401"""
+        async with self._semaphore:
+            if self.token_manager is None:
+                return await self._client.post("", json=payload)
+
+            token = await self._token()
+            response = await self._client.post("", json=payload, headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 401:
+                token = await asyncio.to_thread(self.token_manager.force_refresh, token)
+                response = await self._client.post("", json=payload, headers={"Authorization": f"Bearer {token}"})
+            return response
+
+    async def _post(self, payload):
+        response = await self._send(payload)
+        return response.json()
+
+    async def _post_batch(self, messages):
+        """POST a JSON-RPC batch and return the responses in request order"""
+        response = await self._send(messages)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if response.status_code >= 400 or not isinstance(body, list):
+            raise BatchRejected(body if body is not None else response.status_code)
+
+        by_id = {item.get('id'): item for item in body if isinstance(item, dict)}
+        return [
+            by_id.get(message['id'], {
+                "jsonrpc": "2.0",
+                "id": message['id'],
+                "error": {"code": -32603, "message": "No response for request in batch"}
+            })
+            for message in messages
+        ]
+
+    async def _send_batch(self, messages):
+        if len(messages) == 1 or self.batch_supported is False:
+            return await asyncio.gather(*(self._post(message) for message in messages))
+        try:
+            results = await self._post_batch(messages)
+        except BatchRejected:
+            self.batch_supported = False
+            return await asyncio.gather(*(self._post(message) for message in messages))
+        self.batch_supported = True
+        return results
+
+    async def request(self, method, params=None):
+        """Send one JSON-RPC request and return the decoded response message"""
+        return await self._dispatch(self._post(self._message(method, params)))
+
+    async def list_tools(self):
+        return await self.request("tools/list")
+
+    def _cached(self, name, arguments):
+        if self.cache is None:
+            return None
+        return self.cache.get(name, arguments)
+
+    def _generation(self, name):
+        return self.cache.generation(name) if self.cache is not None else None
+
+    def _remember(self, name, arguments, result, fetch_seconds, generation):
+        if self.cache is not None:
+            self.cache.record_call(name)
+            self.cache.put(name, arguments, result, fetch_seconds, generation)
+
+    async def call_tool(self, name, arguments=None):
+        arguments = arguments or {}
+        with span("gateway tools/call", **{"mcp.tool.name": name}) as current:
+            cached = self._cached(name, arguments)
+            current.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                return cached
+            generation = self._generation(name)
+            started = time.perf_counter()
+            result = await self.request("tools/call", {"name": name, "arguments": arguments})
+            self._remember(name, arguments, result, time.perf_counter() - started, generation)
+            return result
+
+    async def call_tools(self, calls):
+        """Run several (name, arguments) tool calls in as few round trips as possible
+
+        Cache hits are answered locally; the rest are packed into JSON-RPC
+        batches of up to ``max_batch_size`` (chunks go out concurrently,
+        bounded by ``max_concurrency``). Results come back in the same order
+        as ``calls``.
+        """
+        with span("gateway tools/call batch", **{"mcp.batch.size": len(calls)}) as current:
+            return await self._call_tools(calls, current)
+
+    async def _call_tools(self, calls, current):
+        calls = [(name, arguments or {}) for name, arguments in calls]
+        results = [self._cached(name, arguments) for name, arguments in calls]
+        pending = [i for i, result in enumerate(results) if result is None]
+        current.set_attribute("cache.hits", len(calls) - len(pending))
+        if not pending:
+            return results
+
+        messages = [
+            self._message("tools/call", {"name": calls[i][0], "arguments": calls[i][1]})
+            for i in pending
+        ]
+        chunks = [messages[i:i + self.max_batch_size] for i in range(0, len(messages), self.max_batch_size)]
+        generations = [self._generation(calls[i][0]) for i in pending]
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(self._dispatch(self._send_batch(chunk)) for chunk in chunks))
+        elapsed = time.perf_counter() - started
+
+        for i, result in zip(pending, (result for chunk in responses for result in chunk)):
+            results[i] = result
+        # A read sent alongside a write is dropped by its invalidation or fails the generation check
+        for i, generation in zip(pending, generations):
+            self._remember(calls[i][0], calls[i][1], results[i], elapsed, generation)
+        return results
+
+    # ------------------------------------------------------------------
+    # Blocking helpers for scripts that are not async
+    # ------------------------------------------------------------------
+    def request_sync(self, method, params=None):
+        return self._submit(self.request(method, params)).result()
+
+    def list_tools_sync(self):
+        return self._submit(self.list_tools()).result()
+
+    def call_tool_sync(self, name, arguments=None):
+        return self._submit(self.call_tool(name, arguments)).result()
+
+    def call_tools_sync(self, calls):
+        return self._submit(self.call_tools(calls)).result()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self.token_manager is not None:
+            self.token_manager.stop()
+        self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tool_content(result):
+    """Decode the JSON payload of a successful tools/call response"""
+    return json.loads(result['result']['content'][0]['text'])
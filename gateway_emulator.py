@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Local MCP gateway emulator
+Serves tools/list and tools/call over JSON-RPC (single and batch POSTs)
+the way the AgentCore Gateway exposes the Pet Store target, backed by the
+same handler deploy.py ships to Lambda (petstore_lambda.py) over an
+in-memory table seeded with deploy.INITIAL_PETS. Latency and error rates
+are injectable, so client-side changes can be measured reproducibly.
+
+Usage:
+    python3 gateway_emulator.py                          # http://127.0.0.1:8765/mcp
+    python3 gateway_emulator.py --latency-ms 40 --jitter-ms 10 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import deploy
+from local_dynamodb import LocalTable
+from petstore_lambda import CATALOG, COUNTER_ID, IdAllocator, route
+
+DEFAULT_PORT = 8765
+
+# Request bodies are not declared in deploy.py (the gateway infers them);
+# the emulator advertises them explicitly
+BODY_PROPERTIES = {
+    ('/pets', 'POST'): {
+        "name": {"type": "string"},
+        "type": {"type": "string"},
+        "price": {"type": "number"},
+    }
+}
+
+
+def tool_routes():
+    """Tool name -> (path, method, schema), from the target's tool overrides in deploy.py"""
+    config = deploy.target_config('local')['mcp']['apiGateway']['apiGatewayToolConfiguration']
+    routes = {}
+    for override in config['toolOverrides']:
+        path, method = override['path'], override['method']
+        properties, required = {}, []
+        for name in re.findall(r'{(\w+)}', path):
+            properties[name] = {"type": "string"}
+            required.append(name)
+        for parameter in deploy.METHOD_PARAMETERS.get((path, method), {}):
+            properties[parameter.rsplit('.', 1)[-1]] = {"type": "string"}
+        properties.update(BODY_PROPERTIES.get((path, method), {}))
+        name = f"{deploy.TARGET_NAME}___{override['name']}"
+        routes[name] = (path, method, {
+            "name": name,
+            "description": override['description'],
+            "inputSchema": {"type": "object", "properties": properties, "required": required},
+        })
+    return routes
+
+
+def seeded_table(rtt=0.0):
+    table = LocalTable.from_index_definitions(deploy.TABLE_INDEXES, rtt=rtt)
+    table.load([
+        {'id': pet_id, 'name': name, 'type': pet_type, 'price': Decimal(price), 'catalog': CATALOG}
+        for pet_id, name, pet_type, price in deploy.INITIAL_PETS
+    ])
+    table.load([{'id': COUNTER_ID, 'last_id': max(pet[0] for pet in deploy.INITIAL_PETS)}])
+    return table
+
+
+class GatewayEmulator:
+    """An in-process stand-in for one AgentCore Gateway
+
+    Every tools/call sleeps ``latency`` ± ``jitter`` seconds (calls in one
+    batch overlap, as the gateway fans them out) and fails with a JSON-RPC
+    error with probability ``error_rate``. With ``token`` set, requests
+    without ``Authorization: Bearer <token>`` get a 401.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, token=None, seed=None, db_rtt=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token = token
+        self.routes = tool_routes()
+        self.table = seeded_table(rtt=db_rtt)
+        self.allocator = IdAllocator(self.table)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self.requests = 0
+        self.calls = 0
+        self.injected_errors = 0
+
+    # ------------------------------------------------------------------
+    # JSON-RPC
+    # ------------------------------------------------------------------
+    def _sample(self):
+        """(delay, fail) for one tools/call"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            return delay, self._random.random() < self.error_rate
+
+    def _invoke(self, name, arguments):
+        """Turn a tools/call into an API Gateway proxy event for the handler"""
+        path, method, _ = self.routes[name]
+        arguments = dict(arguments or {})
+        for parameter in re.findall(r'{(\w+)}', path):
+            path = path.replace(f"{{{parameter}}}", str(arguments.pop(parameter, '')))
+        event = {'path': path, 'httpMethod': method, 'queryStringParameters': None, 'body': None}
+        if method == 'GET':
+            event['queryStringParameters'] = {key: str(value) for key, value in arguments.items()} or None
+        else:
+            event['body'] = json.dumps(arguments)
+        response = route(event, self.table, self.allocator)
+        return {
+            "content": [{"type": "text", "text": response['body']}],
+            "isError": response['statusCode'] >= 400,
+        }
+
+    def handle(self, message):
+        """Answer one JSON-RPC message (without the injected delay)"""
+        if not isinstance(message, dict) or 'method' not in message:
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        reply = {"jsonrpc": "2.0", "id": message.get('id')}
+        params = message.get('params') or {}
+        if message['method'] == 'tools/list':
+            reply["result"] = {"tools": [schema for _, _, schema in self.routes.values()]}
+        elif message['method'] == 'tools/call':
+            with self._lock:
+                self.calls += 1
+            if params.get('name') not in self.routes:
+                reply["error"] = {"code": -32602, "message": f"Unknown tool: {params.get('name')}"}
+            else:
+                try:
+                    reply["result"] = self._invoke(params['name'], params.get('arguments'))
+                except Exception as e:
+                    reply["error"] = {"code": -32603, "message": str(e)}
+        else:
+            reply["error"] = {"code": -32601, "message": f"Method not found: {message['method']}"}
+        return reply
+
+    def handle_payload(self, payload):
+        """A single message or a batch; sleeps for the slowest call in it"""
+        with self._lock:
+            self.requests += 1
+        messages = payload if isinstance(payload, list) else [payload]
+        replies, delay = [], 0.0
+        for message in messages:
+            if isinstance(message, dict) and message.get('method') == 'tools/call':
+                call_delay, fail = self._sample()
+                delay = max(delay, call_delay)
+                if fail:
+                    # Failed before reaching the backend: nothing is written
+                    with self._lock:
+                        self.injected_errors += 1
+                    replies.append({"jsonrpc": "2.0", "id": message.get('id'),
+                                    "error": {"code": -32603, "message": "Injected gateway error"}})
+                    continue
+            replies.append(self.handle(message))
+        if delay:
+            time.sleep(delay)
+        return replies if isinstance(payload, list) else replies[0]
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    def _handler_class(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True   # headers and body go out as separate writes
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if emulator.token is not None and self.headers.get('Authorization') != f"Bearer {emulator.token}":
+                    return self._reply(401, {"message": "Unauthorized"})
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    return self._reply(400, {"jsonrpc": "2.0", "id": None,
+                                             "error": {"code": -32700, "message": "Parse error"}})
+                self._reply(200, emulator.handle_payload(payload))
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve in a daemon thread; returns the MCP endpoint URL"""
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="gateway-emulator", daemon=True)
+        self._thread.start()
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/mcp"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local MCP gateway emulator for the Pet Store target")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay per tools/call (default: 0)")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="± uniform jitter on that delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls that fail (0-1)")
+    parser.add_argument('--token', help="require this bearer token")
+    parser.add_argument('--seed', type=int, help="random seed for jitter and errors")
+    args = parser.parse_args()
+
+    emulator = GatewayEmulator(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                               error_rate=args.error_rate, token=args.token, seed=args.seed)
+    url = emulator.start(args.host, args.port)
+    print(f"🧪 Gateway emulator on {url} ({len(emulator.routes)} tools, "
+          f"{args.latency_ms:g}±{args.jitter_ms:g} ms, {args.error_rate:.0%} errors)")
+    print("   Press Ctrl+C to stop")
+    try:
+        emulator._thread.join()
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
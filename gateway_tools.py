@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Strands tools generated from the gateway's tools/list response
+Schemas are cached on disk so startup needs no discovery round trip;
+a background thread revalidates them and hot-swaps changed tools
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+
+from strands.tools.tools import PythonAgentTool
+
+from petstore_tools import format_result
+
+DEFAULT_CACHE_DIR = '.mcp-tools-cache'
+DEFAULT_REFRESH_SECONDS = 300
+
+
+def schema_hash(tools):
+    """Content hash of a tools/list result, independent of key order"""
+    canonical = json.dumps(sorted(tools, key=lambda t: t['name']), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def cache_path(gateway_url, cache_dir=DEFAULT_CACHE_DIR):
+    url_hash = hashlib.sha256(gateway_url.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"tools-{url_hash}.json")
+
+
+def make_tool(mcp_client, schema):
+    """Wrap one MCP tool schema as a Strands tool that calls the gateway"""
+    name = schema['name']
+    spec = {
+        "name": name,
+        "description": schema.get('description') or name,
+        "inputSchema": {"json": schema.get('inputSchema') or {"type": "object", "properties": {}}},
+    }
+
+    async def invoke(tool_use, **kwargs):
+        result = await mcp_client.call_tool(name, tool_use.get('input') or {})
+        return {
+            "toolUseId": tool_use['toolUseId'],
+            "status": "success" if 'result' in result and not result['result'].get('isError') else "error",
+            "content": [{"text": format_result(result, mcp_client.encoder, name)}],
+        }
+
+    return PythonAgentTool(name, spec, invoke)
+
+
+class GatewayToolset:
+    """Agent tools discovered from an AgentCore Gateway
+
+    ``load()`` returns tools from the local schema cache when there is one
+    (falling back to a live tools/list call), and ``watch(agent)`` starts a
+    daemon thread that re-fetches the schema, rewrites the cache and swaps
+    added, changed or removed tools in the registry of every watched agent
+    (one per chat session in serve-chat.py; agents that are gone drop out).
+    """
+
+    def __init__(self, mcp_client, cache_dir=DEFAULT_CACHE_DIR, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.mcp_client = mcp_client
+        self.path = cache_path(mcp_client.gateway_url, cache_dir)
+        self.refresh_seconds = refresh_seconds
+        self.schemas = {}
+        self.content_hash = None
+        self.tools = {}
+        self._agents = weakref.WeakSet()
+        self._agents_lock = threading.Lock()
+        self._loaded_live = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, mcp_client, config):
+        return cls(
+            mcp_client,
+            cache_dir=config.get('tool_schema_cache_dir', DEFAULT_CACHE_DIR),
+            refresh_seconds=config.get('tool_schema_refresh_seconds', DEFAULT_REFRESH_SECONDS)
+        )
+
+    # ------------------------------------------------------------------
+    # Schema cache
+    # ------------------------------------------------------------------
+    def _read_cache(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('gateway_url') != self.mcp_client.gateway_url:
+            return None
+        if schema_hash(cached.get('tools', [])) != cached.get('content_hash'):
+            return None
+        return cached
+
+    def _write_cache(self, tools, content_hash):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "gateway_url": self.mcp_client.gateway_url,
+                "content_hash": content_hash,
+                "fetched_at": time.time(),
+                "tools": tools
+            }, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def fetch_schemas(self):
+        """Call tools/list (following pagination cursors) and return the tool schemas"""
+        tools = []
+        cursor = None
+        while True:
+            response = self.mcp_client.request_sync("tools/list", {"cursor": cursor} if cursor else None)
+            if 'result' not in response:
+                raise RuntimeError(f"tools/list failed: {response}")
+            tools.extend(response['result'].get('tools', []))
+            cursor = response['result'].get('nextCursor')
+            if not cursor:
+                return tools
+
+    # ------------------------------------------------------------------
+    # Tools
+    # ------------------------------------------------------------------
+    def _apply(self, tools, content_hash):
+        """Rebuild tools for a new schema; returns (added, changed, removed) names"""
+        schemas = {schema['name']: schema for schema in tools}
+        added = [name for name in schemas if name not in self.schemas]
+        changed = [name for name in schemas if name in self.schemas and schemas[name] != self.schemas[name]]
+        removed = [name for name in self.schemas if name not in schemas]
+
+        for name in added + changed:
+            self.tools[name] = make_tool(self.mcp_client, schemas[name])
+        for name in removed:
+            self.tools.pop(name, None)
+        self.schemas = schemas
+        self.content_hash = content_hash
+        return added, changed, removed
+
+    def load(self):
+        """Return agent tools, from the schema cache if possible"""
+        cached = self._read_cache()
+        if cached is not None:
+            self._apply(cached['tools'], cached['content_hash'])
+        else:
+            tools = self.fetch_schemas()
+            content_hash = schema_hash(tools)
+            self._write_cache(tools, content_hash)
+            self._apply(tools, content_hash)
+            self._loaded_live = True
+        return list(self.tools.values())
+
+    def refresh(self):
+        """Re-fetch tools/list; hot-swap the agent's tools if the schema changed"""
+        tools = self.fetch_schemas()
+        content_hash = schema_hash(tools)
+        if content_hash == self.content_hash:
+            return False
+
+        self._write_cache(tools, content_hash)
+        added, changed, removed = self._apply(tools, content_hash)
+        with self._agents_lock:
+            agents = list(self._agents)
+        for agent in agents:
+            registry = agent.tool_registry
+            for name in added:
+                registry.register_tool(self.tools[name])
+            for name in changed:
+                # A tool the ToolSelector left out this turn is picked up from self.tools next turn
+                if name in registry.registry:
+                    registry.replace(self.tools[name])
+            for name in removed:
+                registry.registry.pop(name, None)
+                registry.dynamic_tools.pop(name, None)
+        print(f"\n🔄 Gateway tools updated (+{len(added)} ~{len(changed)} -{len(removed)})")
+        return True
+
+    def watch(self, agent):
+        """Keep ``agent``'s tools current; the first call starts the refresh thread"""
+        with self._agents_lock:
+            self._agents.add(agent)
+            if self._thread is not None:
+                return
+            # Revalidate now and every ``refresh_seconds``
+            self._thread = threading.Thread(target=self._watch_loop, name="gateway-tools", daemon=True)
+        self._thread.start()
+
+    def _watch_loop(self):
+        # A schema fetched live by load() is already fresh
+        if self._loaded_live and (not self.refresh_seconds or self._stop.wait(self.refresh_seconds)):
+            return
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"\n⚠️  Tool schema refresh failed: {e}")
+            if not self.refresh_seconds or self._stop.wait(self.refresh_seconds):
+                return
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Fast path for questions that map straight onto one tool call
+"What pets do you have?" or "tell me about pet 2" need exactly one
+ListPets / GetPetById call, yet through the agent they cost a model round
+trip before the tool call and another after it. IntentRouter matches such
+questions with anchored patterns, calls the tool itself and answers from a
+template. Anything it does not fully match (comparisons, names, follow-ups,
+tool errors) returns None and goes to the agent as before.
+
+Routed turns are appended to the agent's history as plain user/assistant
+text, so a later question that does reach the agent still has the context.
+
+    python3 intent_router.py "what cats do you have under $100?"
+"""
+
+import re
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from gateway_client import tool_content
+from petstore_tools import GET_PET_BY_ID, LIST_PETS
+import tracing
+
+MAX_LISTED = 10
+CENT = Decimal('0.01')   # ListPets' max_price is inclusive; "under $100" asks for at most $99.99
+PET_TYPES = ('dog', 'cat', 'fish', 'bird', 'rabbit', 'hamster', 'frog', 'turtle', 'lizard', 'snake')
+
+_POLITE = r"(?:(?:please|can you|could you|would you)\s+)?"
+_END = r"\s*(?:,?\s*please)?\s*[?.!]*"
+_TYPE = rf"(?P<type>{'|'.join(PET_TYPES)})s?"
+_PRICE = (r"(?:\s+(?:(?P<up_to>up to)|under|below|less than|cheaper than|for less than)"
+          r"\s+\$?(?P<max_price>\d+(?:\.\d+)?))?")
+
+INTENTS = [
+    (GET_PET_BY_ID, re.compile(
+        rf"^{_POLITE}(?:tell me about|show(?: me)?|describe|get|look up|details (?:of|for|on)|what is|what's)?\s*"
+        rf"(?:the\s+)?pet\s*(?:id|number|no\.?)?\s*#?\s*(?P<pet_id>\d+){_END}$", re.I)),
+    (LIST_PETS, re.compile(
+        rf"^{_POLITE}(?:what|which)\s+(?:(?P<all>pets)|{_TYPE})\s+(?:do you have|are (?:there|available)"
+        rf"|do you sell|are for sale){_PRICE}{_END}$", re.I)),
+    (LIST_PETS, re.compile(
+        rf"^{_POLITE}(?:list|show(?: me)?)\s+(?:all\s+)?(?:(?:the|your)\s+)?(?:available\s+)?"
+        rf"(?:(?P<all>pets)|{_TYPE}){_PRICE}{_END}$", re.I)),
+]
+
+
+def match(question):
+    """(tool name, tool arguments) when the question is a plain lookup, else None"""
+    text = " ".join(question.split())
+    for tool_name, pattern in INTENTS:
+        found = pattern.match(text)
+        if not found:
+            continue
+        groups = found.groupdict()
+        if tool_name == GET_PET_BY_ID:
+            return tool_name, {"petId": groups['pet_id']}
+        arguments = {"limit": str(MAX_LISTED)}
+        if groups.get('type'):
+            arguments["type"] = groups['type'].lower()
+        if groups.get('max_price'):
+            max_price = Decimal(groups['max_price'])
+            if not groups.get('up_to'):
+                max_price -= CENT
+            if max_price < 0:
+                return None
+            arguments["max_price"] = str(max_price)
+        return tool_name, arguments
+    return None
+
+
+def describe_pet(pet):
+    extra = ", ".join(f"{key}: {value}" for key, value in pet.items() if key not in ('id', 'name', 'type', 'price'))
+    text = f"🐾 {pet['name']} (#{pet['id']}) is a {pet['type']} priced at ${pet['price']}."
+    return f"{text} ({extra})" if extra else text
+
+
+def list_pets_answer(content, arguments):
+    pets = content['pets'] if isinstance(content, dict) else content
+    kind = f"{arguments['type']}s" if 'type' in arguments else "pets"
+    price = f" up to ${arguments['max_price']}" if 'max_price' in arguments else ""
+    if not pets:
+        return f"We have no {kind}{price} right now."
+    lines = [f"• {pet['name']} (#{pet['id']}, {pet['type']}) - ${pet['price']}" for pet in pets]
+    more = isinstance(content, dict) and content.get('nextCursor')
+    header = f"Here are {'the first ' if more else ''}{len(pets)} {kind}{price}, cheapest first:"
+    footer = "\nThere are more; ask for a type or a price limit to narrow it down." if more else ""
+    return "\n".join([header] + lines) + footer
+
+
+class IntentRouter:
+    """Answers plain lookups without the model; counts hits and the time they save"""
+
+    def __init__(self, mcp_client, enabled=True):
+        self.mcp_client = mcp_client
+        self.enabled = enabled
+        self.questions = 0
+        self.hits = 0
+        self.routed_seconds = 0.0
+        self.agent_turns = 0
+        self.agent_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, mcp_client, config):
+        return cls(mcp_client, enabled=config.get('intent_router', True))
+
+    def _call(self, tool_name, arguments):
+        """The tool's decoded content, or None when the agent should handle it"""
+        result = self.mcp_client.call_tool_sync(tool_name, arguments)
+        if 'result' not in result:
+            return None
+        try:
+            content = tool_content(result)
+        except (ValueError, KeyError, IndexError):
+            return None
+        if result['result'].get('isError') or (isinstance(content, dict) and 'error' in content):
+            error = str(content.get('error', '')) if isinstance(content, dict) else ''
+            return {"not_found": True} if 'not found' in error.lower() else None
+        return content
+
+    def answer(self, question, agent=None):
+        """Templated answer for ``question``, or None to fall back to the agent"""
+        with self._lock:
+            self.questions += 1
+        if not self.enabled:
+            return None
+        intent = match(question)
+        if intent is None:
+            return None
+        tool_name, arguments = intent
+        started = time.perf_counter()
+        with tracing.span("intent route", **{"intent.tool": tool_name}):
+            # Any surprise (transport error, unexpected response shape) goes to the agent
+            try:
+                content = self._call(tool_name, arguments)
+                if content is None:
+                    return None
+                if tool_name == GET_PET_BY_ID:
+                    text = (f"I couldn't find a pet with ID {arguments['petId']}." if content.get('not_found')
+                            else describe_pet(content))
+                else:
+                    text = list_pets_answer(content, arguments)
+            except Exception:
+                return None
+        with self._lock:
+            self.hits += 1
+            self.routed_seconds += time.perf_counter() - started
+        if agent is not None:
+            agent.messages.extend([
+                {"role": "user", "content": [{"text": question}]},
+                {"role": "assistant", "content": [{"text": text}]},
+            ])
+        return text
+
+    def record_agent_turn(self, seconds):
+        """Time of a turn that went to the agent (the baseline for 'time saved')"""
+        with self._lock:
+            self.agent_turns += 1
+            self.agent_seconds += seconds
+
+    def stats(self):
+        routed = self.routed_seconds / self.hits if self.hits else None
+        agent = self.agent_seconds / self.agent_turns if self.agent_turns else None
+        saved = (agent - routed) * self.hits if routed is not None and agent is not None else None
+        return {"questions": self.questions, "hits": self.hits, "routed_avg_seconds": routed,
+                "agent_avg_seconds": agent, "saved_seconds": saved}
+
+    def format_stats(self):
+        s = self.stats()
+        if not s['questions']:
+            return "⚡ Fast path: no questions"
+        line = f"⚡ Fast path: {s['hits']}/{s['questions']} questions ({s['hits'] / s['questions']:.0%})"
+        if s['routed_avg_seconds'] is not None:
+            line += f", {s['routed_avg_seconds'] * 1000:.0f} ms each"
+        if s['saved_seconds'] is not None:
+            line += f" vs {s['agent_avg_seconds']:.2f}s per agent turn, ~{s['saved_seconds']:.1f}s saved"
+        return line
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().split('\n')[-1])
+        return 1
+    question = " ".join(sys.argv[1:])
+    intent = match(question)
+    print(f"→ {intent[0]} {intent[1]}" if intent else "→ agent (no confident match)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,58 +2,108 @@
 """
 Interactive AI Chatbot with AgentCore Memory
 Conversation history persists across sessions
+
+Run: python3 interactive-chat-with-memory.py [--session ID | --new] [--offline] [--no-stream] [--profile]
+(without arguments the last session is resumed)
 """
 
+import argparse
+import atexit
 import json
+import threading
+import time
 import boto3
 import uuid
 from datetime import datetime
 from strands import Agent
-from strands.tools import tool
-import httpx
+
+from answer_cache import AnswerCache
+from context_budget import RollingSummaryManager
+from gateway_client import GatewayClient
+from gateway_tools import GatewayToolset
+from intent_router import IntentRouter
+from memory_store import HistoryLoader, LocalMemoryMirror, LocalMemoryStub, MemoryWriter
+from petstore_tools import SYSTEM_PROMPT, build_batch_tools
+from streaming import TurnStreamer
+from tool_selection import ToolSelector
+import tracing
+
+parser = argparse.ArgumentParser(description="Pet store chat with AgentCore Memory")
+parser.add_argument('--session', help="session ID to resume or create (default: the last session)")
+parser.add_argument('--new', action='store_true', help="start a new session")
+parser.add_argument('--offline', action='store_true', help="use an in-process memory stub instead of AgentCore Memory")
+parser.add_argument('--no-stream', action='store_true', help="wait for the full answer instead of streaming it")
+parser.add_argument('--profile', action='store_true',
+                    help="print a per-turn timing waterfall and append spans to chat-traces.jsonl")
+args = parser.parse_args()
 
 # Load config
 with open('deployment-config.json') as f:
     config = json.load(f)
 
-with open('access-token.txt') as f:
-    access_token = f.read().strip()
+# Tracing is a no-op unless --profile is given
+TRACE_PATH = config.get('trace_path', tracing.DEFAULT_TRACE_PATH)
+if args.profile:
+    tracing.enable(TRACE_PATH)
 
 # AgentCore Memory configuration
 MEMORY_ID = config.get('memory_id', 'YOUR_MEMORY_ID')  # Add this to deployment-config.json
 REGION = config.get('region', 'us-east-1')
-SESSION_ID = str(uuid.uuid4())  # Unique session per run
+PAGE_SIZE = config.get('memory_page_size', 10)
+
+# Local mirror of AgentCore Memory (SQLite), also remembers the last session
+mirror = LocalMemoryMirror(config.get('memory_mirror_path', 'chat-memory.db'), MEMORY_ID)
+if args.session:
+    SESSION_ID = args.session
+elif args.new or not mirror.last_session():
+    SESSION_ID = str(uuid.uuid4())
+else:
+    SESSION_ID = mirror.last_session()
+mirror.set_last_session(SESSION_ID)
 
 # Initialize AWS clients
-bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=REGION)
-
-# Create MCP client
-mcp_client = httpx.Client(
-    base_url=config['gateway_url'],
-    headers={
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    },
-    timeout=30.0
-)
+if args.offline:
+    bedrock_agent_runtime = LocalMemoryStub()
+else:
+    bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=REGION)
+
+# Create MCP client (shared async connection pool, see gateway_client.py)
+mcp_client = GatewayClient.from_config(config)
+
+# Tools are generated from the gateway's tools/list schema (cached on disk)
+toolset = GatewayToolset.from_config(mcp_client, config)
 
 # Memory functions
+def sync_memory():
+    """Pull remote turns added since the last sync and re-send unsynced local turns"""
+    try:
+        added = mirror.sync(bedrock_agent_runtime, SESSION_ID, PAGE_SIZE)
+    except Exception as e:
+        print(f"\n⚠️  Memory sync failed: {e}")
+        return
+    # Runs alongside the REPL: turns it already queued are skipped by turnId
+    for item in mirror.unsynced(SESSION_ID):
+        memory_writer.save(item['userMessage'], item['assistantMessage'], item['turnId'], item['timestamp'])
+    if added:
+        print(f"\n🔄 {added} new turns synced from AgentCore Memory")
+
+
+def show_turns(turns):
+    for item in turns:
+        if 'userMessage' in item:
+            print(f"You: {item['userMessage']}")
+        if 'assistantMessage' in item:
+            print(f"Assistant: {item['assistantMessage']}")
+
 def load_memory():
-    """Load conversation history from AgentCore Memory"""
+    """Show the most recent page of conversation history from the local mirror"""
     try:
-        response = bedrock_agent_runtime.get_memory(
-            memoryId=MEMORY_ID,
-            sessionId=SESSION_ID,
-            maxResults=10
-        )
-        
-        if 'memoryContents' in response and response['memoryContents']:
+        turns = history.load_recent()
+        if turns:
             print("\n💾 Loading previous conversation...")
-            for item in response['memoryContents']:
-                if 'userMessage' in item:
-                    print(f"You: {item['userMessage']}")
-                if 'assistantMessage' in item:
-                    print(f"Assistant: {item['assistantMessage']}")
+            show_turns(turns)
+            if history.has_more:
+                print("   (type '/history' for earlier messages)")
             print()
             return True
         return False
@@ -61,95 +111,57 @@ def load_memory():
         print(f"⚠️  Memory load failed: {e}")
         return False
 
-def save_to_memory(user_message, assistant_message):
-    """Save conversation to AgentCore Memory"""
+def load_older_memory():
+    """Show the next older page of history (prefetched in the background)"""
     try:
-        bedrock_agent_runtime.put_memory(
-            memoryId=MEMORY_ID,
-            sessionId=SESSION_ID,
-            memoryContents=[
-                {
-                    'userMessage': user_message,
-                    'assistantMessage': assistant_message
-                }
-            ]
-        )
-        return True
+        turns = history.load_older()
     except Exception as e:
-        print(f"⚠️  Memory save failed: {e}")
-        return False
+        print(f"⚠️  Memory load failed: {e}\n")
+        return
+    if not turns:
+        print("\n💾 No earlier messages.\n")
+        return
+    print("\n💾 Earlier messages:")
+    show_turns(turns)
+    print()
+
+# Turns are saved write-behind: batched put_memory calls on a background thread
+memory_writer = MemoryWriter(
+    bedrock_agent_runtime,
+    MEMORY_ID,
+    SESSION_ID,
+    batch_size=config.get('memory_batch_size', 10),
+    flush_interval=config.get('memory_flush_seconds', 2.0),
+    on_saved=lambda batch: mirror.mark_synced(SESSION_ID, batch)
+)
+atexit.register(memory_writer.close)
 
-# Tools
-@tool
-def list_pets() -> str:
-    """List all available pets in the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___ListPets",
-            "arguments": {}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-@tool
-def get_pet_by_id(pet_id: int) -> str:
-    """Get details of a specific pet by ID"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___GetPetById",
-            "arguments": {"petId": str(pet_id)}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-@tool
-def add_pet(name: str, pet_type: str, price: float) -> str:
-    """Add a new pet to the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___AddPet",
-            "arguments": {
-                "name": name,
-                "type": pet_type,
-                "price": price
-            }
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-# Create agent
+# Prompt history stays inside a token budget: recent turns verbatim, older ones summarized
+context = RollingSummaryManager.from_config(config)
+
+# Create agent (streaming prints text itself, so the default printing callback is off)
+agent_options = {} if args.no_stream else {"callback_handler": None}
+batch_tools = build_batch_tools(mcp_client)
 agent = Agent(
     name="PetStoreAssistant",
-    system_prompt="""You are a helpful pet store assistant. You can help customers:
-    - Browse available pets
-    - Get details about specific pets
-    - Add new pets to the store
-    - Answer questions about pets
-    
-    Always be friendly and helpful!""",
-    tools=[list_pets, get_pet_by_id, add_pet]
+    system_prompt=SYSTEM_PROMPT,
+    tools=toolset.load() + batch_tools,
+    conversation_manager=context,
+    **agent_options
 )
+toolset.watch(agent)
+
+# Each turn only the most relevant tool schemas are sent to the model
+selector = ToolSelector.from_config(lambda: list(toolset.tools.values()) + batch_tools, mcp_client, config)
+selector.attach(agent)
+
+# Plain lookups ("what pets do you have", "pet 2") are answered without the model
+router = IntentRouter.from_config(mcp_client, config)
+
+# Repeated questions are answered from a cache invalidated by catalog changes
+answers = AnswerCache.from_config(config).attach(agent)
+
+streamer = None if args.no_stream else TurnStreamer(agent)
 
 # Main
 print("=" * 70)
@@ -157,6 +169,18 @@ print("🤖 AI Pet Store Assistant with Memory")
 print("=" * 70)
 print(f"\n📝 Session ID: {SESSION_ID}")
 
+# First run of this session on this machine: fill the mirror before showing history.
+# Otherwise show local history immediately and pull the remote delta in the background.
+if mirror.has_synced(SESSION_ID):
+    threading.Thread(target=sync_memory, name="memory-sync", daemon=True).start()
+else:
+    sync_memory()
+
+history = HistoryLoader(
+    mirror.iter_pages(SESSION_ID, PAGE_SIZE),
+    max_turns=config.get('memory_history_max_turns', 200)
+)
+
 # Load previous conversation
 load_memory()
 
@@ -170,21 +194,62 @@ while True:
             continue
             
         if question.lower() in ['quit', 'exit', 'q']:
-            print("\n👋 Goodbye! Your conversation has been saved.")
+            print("\n👋 Goodbye!")
             break
+
+        if question.lower() == '/history':
+            load_older_memory()
+            continue
         
-        print("\nAssistant: ", end="", flush=True)
-        response = agent(question)
-        print(response)
-        print()
-        
-        # Save to memory
-        save_to_memory(question, response)
+        with tracing.turn(**{"session.id": SESSION_ID}):
+            print("\nAssistant: ", end="", flush=True)
+            started = time.perf_counter()
+            response, shortcut = router.answer(question, agent), "⚡ Fast path"
+            if response is None:
+                response, shortcut = answers.get(question, agent), "💬 Cached answer"
+            if response is not None:
+                print(response)
+                print(f"{shortcut}: {(time.perf_counter() - started) * 1000:.0f} ms, no model call\n")
+            else:
+                if streamer:
+                    response = streamer(question)
+                    print(f"\n{streamer.stats.summary()}")
+                else:
+                    response = agent(question)
+                    print(response)
+                router.record_agent_turn(time.perf_counter() - started)
+                answers.put(question, str(response), time.perf_counter() - started, agent)
+                print(selector.format_turn())
+                print(f"{context.format_turn(agent)}\n")
+
+            # Save to memory (queued, does not block the next prompt)
+            with tracing.span("memory save"):
+                answer = str(response)
+                turn = mirror.append(SESSION_ID, question, answer)
+                memory_writer.save(question, answer, turn['turnId'], turn['timestamp'])
+                history.append(question, answer)
         
     except KeyboardInterrupt:
-        print("\n\n👋 Goodbye! Your conversation has been saved.")
+        print("\n\n👋 Goodbye!")
         break
     except Exception as e:
         print(f"\n❌ Error: {e}\n")
 
+# Flush queued turns before exiting
+history.close()
+if memory_writer.close():
+    print(f"💾 Conversation saved ({memory_writer.saved} turns in {memory_writer.batches} batches)")
+else:
+    print("⚠️  Some turns could not be saved to memory (they will be re-sent next run)")
+mirror.close()
+print(mcp_client.cache.format_stats())
+print(mcp_client.encoder.format_stats())
+print(selector.format_stats())
+print(router.format_stats())
+print(answers.format_stats())
+answers.close()
+toolset.close()
 mcp_client.close()
+if args.profile:
+    tracing.shutdown()
+    print(f"🧭 Traces appended to {TRACE_PATH}")
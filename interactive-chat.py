@@ -1,100 +1,72 @@
 #!/usr/bin/env python3
 """
 Interactive AI Chatbot - Ask questions about pets
+
+Run: python3 interactive-chat.py [--no-stream] [--profile]
 """
 
+import argparse
 import json
+import time
 from strands import Agent
-from strands.tools import tool
-import httpx
+
+from answer_cache import AnswerCache
+from context_budget import RollingSummaryManager
+from gateway_client import GatewayClient
+from gateway_tools import GatewayToolset
+from intent_router import IntentRouter
+from petstore_tools import SYSTEM_PROMPT, build_batch_tools
+from streaming import TurnStreamer
+from tool_selection import ToolSelector
+import tracing
+
+parser = argparse.ArgumentParser(description="Interactive pet store chat")
+parser.add_argument('--no-stream', action='store_true', help="wait for the full answer instead of streaming it")
+parser.add_argument('--profile', action='store_true',
+                    help="print a per-turn timing waterfall and append spans to chat-traces.jsonl")
+args = parser.parse_args()
 
 # Load config
 with open('deployment-config.json') as f:
     config = json.load(f)
 
-with open('access-token.txt') as f:
-    access_token = f.read().strip()
-
-# Create MCP client
-mcp_client = httpx.Client(
-    base_url=config['gateway_url'],
-    headers={
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    },
-    timeout=30.0
-)
+# Tracing is a no-op unless --profile is given
+TRACE_PATH = config.get('trace_path', tracing.DEFAULT_TRACE_PATH)
+if args.profile:
+    tracing.enable(TRACE_PATH)
+
+# Create MCP client (shared async connection pool, see gateway_client.py)
+mcp_client = GatewayClient.from_config(config)
+
+# Tools are generated from the gateway's tools/list schema (cached on disk)
+toolset = GatewayToolset.from_config(mcp_client, config)
 
-@tool
-def list_pets() -> str:
-    """List all available pets in the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___ListPets",
-            "arguments": {}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-@tool
-def get_pet_by_id(pet_id: int) -> str:
-    """Get details of a specific pet by ID"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___GetPetById",
-            "arguments": {"petId": str(pet_id)}
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-@tool
-def add_pet(name: str, pet_type: str, price: float) -> str:
-    """Add a new pet to the store"""
-    response = mcp_client.post("", json={
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "tools/call",
-        "params": {
-            "name": "PetStoreTarget___AddPet",
-            "arguments": {
-                "name": name,
-                "type": pet_type,
-                "price": price
-            }
-        }
-    })
-    result = response.json()
-    if 'result' in result:
-        content = json.loads(result['result']['content'][0]['text'])
-        return json.dumps(content, indent=2)
-    return f"Error: {result}"
-
-# Create agent
+# Prompt history stays inside a token budget: recent turns verbatim, older ones summarized
+context = RollingSummaryManager.from_config(config)
+
+# Create agent (streaming prints text itself, so the default printing callback is off)
+agent_options = {} if args.no_stream else {"callback_handler": None}
+batch_tools = build_batch_tools(mcp_client)
 agent = Agent(
     name="PetStoreAssistant",
-    system_prompt="""You are a helpful pet store assistant. You can help customers:
-    - Browse available pets
-    - Get details about specific pets
-    - Add new pets to the store
-    - Answer questions about pets
-    
-    Always be friendly and helpful!""",
-    tools=[list_pets, get_pet_by_id, add_pet]
+    system_prompt=SYSTEM_PROMPT,
+    tools=toolset.load() + batch_tools,
+    conversation_manager=context,
+    **agent_options
 )
+toolset.watch(agent)
+
+# Each turn only the most relevant tool schemas are sent to the model
+selector = ToolSelector.from_config(lambda: list(toolset.tools.values()) + batch_tools, mcp_client, config)
+selector.attach(agent)
+
+# Plain lookups ("what pets do you have", "pet 2") are answered without the model
+router = IntentRouter.from_config(mcp_client, config)
+
+# Repeated questions are answered from a cache invalidated by catalog changes
+answers = AnswerCache.from_config(config).attach(agent)
+
+streamer = None if args.no_stream else TurnStreamer(agent)
 
 print("=" * 70)
 print("🤖 AI Pet Store Assistant")
@@ -112,10 +84,26 @@ while True:
             print("\n👋 Goodbye!")
             break
         
-        print("\nAssistant: ", end="", flush=True)
-        response = agent(question)
-        print(response)
-        print()
+        with tracing.turn():
+            print("\nAssistant: ", end="", flush=True)
+            started = time.perf_counter()
+            response, shortcut = router.answer(question, agent), "⚡ Fast path"
+            if response is None:
+                response, shortcut = answers.get(question, agent), "💬 Cached answer"
+            if response is not None:
+                print(response)
+                print(f"{shortcut}: {(time.perf_counter() - started) * 1000:.0f} ms, no model call\n")
+            else:
+                if streamer:
+                    response = streamer(question)
+                    print(f"\n{streamer.stats.summary()}")
+                else:
+                    response = agent(question)
+                    print(response)
+                router.record_agent_turn(time.perf_counter() - started)
+                answers.put(question, str(response), time.perf_counter() - started, agent)
+                print(selector.format_turn())
+                print(f"{context.format_turn(agent)}\n")
         
     except KeyboardInterrupt:
         print("\n\n👋 Goodbye!")
@@ -123,4 +111,14 @@ while True:
     except Exception as e:
         print(f"\n❌ Error: {e}\n")
 
+print(mcp_client.cache.format_stats())
+print(mcp_client.encoder.format_stats())
+print(selector.format_stats())
+print(router.format_stats())
+print(answers.format_stats())
+answers.close()
+toolset.close()
 mcp_client.close()
+if args.profile:
+    tracing.shutdown()
+    print(f"🧭 Traces appended to {TRACE_PATH}")
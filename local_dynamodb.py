@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for a boto3 DynamoDB Table
+Implements the calls petstore_lambda.py makes (GetItem, PutItem with a
+condition, UpdateItem ADD, Scan and GSI Query) so the handler can run
+without AWS, with a simulated round trip per request.
+"""
+
+import threading
+import time
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+PAGE_BYTES = 1024 * 1024   # DynamoDB returns at most 1 MB per Scan page
+
+
+def matches(condition, item):
+    """Evaluate a boto3 Key condition (=, BETWEEN, >=, <=, <, >, AND) against an item"""
+    expression = condition.get_expression()
+    operator, values = expression['operator'], expression['values']
+    if operator == 'AND':
+        return matches(values[0], item) and matches(values[1], item)
+    name = values[0].name
+    if name not in item:
+        return False
+    value = item[name]
+    if operator == '=':
+        return value == values[1]
+    if operator == 'BETWEEN':
+        return values[1] <= value <= values[2]
+    if operator == '>=':
+        return value >= values[1]
+    if operator == '<=':
+        return value <= values[1]
+    if operator == '>':
+        return value > values[1]
+    if operator == '<':
+        return value < values[1]
+    raise NotImplementedError(f"Key condition {operator} is not supported")
+
+
+class LocalTable:
+    """Just enough of a boto3 DynamoDB Table for the Pet Store handler
+
+    Every request sleeps ``rtt`` seconds; a Scan page additionally costs
+    the bytes it reads divided by ``scan_bytes_per_second``. ``indexes``
+    maps a GSI name to its (hash, range) attribute names for Query.
+    """
+
+    def __init__(self, rtt=0.005, scan_bytes_per_second=20 * 1024 * 1024, indexes=None):
+        self.rtt = rtt
+        self.scan_bytes_per_second = scan_bytes_per_second
+        self.indexes = dict(indexes or {})
+        self.items = {}
+        self.sizes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_index_definitions(cls, definitions, **kwargs):
+        """Build from CreateTable-style GlobalSecondaryIndexes (deploy.TABLE_INDEXES)"""
+        indexes = {}
+        for index in definitions:
+            keys = {key['KeyType']: key['AttributeName'] for key in index['KeySchema']}
+            indexes[index['IndexName']] = (keys['HASH'], keys.get('RANGE'))
+        return cls(indexes=indexes, **kwargs)
+
+    def _request(self, extra=0.0):
+        if self.rtt or extra:
+            time.sleep(self.rtt + extra)
+
+    @staticmethod
+    def _conditional_failure():
+        return ClientError({'Error': {'Code': 'ConditionalCheckFailedException',
+                                      'Message': 'The conditional request failed'}}, 'PutItem')
+
+    def load(self, items):
+        """Bulk insert without simulated latency (test setup)"""
+        for item in items:
+            self.items[int(item['id'])] = dict(item)
+            self.sizes[int(item['id'])] = sum(len(str(k)) + len(str(v)) for k, v in item.items())
+
+    def get_item(self, Key):
+        self._request()
+        item = self.items.get(int(Key['id']))
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None):
+        self._request()
+        with self._lock:
+            if ConditionExpression == 'attribute_not_exists(id)' and int(Item['id']) in self.items:
+                raise self._conditional_failure()
+            self.load([Item])
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues,
+                    ConditionExpression=None, ReturnValues='NONE'):
+        # Supports the single form the allocator uses: ADD <attr> :value
+        self._request()
+        attribute = UpdateExpression.split()[1]
+        with self._lock:
+            item = self.items.get(int(Key['id']))
+            if ConditionExpression == f'attribute_exists({attribute})' and (item is None or attribute not in item):
+                raise self._conditional_failure()
+            item = dict(item or Key)
+            item[attribute] = Decimal(item.get(attribute, 0)) + Decimal(ExpressionAttributeValues[':block'])
+            self.load([item])
+        return {'Attributes': {attribute: item[attribute]}}
+
+    def scan(self, ProjectionExpression=None, ExclusiveStartKey=None):
+        with self._lock:
+            keys = sorted(self.items)
+        if ExclusiveStartKey is not None:
+            keys = [key for key in keys if key > int(ExclusiveStartKey['id'])]
+        page, read = [], 0
+        for key in keys:
+            if read >= PAGE_BYTES:
+                break
+            item = self.items[key]
+            read += self.sizes[key]
+            page.append({'id': item['id']} if ProjectionExpression == 'id' else dict(item))
+        self._request(read / self.scan_bytes_per_second)
+        response = {'Items': page}
+        if len(page) < len(keys):
+            response['LastEvaluatedKey'] = {'id': page[-1]['id']}
+        return response
+
+    def query(self, IndexName, KeyConditionExpression, Limit=None, ExclusiveStartKey=None):
+        """GSI query in range-key order (ties broken by id), paginated like DynamoDB"""
+        self._request()
+        hash_key, range_key = self.indexes[IndexName]
+        with self._lock:
+            found = [dict(item) for item in self.items.values()
+                     if hash_key in item and matches(KeyConditionExpression, item)]
+
+        def position(item):
+            return (item.get(range_key, 0) if range_key else 0, int(item['id']))
+
+        found.sort(key=position)
+        if ExclusiveStartKey is not None:
+            start = position(ExclusiveStartKey)
+            found = [item for item in found if position(item) > start]
+        page = found[:Limit] if Limit else found
+        response = {'Items': page, 'Count': len(page)}
+        if len(page) < len(found):
+            last = page[-1]
+            response['LastEvaluatedKey'] = {
+                key: last[key] for key in ('id', hash_key, range_key) if key and key in last
+            }
+        return response
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+AgentCore Memory helpers for the chat scripts
+Write-behind batching so saving a turn never blocks the REPL, lazy
+paginated history loading so startup only waits for the latest page, and
+a local SQLite mirror so a session resumes without a remote round trip
+"""
+
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_MAX_BUFFER = 1000
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_MAX_HISTORY_TURNS = 200
+DEFAULT_MIRROR_PATH = 'chat-memory.db'
+
+
+def backoff_delay(attempt, base=DEFAULT_BASE_BACKOFF, cap=MAX_BACKOFF):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class MemoryWriter:
+    """Background write-behind queue for put_memory
+
+    ``save()`` only appends to an in-memory buffer. A worker thread sends
+    the buffer as multi-item ``memoryContents`` batches when it reaches
+    ``batch_size`` turns, when ``flush_interval`` seconds have passed, or
+    on ``close()``. Failed batches are retried with exponential backoff and
+    put back at the front of the buffer; the buffer is bounded and drops
+    the oldest turns (counted in ``dropped``) if an outage outlasts it.
+    A turn whose ``turnId`` is already queued or saved is ignored, so
+    re-queueing unsynced turns never sends one twice.
+    """
+
+    def __init__(self, client, memory_id, session_id, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_buffer=DEFAULT_MAX_BUFFER,
+                 max_retries=DEFAULT_MAX_RETRIES, on_saved=None):
+        self.client = client
+        self.memory_id = memory_id
+        self.session_id = session_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self.on_saved = on_saved  # called with each batch once it is stored remotely
+
+        self._buffer = []
+        self._queued_ids = set()    # turnIds buffered, in flight or saved
+        self._in_flight = 0
+        self._closing = False
+        self._close_deadline = None
+        self._flush_now = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+        self.saved = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def save(self, user_message, assistant_message, turn_id=None, timestamp=None):
+        """Queue one conversation turn; returns immediately"""
+        item = new_turn(user_message, assistant_message, turn_id, timestamp)
+        with self._cond:
+            if item['turnId'] in self._queued_ids:
+                return
+            self._queued_ids.add(item['turnId'])
+            self._buffer.append(item)
+            self._trim()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _trim(self):
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            self._queued_ids.difference_update(item['turnId'] for item in self._buffer[:overflow])
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._closing or self._flush_now) and len(self._buffer) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._buffer:
+                    self._flush_now = False
+                    if self._closing:
+                        return
+                    continue
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                self._in_flight = len(batch)
+
+            ok = self._write(batch)
+
+            with self._cond:
+                self._in_flight = 0
+                if not ok:
+                    self._buffer[:0] = batch
+                    self._trim()
+                    if self._closing:
+                        # Give up on shutdown rather than hang the exit
+                        self.dropped += len(self._buffer)
+                        self._queued_ids.difference_update(item['turnId'] for item in self._buffer)
+                        self._buffer.clear()
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with span("memory put_memory", **{"memory.batch.size": len(batch), "memory.attempt": attempt}):
+                    self.client.put_memory(
+                        memoryId=self.memory_id,
+                        sessionId=self.session_id,
+                        memoryContents=batch
+                    )
+            except Exception as e:
+                self.failures += 1
+                delay = backoff_delay(attempt)
+                if self._close_deadline is not None:
+                    # Shutting down: retry only while close() is still waiting
+                    delay = min(delay, self._close_deadline - time.monotonic())
+                if attempt == self.max_retries or delay < 0:
+                    print(f"\n⚠️  Memory save failed ({len(batch)} turns queued for retry): {e}")
+                    return False
+                time.sleep(delay)
+                continue
+
+            self.saved += len(batch)
+            self.batches += 1
+            if self.on_saved is not None:
+                try:
+                    self.on_saved(batch)
+                except Exception as e:
+                    print(f"\n⚠️  Memory save callback failed: {e}")
+            return True
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written (or dropped)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Wake the worker even if the batch is not full yet
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._buffer or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=30.0):
+        """Flush remaining turns and stop the worker; True only if every turn was saved"""
+        with self._cond:
+            self._closing = True
+            self._close_deadline = time.monotonic() + timeout
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            return not (self._buffer or self._in_flight or self.dropped or self._thread.is_alive())
+
+
+def iter_memory_pages(client, memory_id, session_id, page_size=DEFAULT_PAGE_SIZE):
+    """Lazily yield pages of turns from get_memory, following nextToken
+
+    The first page holds the most recent turns and each later page goes
+    further back; turns within a page are in conversation order.
+    """
+    next_token = None
+    while True:
+        params = {'memoryId': memory_id, 'sessionId': session_id, 'maxResults': page_size}
+        if next_token:
+            params['nextToken'] = next_token
+        response = client.get_memory(**params)
+        items = response.get('memoryContents') or []
+        if items:
+            yield items
+        next_token = response.get('nextToken')
+        if not next_token:
+            return
+
+
+class HistoryLoader:
+    """Conversation history with a bounded in-process footprint
+
+    ``load_recent()`` fetches only the newest page. The next older page is
+    prefetched on a background thread so ``load_older()`` usually returns
+    without waiting. At most ``max_turns`` turns are kept in ``turns``
+    (oldest first); new turns push out the oldest, and older pages are
+    only retained while there is room.
+    """
+
+    def __init__(self, pages, max_turns=DEFAULT_MAX_HISTORY_TURNS, prefetch=True):
+        self._pages = pages
+        self.turns = deque(maxlen=max_turns)
+        self.prefetch = prefetch
+        self.has_more = True
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-history")
+        self._next = None
+
+    def _fetch(self):
+        return next(self._pages, None)
+
+    def _take_page(self):
+        page = self._next.result() if self._next is not None else self._fetch()
+        self._next = None
+        if page is None:
+            self.has_more = False
+        elif self.prefetch:
+            self._next = self._executor.submit(self._fetch)
+        return page or []
+
+    def load_recent(self):
+        """Fetch the most recent page and keep it; returns its turns"""
+        page = self._take_page()
+        self.turns.extend(page)
+        return page
+
+    def load_older(self):
+        """Return the next older page (empty when history is exhausted)"""
+        if not self.has_more:
+            return []
+        page = self._take_page()
+        room = self.turns.maxlen - len(self.turns)
+        if room > 0:
+            self.turns.extendleft(reversed(page[-room:]))
+        return page
+
+    def append(self, user_message, assistant_message):
+        self.turns.append({'userMessage': user_message, 'assistantMessage': assistant_message})
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def new_turn(user_message, assistant_message, turn_id=None, timestamp=None):
+    """A memoryContents item with its own id and creation time"""
+    return {
+        'userMessage': user_message,
+        'assistantMessage': assistant_message,
+        'turnId': turn_id or uuid.uuid4().hex,
+        'timestamp': timestamp if timestamp is not None else time.time(),
+    }
+
+
+def fingerprint(item):
+    """Content hash of a turn; identifies turns saved before they carried a turnId"""
+    text = f"{item.get('userMessage', '')}\x00{item.get('assistantMessage', '')}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def turn_id(item):
+    """Identity of a turn: its turnId, or the content hash for older turns without one"""
+    return item.get('turnId') or fingerprint(item)
+
+
+class LocalMemoryMirror:
+    """Append-only SQLite (WAL) mirror of AgentCore Memory
+
+    Startup reads history from the local file. ``sync()`` then pulls only
+    the turns added remotely since the last sync marker: the turn id of
+    the newest remote turn seen last time. Every turn has a unique
+    ``turnId`` (sent with put_memory), so identical question/answer pairs
+    stay separate turns, and turns are ordered by their creation
+    timestamp, so turns pulled from the remote land in conversation order.
+    Local turns are flagged unsynced until the MemoryWriter confirms them,
+    so turns that never reached the remote (outage, crash) are re-queued
+    on the next run.
+    """
+
+    def __init__(self, path=DEFAULT_MIRROR_PATH, memory_id=None):
+        self.memory_id = memory_id
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS turns (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                turn_id TEXT,
+                fingerprint TEXT NOT NULL,
+                user_message TEXT,
+                assistant_message TEXT,
+                created_at REAL NOT NULL,
+                synced INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                session_id TEXT PRIMARY KEY,
+                marker TEXT,
+                synced_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._migrate()
+
+    def _migrate(self):
+        """Mirrors written before turns had ids: turn_id is the old fingerprint"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(turns)")}
+        if 'turn_id' not in columns:
+            self._db.execute("ALTER TABLE turns ADD COLUMN turn_id TEXT")
+            self._db.execute("UPDATE turns SET turn_id = fingerprint")
+        self._db.executescript("""
+            DROP INDEX IF EXISTS turns_fingerprint;
+            CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, created_at, seq);
+            CREATE INDEX IF NOT EXISTS turns_id ON turns (session_id, turn_id);
+        """)
+
+    # ------------------------------------------------------------------
+    # Sessions
+    # ------------------------------------------------------------------
+    def last_session(self):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'last_session'").fetchone()
+        return row[0] if row else None
+
+    def set_last_session(self, session_id):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_session', ?)", (session_id,))
+
+    def has_synced(self, session_id):
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM sync_state WHERE session_id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    # ------------------------------------------------------------------
+    # Turns
+    # ------------------------------------------------------------------
+    def _insert(self, session_id, item, synced):
+        self._db.execute(
+            "INSERT INTO turns (session_id, turn_id, fingerprint, user_message, assistant_message, created_at, synced)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, turn_id(item), fingerprint(item), item.get('userMessage'), item.get('assistantMessage'),
+             item.get('timestamp') or time.time(), int(synced))
+        )
+
+    def append(self, session_id, user_message, assistant_message, synced=False):
+        """Store a new local turn; returns it as a memoryContents item (with turnId and timestamp)"""
+        item = new_turn(user_message, assistant_message)
+        with self._lock:
+            self._insert(session_id, item, synced)
+        return item
+
+    def mark_synced(self, session_id, items):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE turns SET synced = 1 WHERE session_id = ? AND turn_id = ?",
+                [(session_id, turn_id(item)) for item in items]
+            )
+
+    def unsynced(self, session_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT turn_id, user_message, assistant_message, created_at FROM turns"
+                " WHERE session_id = ? AND synced = 0 ORDER BY created_at, seq",
+                (session_id,)
+            ).fetchall()
+        return [new_turn(u, a, tid, ts) for tid, u, a, ts in rows]
+
+    def iter_pages(self, session_id, page_size=DEFAULT_PAGE_SIZE):
+        """Same page shape as iter_memory_pages, served from the local file"""
+        before = None
+        while True:
+            with self._lock:
+                if before is None:
+                    rows = self._db.execute(
+                        "SELECT created_at, seq, user_message, assistant_message FROM turns"
+                        " WHERE session_id = ? ORDER BY created_at DESC, seq DESC LIMIT ?",
+                        (session_id, page_size)
+                    ).fetchall()
+                else:
+                    rows = self._db.execute(
+                        "SELECT created_at, seq, user_message, assistant_message FROM turns"
+                        " WHERE session_id = ? AND (created_at < ? OR (created_at = ? AND seq < ?))"
+                        " ORDER BY created_at DESC, seq DESC LIMIT ?",
+                        (session_id, before[0], before[0], before[1], page_size)
+                    ).fetchall()
+            if not rows:
+                return
+            before = rows[-1][:2]
+            yield [{'userMessage': u, 'assistantMessage': a} for _, _, u, a in reversed(rows)]
+            if len(rows) < page_size:
+                return
+
+    # ------------------------------------------------------------------
+    # Remote delta sync
+    # ------------------------------------------------------------------
+    def sync(self, remote, session_id, page_size=DEFAULT_PAGE_SIZE):
+        """Pull remote turns newer than the last sync marker; returns how many were added"""
+        with self._lock:
+            row = self._db.execute("SELECT marker FROM sync_state WHERE session_id = ?", (session_id,)).fetchone()
+        marker = row[0] if row else None
+
+        newest = None
+        delta = []
+        for page in iter_memory_pages(remote, self.memory_id, session_id, page_size):
+            reached_marker = False
+            for item in reversed(page):
+                tid = turn_id(item)
+                newest = newest or tid
+                if tid == marker:
+                    reached_marker = True
+                    break
+                delta.append((tid, item))
+            if reached_marker:
+                break
+
+        added = 0
+        with self._lock:
+            for tid, item in reversed(delta):
+                exists = self._db.execute(
+                    "SELECT 1 FROM turns WHERE session_id = ? AND turn_id = ?", (session_id, tid)
+                ).fetchone()
+                if exists:
+                    self._db.execute(
+                        "UPDATE turns SET synced = 1 WHERE session_id = ? AND turn_id = ?", (session_id, tid)
+                    )
+                    continue
+                self._insert(session_id, item, synced=True)
+                added += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state (session_id, marker, synced_at) VALUES (?, ?, ?)",
+                (session_id, newest or marker, time.time())
+            )
+        return added
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LocalMemoryStub:
+    """In-process stand-in for the bedrock-agent-runtime memory API
+
+    Implements get_memory / put_memory with the same pagination shape
+    (newest page first), for tests and ``--offline`` runs.
+    """
+
+    def __init__(self):
+        self.sessions = defaultdict(list)
+
+    def put_memory(self, memoryId, sessionId, memoryContents):
+        self.sessions[(memoryId, sessionId)].extend(dict(item) for item in memoryContents)
+        return {}
+
+    def get_memory(self, memoryId, sessionId, maxResults=DEFAULT_PAGE_SIZE, nextToken=None):
+        items = self.sessions[(memoryId, sessionId)]
+        end = len(items) - int(nextToken or 0)
+        start = max(0, end - maxResults)
+        response = {'memoryContents': items[start:end]}
+        if start > 0:
+            response['nextToken'] = str(len(items) - start)
+        return response
@@ -0,0 +1,286 @@
+"""
+Pet Store API backend (Lambda handler, deployed by deploy.py as lambda_function.py)
+Pets are stored in DynamoDB. New ids come from an atomic counter item
+(UpdateItem ADD), leased in blocks per container, and every insert is a
+conditional put so an id can never be written twice.
+
+GET /pets is a paginated GSI Query, never a scan:
+    ?type=dog&min_price=10&max_price=100&limit=20&cursor=...
+Results are ordered by price; ``nextCursor`` fetches the next page.
+"""
+
+import base64
+import json
+import os
+import threading
+from decimal import Decimal, InvalidOperation
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+TABLE_NAME = os.environ.get('PETSTORE_TABLE', 'PetStore')
+ID_BLOCK_SIZE = int(os.environ.get('ID_BLOCK_SIZE', '1'))
+COUNTER_ID = 0          # reserved item holding the last allocated id; never listed
+MAX_PUT_ATTEMPTS = 5
+
+# Every pet carries catalog=CATALOG so the whole store can be queried by
+# price; the counter item has no catalog/type and stays out of both indexes.
+CATALOG = 'pets'
+CATALOG_INDEX = 'catalog-price-index'   # catalog (HASH) + price (RANGE)
+TYPE_INDEX = 'type-price-index'         # type (HASH) + price (RANGE)
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj == obj.to_integral_value() else float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+
+def is_conditional_failure(error):
+    return (isinstance(error, ClientError)
+            and error.response['Error']['Code'] == 'ConditionalCheckFailedException')
+
+
+class IdAllocator:
+    """Hands out unique pet ids from the counter item
+
+    Each lease is one UpdateItem that atomically adds ``block_size`` to
+    ``last_id`` and returns the new value, so concurrent containers get
+    disjoint ranges. With a block size above 1 a container only talks to
+    the counter once per block; ids left unused when a container is
+    recycled become gaps, never duplicates.
+    """
+
+    def __init__(self, table, block_size=ID_BLOCK_SIZE):
+        self.table = table
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            if self._next >= self._end:
+                last = self._lease()
+                self._next, self._end = last - self.block_size + 1, last + 1
+            pet_id = self._next
+            self._next += 1
+            return pet_id
+
+    def _lease(self):
+        """Reserve the next block of ids; returns the last id in it"""
+        try:
+            response = self.table.update_item(
+                Key={'id': COUNTER_ID},
+                UpdateExpression='ADD last_id :block',
+                ConditionExpression='attribute_exists(last_id)',
+                ExpressionAttributeValues={':block': self.block_size},
+                ReturnValues='UPDATED_NEW'
+            )
+        except ClientError as e:
+            if not is_conditional_failure(e):
+                raise
+            self._seed()
+            return self._lease()
+        return int(response['Attributes']['last_id'])
+
+    def _seed(self):
+        """Create the counter for a table that predates it (one scan, once)"""
+        highest = 0
+        kwargs = {'ProjectionExpression': 'id'}
+        while True:
+            response = self.table.scan(**kwargs)
+            for item in response.get('Items', []):
+                highest = max(highest, int(item['id']))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        try:
+            self.table.put_item(
+                Item={'id': COUNTER_ID, 'last_id': highest},
+                ConditionExpression='attribute_not_exists(id)'
+            )
+        except ClientError as e:
+            # Another container seeded it first
+            if not is_conditional_failure(e):
+                raise
+
+
+def add_pet(table, allocator, name, pet_type, price):
+    """Insert a pet under a freshly allocated id and return it"""
+    for _ in range(MAX_PUT_ATTEMPTS):
+        pet = {'id': allocator.next_id(), 'name': name, 'type': pet_type.lower(),
+               'price': Decimal(str(price)), 'catalog': CATALOG}
+        try:
+            table.put_item(Item=pet, ConditionExpression='attribute_not_exists(id)')
+            return public(pet)
+        except ClientError as e:
+            # The id was taken outside the counter (e.g. a manual insert); allocate another
+            if not is_conditional_failure(e):
+                raise
+    raise RuntimeError("Could not allocate a unique pet id")
+
+
+def public(item):
+    """A pet as returned by the API (without index bookkeeping)"""
+    return {key: value for key, value in item.items() if key != 'catalog'}
+
+
+def encode_cursor(query, last_key):
+    """Opaque page token: the query it belongs to plus DynamoDB's LastEvaluatedKey"""
+    raw = json.dumps({'q': query, 'k': last_key}, cls=DecimalEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, query):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw, parse_float=Decimal, parse_int=Decimal)
+    except ValueError:
+        raise ValueError("'cursor' is not valid")
+    if (not isinstance(data, dict) or not isinstance(data.get('k'), dict)
+            or not set(data['k']) <= {'id', 'price', 'type', 'catalog'}):
+        raise ValueError("'cursor' is not valid")
+    if data.get('q') != query:
+        raise ValueError("'cursor' belongs to a different query")
+    return data['k']
+
+
+def query_pets(table, limit=DEFAULT_PAGE_SIZE, cursor=None, pet_type=None, min_price=None, max_price=None):
+    """One page of pets, cheapest first; returns (pets, next_cursor)"""
+    pet_type = pet_type.lower() if pet_type else None
+    if pet_type:
+        index, condition = TYPE_INDEX, Key('type').eq(pet_type)
+    else:
+        index, condition = CATALOG_INDEX, Key('catalog').eq(CATALOG)
+    if min_price is not None and max_price is not None:
+        condition &= Key('price').between(min_price, max_price)
+    elif min_price is not None:
+        condition &= Key('price').gte(min_price)
+    elif max_price is not None:
+        condition &= Key('price').lte(max_price)
+
+    # The cursor is only valid for the same filters
+    query = [index] + [None if value is None else str(value) for value in (pet_type, min_price, max_price)]
+    kwargs = {'IndexName': index, 'KeyConditionExpression': condition, 'Limit': limit}
+    if cursor:
+        kwargs['ExclusiveStartKey'] = decode_cursor(cursor, query)
+
+    response = table.query(**kwargs)
+    pets = [public(item) for item in response.get('Items', [])]
+    last_key = response.get('LastEvaluatedKey')
+    return pets, encode_cursor(query, last_key) if last_key else None
+
+
+def parse_price(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"'{name}' must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"'{name}' must be a non-negative number")
+    return price
+
+
+def parse_list_query(params):
+    """Validate GET /pets query parameters; returns query_pets kwargs or raises ValueError"""
+    params = params or {}
+    limit = params.get('limit') or DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    min_price, max_price = parse_price(params, 'min_price'), parse_price(params, 'max_price')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError("'min_price' is greater than 'max_price'")
+    return {
+        'limit': limit,
+        'cursor': params.get('cursor') or None,
+        'pet_type': (params.get('type') or '').strip() or None,
+        'min_price': min_price,
+        'max_price': max_price
+    }
+
+
+def response(status, body):
+    return {
+        'statusCode': status,
+        'body': json.dumps(body, cls=DecimalEncoder),
+        'headers': {'Content-Type': 'application/json'}
+    }
+
+
+def parse_new_pet(body):
+    """Validate a POST /pets body; returns (name, type, price) or raises ValueError"""
+    data = json.loads(body or '{}')
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    name, pet_type, price = data.get('name'), data.get('type'), data.get('price')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("'name' is required")
+    if not isinstance(pet_type, str) or not pet_type.strip():
+        raise ValueError("'type' is required")
+    if isinstance(price, bool) or not isinstance(price, (int, float, str)):
+        raise ValueError("'price' must be a non-negative number")
+    try:
+        value = Decimal(str(price).strip())
+    except InvalidOperation:
+        raise ValueError("'price' must be a non-negative number")
+    # "nan" / "inf" parse as numbers but DynamoDB rejects them
+    if not value.is_finite() or value < 0:
+        raise ValueError("'price' must be a non-negative number")
+    return name.strip(), pet_type.strip(), float(value)
+
+
+def route(event, table, allocator):
+    path = event.get('path', '')
+    method = event.get('httpMethod', '')
+
+    if path == '/pets' and method == 'GET':
+        try:
+            pets, next_cursor = query_pets(table, **parse_list_query(event.get('queryStringParameters')))
+        except ValueError as e:
+            return response(400, {'error': str(e)})
+        return response(200, {'pets': pets, 'nextCursor': next_cursor})
+    elif path == '/pets' and method == 'POST':
+        try:
+            name, pet_type, price = parse_new_pet(event.get('body'))
+        except ValueError as e:
+            return response(400, {'error': str(e)})
+        return response(201, add_pet(table, allocator, name, pet_type, price))
+    elif path.startswith('/pets/') and method == 'GET':
+        try:
+            pet_id = int(path.split('/')[-1])
+        except ValueError:
+            return response(400, {'error': 'Pet id must be a number'})
+        pet = table.get_item(Key={'id': pet_id}).get('Item') if pet_id != COUNTER_ID else None
+        if pet:
+            return response(200, public(pet))
+        return response(404, {'error': 'Pet not found'})
+
+    return response(404, {'error': 'Not found'})
+
+
+# Created on first use and reused while the container stays warm
+_table = None
+_allocator = None
+
+
+def lambda_handler(event, context):
+    global _table, _allocator
+    if _table is None:
+        _table = boto3.resource('dynamodb').Table(TABLE_NAME)
+        _allocator = IdAllocator(_table)
+    try:
+        return route(event, _table, _allocator)
+    except Exception as e:
+        return response(500, {'error': str(e)})
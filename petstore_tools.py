@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pet Store tools for the Strands agent
+Thin async wrappers over the shared GatewayClient
+"""
+
+import json
+from strands.tools import tool
+
+from gateway_client import tool_content
+from tracing import span
+
+LIST_PETS = "PetStoreTarget___ListPets"
+GET_PET_BY_ID = "PetStoreTarget___GetPetById"
+ADD_PET = "PetStoreTarget___AddPet"
+
+SYSTEM_PROMPT = """You are a helpful pet store assistant. You can help customers:
+    - Browse available pets
+    - Get details about specific pets
+    - Add new pets to the store
+    - Answer questions about pets
+
+    Always be friendly and helpful!"""
+
+
+def format_result(result, encoder=None, tool_name=None):
+    """Render a tools/call response the way the agent expects to read it
+
+    With a ResultEncoder the content is sent in its compact form
+    (see result_encoding.py); without one it is pretty-printed JSON.
+    """
+    if 'result' in result:
+        try:
+            with span("tool_result decode"):
+                content = tool_content(result)
+        except (ValueError, KeyError, IndexError):
+            return json.dumps(result['result'], indent=2)
+        with span("tool_result encode", **{"encoding.format": encoder.format if encoder else "pretty"}):
+            if encoder is None:
+                return json.dumps(content, indent=2)
+            return encoder.encode(content, tool_name)
+    return f"Error: {result}"
+
+
+def build_batch_tools(mcp_client):
+    """Hand-written tools that combine several gateway calls into one round trip"""
+
+    @tool
+    async def get_pets_by_ids(pet_ids: list[int]) -> str:
+        """Get details of several pets at once by their IDs (use this to compare pets)"""
+        results = await mcp_client.call_tools([
+            (GET_PET_BY_ID, {"petId": str(pet_id)}) for pet_id in pet_ids
+        ])
+        pets = [
+            tool_content(result) if 'result' in result else {"petId": pet_id, "error": result.get('error')}
+            for pet_id, result in zip(pet_ids, results)
+        ]
+        if mcp_client.encoder is None:
+            return json.dumps(pets, indent=2)
+        return mcp_client.encoder.encode(pets, "get_pets_by_ids")
+
+    return [get_pets_by_ids]
+
+
+def build_petstore_tools(mcp_client):
+    """Create the hand-written agent tools bound to ``mcp_client``
+
+    The chat entry points generate tools from the gateway schema instead
+    (see gateway_tools.py); these remain for offline use and as a reference.
+    The tools are async, so when the model asks for several of them in one
+    turn Strands runs them concurrently against the gateway.
+    """
+
+    @tool
+    async def list_pets(pet_type: str = "", min_price: float = None, max_price: float = None,
+                        limit: int = 25, cursor: str = "") -> str:
+        """List pets in the store, cheapest first, one page at a time
+
+        Args:
+            pet_type: Only pets of this type (e.g. dog)
+            min_price: Lowest price to include
+            max_price: Highest price to include
+            limit: Page size, 1-100
+            cursor: nextCursor from the previous page
+        """
+        args = {"limit": str(limit)}
+        if pet_type:
+            args["type"] = pet_type
+        if min_price is not None:
+            args["min_price"] = str(min_price)
+        if max_price is not None:
+            args["max_price"] = str(max_price)
+        if cursor:
+            args["cursor"] = cursor
+        return format_result(await mcp_client.call_tool(LIST_PETS, args), mcp_client.encoder, LIST_PETS)
+
+    @tool
+    async def get_pet_by_id(pet_id: int) -> str:
+        """Get details of a specific pet by ID"""
+        return format_result(await mcp_client.call_tool(GET_PET_BY_ID, {"petId": str(pet_id)}),
+                             mcp_client.encoder, GET_PET_BY_ID)
+
+    @tool
+    async def add_pet(name: str, pet_type: str, price: float) -> str:
+        """Add a new pet to the store"""
+        return format_result(await mcp_client.call_tool(ADD_PET, {
+            "name": name,
+            "type": pet_type,
+            "price": price
+        }), mcp_client.encoder, ADD_PET)
+
+    return [list_pets, get_pet_by_id, add_pet] + build_batch_tools(mcp_client)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Compact encodings of tool results for the model
+Tool output is re-read by the model on every later turn, so it is worth
+sending fewer bytes: minified JSON, a table for lists of records, optional
+per-tool field projection and a size budget that trims with a summary.
+
+Compare the formats on a saved result:
+    python3 result_encoding.py pets.json
+    python3 result_encoding.py --fields id,name,price < pets.json
+"""
+
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import threading
+
+FORMATS = ('pretty', 'json', 'table')
+DEFAULT_FORMAT = 'table'
+DEFAULT_MAX_CHARS = 6000
+
+# Rough BPE-style count: words, numbers, each punctuation mark, and runs of
+# indentation (which tokenizers mostly merge into one token)
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|\s{2,}|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def pretty(value):
+    """The original rendering (indent=2); the baseline savings are measured against"""
+    return json.dumps(value, indent=2)
+
+
+def minified(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def is_records(value):
+    """A non-empty list made only of flat-ish dicts"""
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+
+def records_key(value):
+    """Where the list of records sits: '' for a bare list, the key for {"pets": [...], ...}, else None"""
+    if is_records(value):
+        return ''
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if is_records(item):
+                return key
+    return None
+
+
+def project(value, fields):
+    """Keep only ``fields`` of each record (or of a single record)"""
+    if not fields:
+        return value
+    key = records_key(value)
+    if key == '':
+        return [{f: item[f] for f in fields if f in item} for item in value]
+    if key is not None:
+        return {**value, key: project(value[key], fields)}
+    if isinstance(value, dict) and any(f in value for f in fields):
+        return {f: value[f] for f in fields if f in value}
+    return value
+
+
+def table(records):
+    """CSV with one header row; nested values are written as minified JSON"""
+    columns = []
+    for record in records:
+        columns.extend(column for column in record if column not in columns)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(columns)
+    for record in records:
+        writer.writerow(['' if record.get(c) is None else
+                         minified(record[c]) if isinstance(record[c], (dict, list)) else record[c]
+                         for c in columns])
+    return out.getvalue().rstrip('\n')
+
+
+def render(value, fmt):
+    if fmt == 'pretty':
+        return pretty(value)
+    if isinstance(value, str):
+        return value
+    if fmt == 'table':
+        key = records_key(value)
+        if key == '':
+            return table(value)
+        if key is not None:
+            lines = [f"{key}:", table(value[key])]
+            lines += [f"{k}: {minified(v)}" for k, v in value.items() if k != key]
+            return '\n'.join(lines)
+    return minified(value)
+
+
+def fit(value, fmt, max_chars):
+    """Render within ``max_chars``: drop trailing records, else cut the text"""
+    text = render(value, fmt)
+    if not max_chars or len(text) <= max_chars:
+        return text, False
+
+    key = records_key(value)
+    if key is not None:
+        records = value if key == '' else value[key]
+
+        # A cursor points past the last record of the full page: following it would skip
+        # the omitted ones, so it is dropped and the note asks for a smaller page instead
+        paged = isinstance(value, dict) and 'nextCursor' in value
+
+        def with_first(count):
+            if key == '':
+                kept = records[:count]
+            else:
+                kept = {k: v for k, v in value.items() if k != 'nextCursor'}
+                kept[key] = records[:count]
+            note = (f"\n… {len(records) - count} of {len(records)} records omitted to fit the "
+                    f"{max_chars}-char budget; ")
+            if paged:
+                note += f"repeat the request with limit={count} to page through them (the cursor was dropped)"
+            else:
+                note += "narrow the request (filters, limit/cursor, ids)"
+            return render(kept, fmt) + note
+
+        low, high = 0, len(records) - 1     # the largest count that still fits
+        while low < high:
+            mid = (low + high + 1) // 2
+            if len(with_first(mid)) <= max_chars:
+                low = mid
+            else:
+                high = mid - 1
+        if low:
+            return with_first(low), True
+
+    note = f"\n… truncated, {len(text)} chars in full"
+    return text[:max(0, max_chars - len(note))] + note, True
+
+
+class ResultEncoder:
+    """Turns tool result content into the text the model sees
+
+    ``fields`` maps a tool name to the fields worth keeping in its
+    records; the rest are dropped before encoding. Every call is measured
+    against the original pretty-printed JSON so the savings of each format
+    can be compared on real traffic.
+    """
+
+    def __init__(self, fmt=DEFAULT_FORMAT, fields=None, max_chars=DEFAULT_MAX_CHARS, report=False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown tool result format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        self.format = fmt
+        self.fields = dict(fields or {})
+        self.max_chars = max_chars
+        self.report = report
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.truncated = 0
+        self.baseline_bytes = 0
+        self.encoded_bytes = 0
+        self.baseline_tokens = 0
+        self.encoded_tokens = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            fmt=config.get('tool_result_format', DEFAULT_FORMAT),
+            fields=config.get('tool_result_fields'),
+            max_chars=config.get('tool_result_max_chars', DEFAULT_MAX_CHARS),
+            report=config.get('tool_result_report', False)
+        )
+
+    def fields_for(self, tool_name):
+        if tool_name is None:
+            return None
+        # Generated tools carry the target prefix; allow either spelling
+        return self.fields.get(tool_name) or self.fields.get(tool_name.split('___')[-1])
+
+    def encode(self, content, tool_name=None):
+        text, truncated = fit(project(content, self.fields_for(tool_name)), self.format, self.max_chars)
+        baseline = pretty(content)
+        sizes = (len(baseline.encode()), len(text.encode()), estimate_tokens(baseline), estimate_tokens(text))
+        with self._lock:
+            self.calls += 1
+            self.truncated += truncated
+            self.baseline_bytes += sizes[0]
+            self.encoded_bytes += sizes[1]
+            self.baseline_tokens += sizes[2]
+            self.encoded_tokens += sizes[3]
+        if self.report:
+            print(f"\n   📦 {tool_name or 'result'}: {sizes[0]:,} → {sizes[1]:,} bytes, "
+                  f"~{sizes[2]:,} → ~{sizes[3]:,} tokens ({saving(sizes[2], sizes[3])})"
+                  + (" [trimmed]" if truncated else ""))
+        return text
+
+    def stats(self):
+        return {
+            "format": self.format,
+            "calls": self.calls,
+            "truncated": self.truncated,
+            "baseline_bytes": self.baseline_bytes,
+            "encoded_bytes": self.encoded_bytes,
+            "baseline_tokens": self.baseline_tokens,
+            "encoded_tokens": self.encoded_tokens,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"📦 Tool results ({s['format']}): {s['calls']} calls, "
+                f"{s['baseline_bytes']:,} → {s['encoded_bytes']:,} bytes, "
+                f"~{s['baseline_tokens']:,} → ~{s['encoded_tokens']:,} tokens "
+                f"({saving(s['baseline_tokens'], s['encoded_tokens'])}, {s['truncated']} trimmed)")
+
+
+def saving(before, after):
+    return f"{after / before - 1:+.0%}" if before else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tool result encodings on a JSON document")
+    parser.add_argument('path', nargs='?', help="JSON file (default: stdin)")
+    parser.add_argument('--fields', help="comma-separated fields to keep in each record")
+    parser.add_argument('--max-chars', type=int, default=DEFAULT_MAX_CHARS,
+                        help=f"size budget (default: {DEFAULT_MAX_CHARS}, 0 = none)")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path) as f:
+            content = json.load(f)
+    else:
+        content = json.load(sys.stdin)
+    fields = args.fields.split(',') if args.fields else None
+
+    baseline = pretty(content)
+    base_bytes, base_tokens = len(baseline.encode()), estimate_tokens(baseline)
+    print(f"{'format':<16} {'bytes':>8} {'~tokens':>8} {'change':>6}")
+    for fmt in FORMATS:
+        for label, projected in ((fmt, content), (f"{fmt}+fields", project(content, fields))):
+            if projected is content and label != fmt:
+                continue
+            text, truncated = fit(projected, fmt, args.max_chars)
+            tokens = estimate_tokens(text)
+            print(f"{label:<16} {len(text.encode()):>8,} {tokens:>8,} {saving(base_tokens, tokens):>6}"
+                  + ("  (trimmed)" if truncated else ""))
+
+
+if __name__ == '__main__':
+    main()
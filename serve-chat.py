@@ -1,37 +1,349 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server for Pet Store Chat
-Run: python3 serve-chat.py
+HTTP server for the Pet Store Chat pages
+Run: python3 serve-chat.py [--port 8000]
 Access: http://localhost:8000
+
+Each connection gets its own thread, so a slow client no longer blocks
+everyone else. Static files are held in memory with precomputed gzip (and
+brotli, if the ``brotli`` package is installed) variants, revalidated
+against the file's mtime/size, and served with ETag / Last-Modified
+validators: a conditional request that still matches gets a bodyless 304.
+Only web assets are served (never tokens or deployment-config.json).
+
+With a deployment-config.json present the server also hosts the chat
+itself: POST /api/chat runs the Strands agent server-side (see
+chat_service.py) and streams the answer back as Server-Sent Events, so
+every browser tab shares one gateway connection pool and access token.
+The API only answers the server's own pages: no CORS headers, JSON bodies
+only (a form or text/plain POST from another site is refused) and any
+cross-origin Origin header is rejected. The server listens on 127.0.0.1
+unless --host says otherwise.
+
+    POST /api/chat  {"message": "...", "sessionId": "..."}
+    event: token  data: {"text": "..."}
+    event: tool   data: {"name": "...", "status": "running" | "success" | "error", "ms": 123}
+    event: done   data: {"answer": "...", "ttft_ms": 456, "total_ms": 789}
+    event: error  data: {"error": "..."}
 """
 
-import http.server
-import socketserver
+import argparse
+import asyncio
+import email.utils
+import gzip
+import hashlib
+import json
+import mimetypes
 import os
+import posixpath
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from chat_service import ChatService, SessionBusy
 
 PORT = 8000
 DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PAGE = '/web-chat-with-memory.html'
+
+STATIC_EXTENSIONS = {'.html', '.css', '.js', '.png', '.jpg', '.svg', '.ico', '.webp'}
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'image/svg+xml')
+MIN_COMPRESS_BYTES = 512
+# Pages are revalidated on every load (a 304 is cheap); other assets may be reused for an hour
+HTML_CACHE_CONTROL = 'no-cache'
+ASSET_CACHE_CONTROL = 'public, max-age=3600'
+
+MAX_MESSAGE_CHARS = 4000
+MAX_BODY_BYTES = 64 * 1024
+
+
+class StaticFile:
+    """One file's bytes, its compressed variants and validators"""
+
+    def __init__(self, path, stat):
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.stat_key = (stat.st_mtime_ns, stat.st_size)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/'):
+            self.content_type += '; charset=utf-8'
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.mtime = int(stat.st_mtime)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+
+        self.variants = {'identity': (body, f'"{digest}"')}
+        if len(body) >= MIN_COMPRESS_BYTES and self.content_type.startswith(COMPRESSIBLE_TYPES):
+            self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    @property
+    def etags(self):
+        return {etag for _, etag in self.variants.values()}
+
+
+class StaticCache:
+    """In-memory static files, reloaded when the file on disk changes"""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path):
+        """Filesystem path for a URL path, or None if it is not a servable asset"""
+        path = posixpath.normpath(unquote(url_path))
+        parts = [part for part in path.split('/') if part]
+        if not parts or any(part.startswith('.') for part in parts):
+            return None
+        full = os.path.realpath(os.path.join(self.root, *parts))
+        if not full.startswith(self.root + os.sep) or os.path.splitext(full)[1].lower() not in STATIC_EXTENSIONS:
+            return None
+        return full
+
+    def get(self, url_path):
+        full = self.resolve(url_path)
+        if full is None:
+            return None
+        try:
+            stat = os.stat(full)
+        except OSError:
+            return None
+        entry = self._files.get(full)
+        if entry is None or entry.stat_key != (stat.st_mtime_ns, stat.st_size):
+            entry = StaticFile(full, stat)
+            with self._lock:
+                self._files[full] = entry
+        return entry
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts (q > 0)"""
+    accepted = set()
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def not_modified(entry, headers):
+    """Evaluate If-None-Match (preferred) or If-Modified-Since"""
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        tags |= {tag[2:] for tag in tags if tag.startswith('W/')}
+        return bool(tags & entry.etags)
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since is not None and entry.mtime <= since.timestamp()
+    return False
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'      # keep-alive
+    disable_nagle_algorithm = True
+    server_version = 'PetStoreChat/2'
+    static = None                       # StaticCache, set in main()
+    chat = None                         # ChatService, or None when serving pages only
 
-class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory=DIRECTORY, **kwargs)
-    
     def end_headers(self):
-        # Add CORS headers
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        # Static pages may be embedded anywhere; the agent API is same-origin only
+        if not urlsplit(self.path).path.startswith('/api/'):
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         super().end_headers()
 
-if __name__ == '__main__':
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
-        print(f"🚀 Pet Store Chat Server")
-        print(f"=" * 50)
-        print(f"Server running at: http://localhost:{PORT}")
-        print(f"Open: http://localhost:{PORT}/web-chat-with-memory.html")
-        print(f"=" * 50)
-        print(f"Press Ctrl+C to stop")
+    def same_origin(self):
+        """False when the request carries an Origin other than this server's"""
+        origin = self.headers.get('Origin')
+        if origin is None:
+            return True     # not sent by a browser page (curl, scripts)
+        parts = urlsplit(origin)
+        return parts.scheme == 'http' and parts.netloc == self.headers.get('Host')
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.serve_static(head=True)
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/api/health':
+            stats = self.chat.stats() if self.chat is not None else {}
+            return self.send_json(200, {"chat": self.chat is not None, **stats})
+        self.serve_static()
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/api/chat':
+            return self.send_json(404, {"error": "Not found"})
+        if self.chat is None:
+            return self.send_json(503, {"error": "Chat API is disabled (no deployment-config.json)"})
+        if not self.same_origin():
+            return self.send_json(403, {"error": "Cross-origin requests are not allowed"})
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            return self.send_json(415, {"error": "Content-Type must be application/json"})
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY_BYTES:
+                raise ValueError("request body is too large")
+            body = json.loads(self.rfile.read(length) or b'{}')
+            message = body.get('message')
+            session_id = body.get('sessionId') or str(uuid.uuid4())
+            if not isinstance(message, str) or not message.strip():
+                raise ValueError("'message' is required")
+            if len(message) > MAX_MESSAGE_CHARS:
+                raise ValueError(f"'message' is longer than {MAX_MESSAGE_CHARS} characters")
+            if not isinstance(session_id, str) or len(session_id) > 128:
+                raise ValueError("'sessionId' must be a string of at most 128 characters")
+        except (ValueError, AttributeError) as e:
+            return self.send_json(400, {"error": str(e)})
+        self.stream_chat(session_id, message.strip())
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def stream_chat(self, session_id, message):
+        """Run one agent turn and relay it as Server-Sent Events"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('X-Accel-Buffering', 'no')   # no proxy buffering
+        self.send_header('Connection', 'close')       # the stream ends when the connection does
+        self.end_headers()
+        self.close_connection = True
+
+        connected = True
+
+        def emit(event, data):
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+            except OSError:
+                # The tab went away; let the turn finish so the conversation stays consistent
+                connected = False
+
+        emit('start', {"sessionId": session_id})
+        try:
+            emit('done', asyncio.run(self.chat.chat(session_id, message, emit)))
+        except SessionBusy:
+            emit('error', {"error": "A reply for this session is still being generated"})
+        except Exception as e:
+            emit('error', {"error": str(e)})
+
+    def serve_static(self, head=False):
+        path = urlsplit(self.path).path
+        if path == '/':
+            self.send_response(302)
+            self.send_header('Location', DEFAULT_PAGE)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        entry = self.static.get(path)
+        if entry is None:
+            return self.send_error(404, "File not found")
+
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        coding = next((c for c in ('br', 'gzip') if c in entry.variants and c in accepted), 'identity')
+        body, etag = entry.variants[coding]
+        cache_control = HTML_CACHE_CONTROL if entry.content_type.startswith('text/html') else ASSET_CACHE_CONTROL
+
+        fresh = not_modified(entry, self.headers)
+        if fresh:
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', entry.content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if coding != 'identity':
+                self.send_header('Content-Encoding', coding)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Cache-Control', cache_control)
+        if len(entry.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        if not (head or fresh):
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Pet Store chat pages")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="interface to listen on (default: 127.0.0.1; '' for all)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--quiet', action='store_true', help="do not log every request")
+    parser.add_argument('--no-api', action='store_true', help="only serve the pages, no /api/chat")
+    args = parser.parse_args()
+
+    ChatRequestHandler.static = StaticCache(DIRECTORY)
+    if not args.no_api:
         try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("\n\n👋 Server stopped")
+            with open(os.path.join(DIRECTORY, 'deployment-config.json')) as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            print("ℹ️  deployment-config.json not found: serving pages only (no /api/chat)")
+        else:
+            ChatRequestHandler.chat = ChatService.from_config(config)
+    httpd = ThreadingHTTPServer((args.host, args.port), ChatRequestHandler)
+    httpd.daemon_threads = True
+    httpd.verbose = not args.quiet
+
+    print(f"🚀 Pet Store Chat Server")
+    print(f"=" * 50)
+    print(f"Server running at: http://localhost:{args.port}")
+    print(f"Open: http://localhost:{args.port}{DEFAULT_PAGE}")
+    print(f"Compression: gzip{' + brotli' if brotli is not None else ''}")
+    if ChatRequestHandler.chat is not None:
+        print(f"Chat API: POST http://localhost:{args.port}/api/chat (SSE)")
+    print(f"=" * 50)
+    print(f"Press Ctrl+C to stop")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\n👋 Server stopped")
+    finally:
+        httpd.server_close()
+        if ChatRequestHandler.chat is not None:
+            ChatRequestHandler.chat.close()
+
+
+if __name__ == '__main__':
+    main()
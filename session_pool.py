@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of per-session agents for serving many users from one process
+At most ``max_live`` sessions keep a live Agent, in least recently used
+order. Past that, or after ``idle_seconds`` without a turn, a session is
+spilled: its conversation is serialized to zlib-compressed JSON (in
+memory, or one file per session under ``spill_dir`` so it also survives a
+restart) and the Agent is dropped. The session's next message restores the
+conversation into a fresh Agent.
+
+Every session is built by one factory, so all of them share the gateway
+client (connection pool and token manager), the tools and the model client.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DEFAULT_MAX_LIVE = 200
+DEFAULT_IDLE_SECONDS = 15 * 60
+DEFAULT_MAX_SPILLED = 10_000
+
+
+class SessionBusy(Exception):
+    """A reply is already being generated for this session"""
+
+
+def deep_size(value, seen=None):
+    """Approximate bytes held by a JSON-like structure (dicts, lists, strings, numbers)"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+
+class SessionPool:
+    """Live sessions in an LRU; everything else spilled as compressed conversation state
+
+    ``factory(session_id, messages, state)`` builds a session object with an
+    ``agent`` attribute; ``messages``/``state`` are None for a new session.
+    """
+
+    def __init__(self, factory, max_live=DEFAULT_MAX_LIVE, idle_seconds=DEFAULT_IDLE_SECONDS,
+                 spill_dir=None, max_spilled=DEFAULT_MAX_SPILLED):
+        self.factory = factory
+        self.max_live = max_live
+        self.idle_seconds = idle_seconds
+        self.spill_dir = spill_dir
+        self.max_spilled = max_spilled
+        self._live = OrderedDict()          # session id -> session
+        self._busy = set()
+        self._last_used = {}
+        self._spilled = OrderedDict()       # session id -> compressed bytes (spill_dir unset)
+        self._lock = threading.Lock()
+        self.created = self.restored = self.spills = self.dropped = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Serialized state
+    # ------------------------------------------------------------------
+    def _path(self, session_id):
+        return os.path.join(self.spill_dir, hashlib.sha256(session_id.encode()).hexdigest()[:32] + '.json.z')
+
+    @staticmethod
+    def dump(agent):
+        data = {"messages": agent.messages, "state": agent.state.get()}
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode(), 6)
+
+    @staticmethod
+    def load(blob):
+        data = json.loads(zlib.decompress(blob))
+        return data["messages"], data["state"]
+
+    def _store(self, session_id, blob):
+        if not self.spill_dir:
+            self._spilled[session_id] = blob
+            self._spilled.move_to_end(session_id)
+            while len(self._spilled) > self.max_spilled:
+                self._spilled.popitem(last=False)
+                self.dropped += 1
+            return
+        # Write-then-rename so a crash never leaves a truncated conversation
+        fd, tmp = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp, self._path(session_id))
+
+    def _take(self, session_id):
+        """Remove and return a spilled session's bytes, or None"""
+        if not self.spill_dir:
+            return self._spilled.pop(session_id, None)
+        try:
+            with open(self._path(session_id), 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        os.remove(self._path(session_id))
+        return blob
+
+    # ------------------------------------------------------------------
+    # Pool
+    # ------------------------------------------------------------------
+    def _spill(self, session_id):
+        session = self._live.pop(session_id)
+        self._last_used.pop(session_id, None)
+        self._store(session_id, self.dump(session.agent))
+        self.spills += 1
+
+    def _shrink(self, now):
+        """Spill idle sessions and the least recently used ones over ``max_live``"""
+        for session_id in list(self._live):
+            over = len(self._live) > self.max_live
+            idle = now - self._last_used[session_id] > self.idle_seconds
+            if not (over or idle):
+                break               # the rest were used more recently
+            if session_id not in self._busy:
+                self._spill(session_id)
+
+    @contextlib.contextmanager
+    def checkout(self, session_id):
+        """Exclusive use of a session for one turn; raises SessionBusy if it is in use"""
+        with self._lock:
+            if session_id in self._busy:
+                raise SessionBusy(session_id)
+            session = self._live.get(session_id)
+            if session is None:
+                blob = self._take(session_id)
+                if blob is None:
+                    session = self.factory(session_id, None, None)
+                    self.created += 1
+                else:
+                    session = self.factory(session_id, *self.load(blob))
+                    self.restored += 1
+                self._live[session_id] = session
+            self._live.move_to_end(session_id)
+            self._busy.add(session_id)
+            now = time.monotonic()
+            self._last_used[session_id] = now
+            self._shrink(now)
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._busy.discard(session_id)
+                if session_id in self._live:
+                    self._last_used[session_id] = time.monotonic()
+
+    def spill_idle(self):
+        """Spill sessions idle longer than ``idle_seconds`` (also done on every checkout)"""
+        with self._lock:
+            self._shrink(time.monotonic())
+
+    def spill_all(self):
+        """Spill every session that is not in use, e.g. before shutting down with a spill_dir"""
+        with self._lock:
+            for session_id in [s for s in self._live if s not in self._busy]:
+                self._spill(session_id)
+
+    def stats(self):
+        with self._lock:
+            live_bytes = sum(deep_size(s.agent.messages) for s in self._live.values())
+            if self.spill_dir:
+                files = [e for e in os.scandir(self.spill_dir) if e.name.endswith('.json.z')]
+                spilled, spilled_bytes = len(files), sum(e.stat().st_size for e in files)
+            else:
+                spilled, spilled_bytes = len(self._spilled), sum(map(len, self._spilled.values()))
+            return {
+                "live": len(self._live),
+                "busy": len(self._busy),
+                "spilled": spilled,
+                "live_history_bytes": live_bytes,
+                "spilled_bytes": spilled_bytes,
+                "created": self.created,
+                "restored": self.restored,
+                "spills": self.spills,
+                "dropped": self.dropped,
+            }
+
+    def __len__(self):
+        return len(self._live)
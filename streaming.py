@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Token streaming for the interactive REPLs
+Prints text deltas as they arrive, inline tool start/finish markers, and
+time-to-first-token / total time for each turn
+"""
+
+import asyncio
+import sys
+import time
+
+from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+
+
+class TurnStats:
+    """Timings of one streamed turn"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.finished = None
+        self.tool_calls = []  # (name, seconds, status)
+
+    @property
+    def ttft(self):
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self):
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        tools = f" · {len(self.tool_calls)} tool calls" if self.tool_calls else ""
+        return f"⏱️  first token {ttft} · total {self.total:.2f}s{tools}"
+
+
+class TurnStreamer:
+    """Runs agent turns through ``stream_async`` and renders them live
+
+    Create the agent with ``callback_handler=None`` so text is not printed
+    twice. Tool markers come from Before/AfterToolCall hooks, so tools that
+    run concurrently each get their own duration.
+    """
+
+    def __init__(self, agent, out=sys.stdout):
+        self.agent = agent
+        self.out = out
+        self.stats = None
+        self._tool_started = {}
+        self._mid_line = False
+        agent.hooks.add_callback(BeforeToolCallEvent, self._on_tool_start)
+        agent.hooks.add_callback(AfterToolCallEvent, self._on_tool_end)
+
+    def _write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+    def _marker(self, text):
+        self._write(("\n" if self._mid_line else "") + f"   {text}\n")
+        self._mid_line = False
+
+    def _on_tool_start(self, event):
+        tool_use = event.tool_use
+        self._tool_started[tool_use['toolUseId']] = time.perf_counter()
+        self._marker(f"🔧 {tool_use['name']} ...")
+
+    def _on_tool_end(self, event):
+        tool_use = event.tool_use
+        started = self._tool_started.pop(tool_use['toolUseId'], None)
+        seconds = time.perf_counter() - started if started is not None else 0.0
+        status = event.result.get('status', 'success')
+        if self.stats is not None:
+            self.stats.tool_calls.append((tool_use['name'], seconds, status))
+        icon = "✅" if status == 'success' else "❌"
+        self._marker(f"{icon} {tool_use['name']} ({seconds * 1000:.0f} ms)")
+
+    async def stream(self, question):
+        """Stream one turn; returns the AgentResult"""
+        self.stats = TurnStats()
+        self._mid_line = True  # the caller has printed "Assistant: "
+        result = None
+        async for event in self.agent.stream_async(question):
+            if 'data' in event:
+                if self.stats.first_token is None:
+                    self.stats.first_token = time.perf_counter()
+                self._write(event['data'])
+                self._mid_line = True
+            elif 'result' in event:
+                result = event['result']
+        self.stats.finished = time.perf_counter()
+        return result
+
+    def __call__(self, question):
+        """Blocking wrapper for the synchronous REPL loop"""
+        return asyncio.run(self.stream(question))
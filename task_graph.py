@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Dependency-graph task runner for deploy.py and cleanup.py
+Runs independent steps concurrently on a thread pool, replaces fixed
+sleeps with backoff polling, and reports per-step timing with the
+critical path
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 8
+
+_print_lock = threading.Lock()
+
+
+def log(step, message):
+    """Thread-safe progress line tagged with the step name"""
+    with _print_lock:
+        print(f"   [{step}] {message}", flush=True)
+
+
+def backoff_delays(base=1.0, cap=15.0):
+    """Exponential backoff with full jitter: 0-1s, 0-2s, 0-4s ... capped"""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * (2 ** attempt)))
+        attempt += 1
+
+
+def wait_until(check, timeout=300, base=1.0, cap=15.0, description="resource"):
+    """Poll ``check()`` with backoff until it returns a truthy value"""
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays(base, cap):
+        value = check()
+        if value:
+            return value
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+        time.sleep(delay)
+
+
+def retry(fn, retry_if, timeout=120, base=1.0, cap=10.0):
+    """Call ``fn()`` until it stops raising errors that ``retry_if(error)`` accepts
+
+    Used where AWS is eventually consistent, e.g. a new IAM role that
+    Lambda or AgentCore cannot assume yet.
+    """
+    deadline = time.monotonic() + timeout
+    for delay in backoff_delays(base, cap):
+        try:
+            return fn()
+        except Exception as e:
+            if not retry_if(e) or time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+
+
+class TaskFailed(Exception):
+    """One or more graph tasks failed; ``errors`` maps task name to exception"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(", ".join(f"{name}: {error}" for name, error in errors.items()))
+
+
+class TaskGraph:
+    """A set of named tasks with dependencies
+
+    Each task function receives the shared ``results`` dict (outputs of
+    tasks that already finished) and may return a dict to merge into it.
+    A task starts as soon as all of its dependencies have succeeded; if a
+    task fails, everything that depends on it is skipped.
+    """
+
+    def __init__(self):
+        self.tasks = {}      # name -> (fn, deps)
+        self.timings = {}    # name -> (start, end) relative to run start
+        self.skipped = []
+        self.results = {}
+        self.wall_seconds = 0.0
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Task {name} depends on unknown task {dep}")
+        self.tasks[name] = (fn, tuple(deps))
+
+    def run(self, max_workers=DEFAULT_MAX_WORKERS, results=None):
+        self.results = results if results is not None else {}
+        self.timings = {}
+        self.skipped = []
+        errors = {}
+        done = set()
+        running = {}
+        pending = dict(self.tasks)
+        started_at = time.perf_counter()
+
+        def timed(name, fn):
+            start = time.perf_counter() - started_at
+            try:
+                return fn(self.results)
+            finally:
+                self.timings[name] = (start, time.perf_counter() - started_at)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for name, (fn, deps) in list(pending.items()):
+                    if any(dep in errors or dep in self.skipped for dep in deps):
+                        self.skipped.append(name)
+                        del pending[name]
+                    elif all(dep in done for dep in deps):
+                        running[pool.submit(timed, name, fn)] = name
+                        del pending[name]
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        errors[name] = e
+                        log(name, f"❌ {e}")
+                        continue
+                    if output:
+                        self.results.update(output)
+                    done.add(name)
+
+        self.wall_seconds = time.perf_counter() - started_at
+        if errors:
+            raise TaskFailed(errors)
+        return self.results
+
+    def critical_path(self):
+        """Chain of tasks that determined the total run time"""
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda n: self.timings[n][1])
+        path = [name]
+        while True:
+            deps = [dep for dep in self.tasks[name][1] if dep in self.timings]
+            if not deps:
+                break
+            name = max(deps, key=lambda n: self.timings[n][1])
+            path.append(name)
+        return list(reversed(path))
+
+    def report(self, title="Timing"):
+        width = max((len(name) for name in self.timings), default=10)
+        print(f"\n⏱️  {title}")
+        for name, (start, end) in sorted(self.timings.items(), key=lambda item: item[1][0]):
+            print(f"   {name:<{width}}  {start:6.1f}s → {end:6.1f}s  ({end - start:5.1f}s)")
+        for name in self.skipped:
+            print(f"   {name:<{width}}  skipped (dependency failed)")
+        path = self.critical_path()
+        if path:
+            print(f"   Critical path: {' → '.join(path)} ({self.timings[path[-1]][1]:.1f}s)")
+        sequential = sum(end - start for start, end in self.timings.values())
+        print(f"   Wall clock {self.wall_seconds:.1f}s vs {sequential:.1f}s if run one step at a time")
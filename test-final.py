@@ -3,40 +3,32 @@
 ✅ COMPLETE WORKING DEMO: AgentCore Gateway + API Gateway Integration
 """
 
-import httpx
+import argparse
 import json
 
-# Load config
-with open('deployment-config.json') as f:
-    config = json.load(f)
+from gateway_client import GatewayClient, tool_content
 
-# Load ACCESS token
-with open('access-token.txt') as f:
-    access_token = f.read().strip()
+parser = argparse.ArgumentParser(description="MCP protocol test")
+parser.add_argument('--local', action='store_true', help="run against the local gateway emulator (no AWS)")
+args = parser.parse_args()
 
 print("=" * 80)
 print("✅ AgentCore Gateway + API Gateway Integration - COMPLETE DEMO")
 print("=" * 80)
 
-# Create MCP client
-client = httpx.Client(
-    base_url=config['gateway_url'],
-    headers={
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    },
-    timeout=30.0
-)
+if args.local:
+    from gateway_emulator import GatewayEmulator
+    emulator = GatewayEmulator(token='local')
+    client = GatewayClient(emulator.start(), access_token='local')
+else:
+    with open('deployment-config.json') as f:
+        config = json.load(f)
+    # Create MCP client (reads the ACCESS token from access-token.txt)
+    client = GatewayClient.from_config(config)
 
 # Test 1: List tools
 print("\n[TEST 1] Listing available tools via MCP protocol...")
-response = client.post("", json={
-    "jsonrpc": "2.0",
-    "id": 1,
-    "method": "tools/list"
-})
-
-result = response.json()
+result = client.list_tools_sync()
 tools = result['result']['tools']
 print(f"   ✅ SUCCESS! Found {len(tools)} tools:")
 for tool in tools:
@@ -46,45 +38,42 @@ for tool in tools:
 
 # Test 2: Call ListPets tool
 print("\n[TEST 2] Calling PetStoreTarget___ListPets tool...")
-response = client.post("", json={
-    "jsonrpc": "2.0",
-    "id": 2,
-    "method": "tools/call",
-    "params": {
-        "name": "PetStoreTarget___ListPets",
-        "arguments": {}
-    }
-})
-
-result = response.json()
+result = client.call_tool_sync("PetStoreTarget___ListPets", {})
 if 'result' in result:
     print(f"   ✅ SUCCESS!")
-    content = json.loads(result['result']['content'][0]['text'])
+    content = tool_content(result)
     print(f"   Pets returned: {json.dumps(content, indent=2)}")
 else:
     print(f"   ❌ Error: {result}")
 
 # Test 3: Call GetPetById tool
 print("\n[TEST 3] Calling PetStoreTarget___GetPetById tool (petId=2)...")
-response = client.post("", json={
-    "jsonrpc": "2.0",
-    "id": 3,
-    "method": "tools/call",
-    "params": {
-        "name": "PetStoreTarget___GetPetById",
-        "arguments": {"petId": "2"}
-    }
-})
-
-result = response.json()
+result = client.call_tool_sync("PetStoreTarget___GetPetById", {"petId": "2"})
 if 'result' in result:
     print(f"   ✅ SUCCESS!")
-    content = json.loads(result['result']['content'][0]['text'])
+    content = tool_content(result)
     print(f"   Pet details: {json.dumps(content, indent=2)}")
 else:
     print(f"   ❌ Error: {result}")
 
+# Test 4: Tool selection keeps ListPets for plain list questions
+print("\n[TEST 4] Checking per-turn tool selection (tool_selection.py)...")
+from tool_selection import DEFAULT_ALWAYS, DEFAULT_TOP_K, SEARCH_TOOL, LexicalToolIndex, choose
+schemas = [tool for tool in tools if tool['name'] != SEARCH_TOOL]
+index = LexicalToolIndex(schemas)
+names = [tool['name'] for tool in schemas]
+for question in ["What pets do you have?", "I want a new puppy, what's available?", "list all pets",
+                 "What cats do you have under $100?"]:
+    selected = choose([name for name, _ in index.search(question, DEFAULT_TOP_K)], names, DEFAULT_ALWAYS)
+    short = ', '.join(sorted(name.split('___')[-1] for name in selected))
+    if "PetStoreTarget___ListPets" in selected:
+        print(f"   ✅ {question!r} → {short}")
+    else:
+        print(f"   ❌ {question!r} → {short} (ListPets missing)")
+
 client.close()
+if args.local:
+    emulator.stop()
 
 print("\n" + "=" * 80)
 print("✅ COMPLETE SUCCESS!")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Cognito ACCESS token manager
+Caches the token with its decoded expiry, refreshes it in the background
+before it expires, and shares one refresh between concurrent callers
+
+Log in once (writes access-token.txt and refresh-token.txt):
+    python3 token_manager.py login
+"""
+
+import base64
+import getpass
+import json
+import os
+import sys
+import threading
+import time
+
+import boto3
+
+DEFAULT_REFRESH_MARGIN = 300   # refresh this many seconds before expiry
+EXPIRY_SKEW = 30               # treat the token as expired slightly early
+RETRY_SECONDS = 30             # background retry after a failed refresh
+MIN_REFRESH_DELAY = 10         # never schedule background refreshes closer together
+
+
+def token_claim(token, claim):
+    """Return a numeric claim (``exp``, ``iat``) of a JWT, or None if it cannot be decoded"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))[claim])
+    except (IndexError, KeyError, ValueError, TypeError):
+        return None
+
+
+def token_expiry(token):
+    """Return the ``exp`` claim of a JWT, or None if it cannot be decoded"""
+    return token_claim(token, 'exp')
+
+
+class TokenManager:
+    """Keeps a valid Cognito ACCESS token in memory
+
+    ``get_token()`` is a lock-protected read on the hot path. A refresh
+    goes through REFRESH_TOKEN_AUTH (or USER_PASSWORD_AUTH when only
+    credentials are available); a single lock makes concurrent callers
+    wait for one shared refresh instead of each hitting Cognito.
+    """
+
+    def __init__(self, client_id, region, access_token=None, refresh_token=None,
+                 username=None, password=None, refresh_margin=DEFAULT_REFRESH_MARGIN,
+                 cognito=None, token_path=None):
+        self.client_id = client_id
+        self.refresh_margin = refresh_margin
+        self.token_path = token_path
+        self._cognito = cognito or boto3.client('cognito-idp', region_name=region)
+        self._refresh_token = refresh_token
+        self._username = username
+        self._password = password
+
+        self._access_token = access_token
+        self._expires_at = token_expiry(access_token) if access_token else None
+        self._issued_at = token_claim(access_token, 'iat') if access_token else None
+        self._lock = threading.Lock()
+        self._timer = None
+        self.refreshes = 0
+
+    @classmethod
+    def from_config(cls, config, token_path='access-token.txt', refresh_token_path='refresh-token.txt'):
+        """Build a manager from deployment-config.json and the saved token files
+
+        COGNITO_USERNAME / COGNITO_PASSWORD are used as a fallback when
+        there is no refresh token.
+        """
+        access_token = _read_optional(token_path)
+        refresh_token = _read_optional(refresh_token_path)
+        return cls(
+            config['client_id'],
+            config.get('region', 'us-east-1'),
+            access_token=access_token,
+            refresh_token=refresh_token,
+            username=os.environ.get('COGNITO_USERNAME'),
+            password=os.environ.get('COGNITO_PASSWORD'),
+            refresh_margin=config.get('token_refresh_margin_seconds', DEFAULT_REFRESH_MARGIN),
+            token_path=token_path
+        )
+
+    # ------------------------------------------------------------------
+    # Token access
+    # ------------------------------------------------------------------
+    def current(self):
+        """The cached token if it is still valid, else None (never blocks on Cognito)"""
+        token, expires_at = self._access_token, self._expires_at
+        if token is None:
+            return None
+        if expires_at is not None and expires_at - EXPIRY_SKEW <= time.time():
+            return None
+        return token
+
+    def get_token(self):
+        """Return a valid token, refreshing first if needed"""
+        token = self.current()
+        if token is not None:
+            return token
+        with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            token = self.current()
+            if token is None:
+                token = self._refresh()
+            return token
+
+    def force_refresh(self, stale_token):
+        """Refresh after the gateway rejected ``stale_token`` (e.g. HTTP 401)"""
+        with self._lock:
+            if self._access_token != stale_token and self.current() is not None:
+                return self._access_token
+            return self._refresh()
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+    def _refresh(self):
+        """Fetch a new token from Cognito; caller must hold ``_lock``"""
+        if self._refresh_token:
+            result = self._cognito.initiate_auth(
+                AuthFlow='REFRESH_TOKEN_AUTH',
+                ClientId=self.client_id,
+                AuthParameters={'REFRESH_TOKEN': self._refresh_token}
+            )['AuthenticationResult']
+        elif self._username and self._password:
+            result = self._cognito.initiate_auth(
+                AuthFlow='USER_PASSWORD_AUTH',
+                ClientId=self.client_id,
+                AuthParameters={'USERNAME': self._username, 'PASSWORD': self._password}
+            )['AuthenticationResult']
+        else:
+            raise RuntimeError(
+                "ACCESS token expired and no refresh token is available - "
+                "run: python3 token_manager.py login"
+            )
+
+        self._access_token = result['AccessToken']
+        self._expires_at = token_expiry(self._access_token) or time.time() + result.get('ExpiresIn', 3600)
+        self._issued_at = token_claim(self._access_token, 'iat') or time.time()
+        if result.get('RefreshToken'):
+            self._refresh_token = result['RefreshToken']
+        self.refreshes += 1
+
+        if self.token_path:
+            _write_private(self.token_path, self._access_token)
+        if self._timer is not None:
+            self._schedule(self._refresh_delay())
+        return self._access_token
+
+    def _refresh_delay(self):
+        """Seconds until the next background refresh
+
+        ``refresh_margin`` before expiry, but at most half the token's
+        lifetime (Cognito allows 5-minute tokens, shorter than the default
+        margin) and never sooner than MIN_REFRESH_DELAY, so short-lived
+        tokens cannot turn the timer into a tight initiate_auth loop.
+        """
+        now = time.time()
+        lifetime = self._expires_at - (self._issued_at or now)
+        margin = min(self.refresh_margin, lifetime / 2)
+        return max(self._expires_at - margin - now, MIN_REFRESH_DELAY)
+
+    def start(self):
+        """Refresh in the background ``refresh_margin`` seconds before expiry"""
+        if self._access_token is None:
+            self._schedule(0)
+        elif self._expires_at is not None:
+            self._schedule(self._refresh_delay())
+        # An opaque token without ``exp`` is only refreshed after a 401
+        return self
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 0), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._refresh()
+        except Exception as e:
+            print(f"\n⚠️  Token refresh failed: {e}")
+            self._schedule(RETRY_SECONDS)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def _read_optional(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_private(path, text):
+    """Write a token file readable only by the current user"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(path, 0o600)  # the mode above only applies to newly created files
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+
+
+def login(config):
+    """USER_PASSWORD_AUTH once and save both tokens for later runs"""
+    username = os.environ.get('COGNITO_USERNAME') or input("Username: ")
+    password = os.environ.get('COGNITO_PASSWORD') or getpass.getpass("Password: ")
+    cognito = boto3.client('cognito-idp', region_name=config.get('region', 'us-east-1'))
+    result = cognito.initiate_auth(
+        AuthFlow='USER_PASSWORD_AUTH',
+        ClientId=config['client_id'],
+        AuthParameters={'USERNAME': username, 'PASSWORD': password}
+    )['AuthenticationResult']
+
+    _write_private('access-token.txt', result['AccessToken'])
+    _write_private('refresh-token.txt', result['RefreshToken'])
+    print("✅ Saved access-token.txt and refresh-token.txt")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['login']:
+        print("Usage: python3 token_manager.py login")
+        sys.exit(1)
+    with open('deployment-config.json') as f:
+        login(json.load(f))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tool-result cache for read-only gateway tools
+TTL per tool, bounded LRU, and invalidation when a mutating tool runs
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+# Read-only Pet Store tools and how long (seconds) their results stay fresh.
+# Any tool NOT listed here is treated as mutating.
+DEFAULT_TTLS = {
+    "PetStoreTarget___ListPets": 30,
+    "PetStoreTarget___GetPetById": 60,
+}
+DEFAULT_MAX_ENTRIES = 256
+
+
+def target_of(tool_name):
+    """Gateway target prefix of a tool name (PetStoreTarget___ListPets -> PetStoreTarget)"""
+    return tool_name.split('___', 1)[0]
+
+
+def cache_key(tool_name, arguments):
+    """Canonical key: tool name + arguments with sorted keys and no whitespace"""
+    return tool_name + json.dumps(arguments or {}, sort_keys=True, separators=(',', ':'))
+
+
+class ToolResultCache:
+    """Caches successful tools/call responses
+
+    Only tools with a TTL are cached. Calling any other tool counts as a
+    write and drops every cached entry for the same gateway target, so an
+    ``add_pet`` is immediately visible to the next ``list_pets``. Each
+    write also bumps the target's generation: a read that was sent before
+    a write finished (tool calls run concurrently) passes the generation
+    it saw to ``put`` and is not cached, since it may predate the write.
+    """
+
+    def __init__(self, ttls=None, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (tool_name, expires_at, result, fetch_seconds)
+        self._generations = defaultdict(int)    # target -> number of writes seen
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def is_cacheable(self, tool_name):
+        return self.ttls.get(tool_name, 0) > 0
+
+    def get(self, tool_name, arguments):
+        """Return the cached response, or None on a miss"""
+        if not self.is_cacheable(tool_name):
+            return None
+        key = cache_key(tool_name, arguments)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[3]
+            return entry[2]
+
+    def generation(self, tool_name):
+        """Write counter of the tool's target; read it before sending a request, pass it to ``put``"""
+        with self._lock:
+            return self._generations[target_of(tool_name)]
+
+    def put(self, tool_name, arguments, result, fetch_seconds=0.0, generation=None):
+        """Store a successful response; errors, and reads overtaken by a write, are never cached"""
+        if not self.is_cacheable(tool_name) or 'result' not in result or result['result'].get('isError'):
+            return
+        key = cache_key(tool_name, arguments)
+        with self._lock:
+            if generation is not None and generation != self._generations[target_of(tool_name)]:
+                return
+            self._entries[key] = (tool_name, self._clock() + self.ttls[tool_name], result, fetch_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_call(self, tool_name):
+        """Invalidate entries affected by a call to ``tool_name`` if it mutates state"""
+        if self.is_cacheable(tool_name):
+            return
+        target = target_of(tool_name)
+        with self._lock:
+            self._generations[target] += 1
+            stale = [key for key, entry in self._entries.items() if target_of(entry[0]) == target]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"📊 Tool cache: {s['hits']} hits / {s['misses']} misses "
+                f"({s['hit_rate']:.0%} hit rate, ~{s['saved_seconds']:.2f}s of gateway time saved)")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Per-turn tool selection: expose only the tools a question needs
+Every tool schema registered with the agent is sent with every model call.
+ToolSelector ranks the gateway's tools against the user's message before
+each turn and leaves only the top ``k`` in the agent's registry:
+
+  - ``lexical``: a BM25 index over the cached tools/list names,
+    descriptions and parameters (no embeddings, no network);
+  - ``semantic``: the gateway's built-in search tool
+    (``x_amz_bedrock_agentcore_search``, enabled by ``searchType: SEMANTIC``
+    in deploy.py), falling back to the lexical index if the call fails.
+
+Words found in every tool ("pet") cannot tell tools apart and are
+ignored; a message with no other matching word gets every tool. ListPets,
+the general way to browse, is always exposed (``tool_selection_always``),
+and tools called in the previous turn stay exposed so follow-up questions
+keep working. The schema tokens left out are counted per turn.
+
+    python3 tool_selection.py "what cats do you have under $100?"
+"""
+
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+
+from strands.hooks import AfterToolCallEvent, BeforeInvocationEvent
+
+from petstore_tools import LIST_PETS
+from result_encoding import estimate_tokens
+
+SEARCH_TOOL = 'x_amz_bedrock_agentcore_search'
+MODES = ('off', 'lexical', 'semantic')
+DEFAULT_MODE = 'lexical'
+DEFAULT_TOP_K = 3
+DEFAULT_ALWAYS = (LIST_PETS,)
+NAME_WEIGHT = 3             # name tokens count this many times in a tool's document
+STOPWORDS = {
+    'a', 'an', 'and', 'any', 'are', 'by', 'can', 'do', 'for', 'from', 'get', 'have', 'how', 'i', 'in',
+    'is', 'it', 'me', 'my', 'of', 'on', 'or', 'please', 'show', 'tell', 'the', 'this', 'to', 'what',
+    'which', 'with', 'you', 'your',
+}
+
+
+def tokens(text):
+    """Lowercased words with camelCase split and a naive plural strip"""
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text or '')
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    return [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w
+            for w in words if w not in STOPWORDS]
+
+
+def tool_document(schema):
+    """Searchable words of one tools/list entry"""
+    name = schema['name'].split('___')[-1]
+    parts = [schema.get('description') or '']
+    for param, spec in ((schema.get('inputSchema') or {}).get('properties') or {}).items():
+        parts += [param, spec.get('description') or '']
+    return tokens(name) * NAME_WEIGHT + tokens(' '.join(parts))
+
+
+def schema_tokens(tool):
+    return estimate_tokens(json.dumps(tool.tool_spec, separators=(',', ':')))
+
+
+class LexicalToolIndex:
+    """Okapi BM25 over tool documents"""
+
+    def __init__(self, schemas, k1=1.2, b=0.75):
+        self.k1, self.b = k1, b
+        self.names = [schema['name'] for schema in schemas]
+        self.docs = [Counter(tool_document(schema)) for schema in schemas]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        frequency = Counter(term for doc in self.docs for term in doc)
+        n = len(self.docs)
+        # A term in every document says nothing about which tool fits
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+                    for term, df in frequency.items() if df < n or n == 1}
+
+    def search(self, query, k=DEFAULT_TOP_K):
+        """[(name, score)] of the best ``k`` tools with a positive score"""
+        terms = [term for term in set(tokens(query)) if term in self.idf]
+        scored = []
+        for name, doc, length in zip(self.names, self.docs, self.lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc[term]
+                if tf:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / self.avg_length)
+                    score += self.idf[term] * tf * (self.k1 + 1) / norm
+            if score > 0:
+                scored.append((name, score))
+        scored.sort(key=lambda item: -item[1])
+        return scored[:k]
+
+
+def search_results(result):
+    """Tool names from a gateway search tools/call response; ValueError if the search failed"""
+    body = result.get('result')
+    if body is None or body.get('isError'):
+        raise ValueError(f"tool search failed: {result.get('error') or body}")
+    found = (body.get('structuredContent') or {}).get('tools')
+    if found is None:
+        text = ''.join(part.get('text', '') for part in body.get('content', []))
+        found = json.loads(text).get('tools', []) if text else []
+    return [tool['name'] for tool in found]
+
+
+def choose(ranked, names, always=(), last_used=()):
+    """Tools to expose: every one when nothing was ranked, else the ranked, ``always`` and last-used ones"""
+    if not ranked:
+        return set(names)
+    return (set(ranked) | set(always) | set(last_used)) & set(names)
+
+
+class ToolSelector:
+    """Before each turn, narrows the agent's registry to the relevant tools
+
+    ``catalog()`` returns the full current tool list (e.g. the
+    GatewayToolset's tools plus hand-written ones); tools in ``always`` are
+    exposed on every turn.
+    """
+
+    def __init__(self, catalog, mcp_client=None, mode=DEFAULT_MODE, k=DEFAULT_TOP_K, always=()):
+        if mode not in MODES:
+            raise ValueError(f"tool selection mode must be one of {', '.join(MODES)}")
+        self.catalog = catalog
+        self.mcp_client = mcp_client
+        self.mode = mode
+        self.k = k
+        self.always = set(always)
+        self._index = None
+        self._index_key = None
+        self._sizes = {}
+        self._last_used = set()
+        self._this_turn = set()
+        self.turns = 0
+        self.exposed = 0
+        self.offered = 0
+        self.tokens_saved = 0
+        self.fallbacks = 0
+        self.last = None        # (exposed names, total tools, tokens saved) of the latest turn
+
+    @classmethod
+    def from_config(cls, catalog, mcp_client, config, always=None):
+        if always is None:
+            always = config.get('tool_selection_always', DEFAULT_ALWAYS)
+        return cls(
+            catalog,
+            mcp_client,
+            mode=config.get('tool_selection', DEFAULT_MODE),
+            k=config.get('tool_selection_top_k', DEFAULT_TOP_K),
+            always=always
+        )
+
+    def attach(self, agent):
+        if self.mode != 'off':
+            agent.hooks.add_callback(BeforeInvocationEvent, self._before_turn)
+            agent.hooks.add_callback(AfterToolCallEvent, self._on_tool_call)
+        return self
+
+    # ------------------------------------------------------------------
+    def _tools(self):
+        return {tool.tool_name: tool for tool in self.catalog() if tool.tool_name != SEARCH_TOOL}
+
+    def index(self, tools):
+        key = tuple(sorted((name, id(tool)) for name, tool in tools.items()))
+        if key != self._index_key:
+            schemas = [{"name": name, "description": tool.tool_spec.get('description'),
+                        "inputSchema": tool.tool_spec['inputSchema'].get('json')} for name, tool in tools.items()]
+            self._index = LexicalToolIndex(schemas)
+            self._index_key = key
+            self._sizes = {name: schema_tokens(tool) for name, tool in tools.items()}
+        return self._index
+
+    async def _semantic(self, query, tools):
+        result = await self.mcp_client.call_tool(SEARCH_TOOL, {"query": query})
+        return [name for name in search_results(result) if name in tools][:self.k]
+
+    async def select(self, query):
+        """Names of the tools to expose for ``query``"""
+        tools = self._tools()
+        index = self.index(tools)
+        ranked = None
+        if self.mode == 'semantic' and self.mcp_client is not None:
+            try:
+                ranked = await self._semantic(query, tools)
+            except Exception:
+                self.fallbacks += 1
+        if not ranked:
+            ranked = [name for name, _ in index.search(query, self.k)]
+        return choose(ranked, tools, self.always, self._last_used)
+
+    # ------------------------------------------------------------------
+    async def _before_turn(self, event):
+        query = ' '.join(block['text'] for message in event.messages or [] if message['role'] == 'user'
+                         for block in message['content'] if 'text' in block)
+        if not query:
+            return
+        self._last_used, self._this_turn = self._this_turn, set()
+        tools = self._tools()
+        selected = await self.select(query)
+        registry = event.agent.tool_registry
+        for name, tool in tools.items():
+            if name in selected:
+                registry.registry[name] = tool
+            else:
+                registry.registry.pop(name, None)
+                registry.dynamic_tools.pop(name, None)
+
+        saved = sum(self._sizes.get(name, 0) for name in tools if name not in selected)
+        self.turns += 1
+        self.exposed += len(selected)
+        self.offered += len(tools)
+        self.tokens_saved += saved
+        self.last = (sorted(selected), len(tools), saved)
+
+    def _on_tool_call(self, event):
+        self._this_turn.add(event.tool_use['name'])
+
+    def format_turn(self):
+        if self.last is None:
+            return "🧰 Tools: all exposed"
+        names, total, saved = self.last
+        short = ', '.join(name.split('___')[-1] for name in names)
+        return f"🧰 Tools: {len(names)}/{total} exposed ({short}) · ~{saved} schema tokens saved"
+
+    def format_stats(self):
+        if not self.turns:
+            return f"🧰 Tool selection ({self.mode}): no turns"
+        fallback = f", {self.fallbacks} search fallbacks" if self.fallbacks else ""
+        return (f"🧰 Tool selection ({self.mode}): {self.exposed / self.turns:.1f} of "
+                f"{self.offered / self.turns:.1f} tools per turn, ~{self.tokens_saved} schema tokens "
+                f"saved over {self.turns} turns (~{self.tokens_saved // self.turns}/turn{fallback})")
+
+
+def main():
+    """Rank the cached tools/list schemas for a question"""
+    import glob
+    from gateway_tools import DEFAULT_CACHE_DIR
+
+    if len(sys.argv) < 2:
+        print(__doc__.strip().split('\n')[-1])
+        return 1
+    caches = glob.glob(f"{DEFAULT_CACHE_DIR}/tools-*.json")
+    if not caches:
+        print(f"❌ No cached tools/list in {DEFAULT_CACHE_DIR}/ (run a chat script once)")
+        return 1
+    with open(max(caches, key=os.path.getmtime)) as f:
+        schemas = [s for s in json.load(f)['tools'] if s['name'] != SEARCH_TOOL]
+    query = ' '.join(sys.argv[1:])
+    print(f"🔎 {query}")
+    for name, score in LexicalToolIndex(schemas).search(query, k=len(schemas)):
+        print(f"   {score:6.2f}  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Per-stage tracing for chat turns
+Spans are OpenTelemetry spans, so the ones Strands already emits (agent,
+event loop cycle, model call, tool execution) nest with ours (gateway
+tools/call, result decode/encode, memory writes). Tracing is off unless
+``enable()`` is called: ``span()`` then returns a shared no-op context
+and nothing is recorded.
+
+With ``enable()`` every finished span is appended to a JSONL file (one
+OTLP-style JSON object per line) and ``turn()`` prints a waterfall of the
+turn it wraps.
+"""
+
+import contextlib
+import json
+import sys
+import threading
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+TRACER_NAME = "petstore-chat"
+DEFAULT_TRACE_PATH = 'chat-traces.jsonl'
+WATERFALL_WIDTH = 40
+NAME_WIDTH = 38
+
+_enabled = False
+_collector = None
+_provider = None
+_NOOP = contextlib.nullcontext(trace.INVALID_SPAN)
+
+
+def span(name, **attributes):
+    """Context manager timing one stage; a shared no-op unless tracing is enabled"""
+    if not _enabled:
+        return _NOOP
+    return trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=attributes)
+
+
+@contextlib.contextmanager
+def turn(name="chat.turn", out=sys.stdout, **attributes):
+    """Root span for one chat turn; prints its waterfall when tracing is enabled"""
+    if not _enabled:
+        yield trace.INVALID_SPAN
+        return
+    with trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=attributes) as root:
+        _collector.watch(root.get_span_context().trace_id)
+        yield root
+    spans = _collector.pop(root.get_span_context().trace_id)
+    out.write(waterfall(spans) + "\n")
+    out.flush()
+
+
+class TurnCollector(SpanProcessor):
+    """Keeps the finished spans of watched traces until the turn is printed
+
+    Spans of other traces (e.g. background memory writes) only go to the
+    JSONL file.
+    """
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def watch(self, trace_id):
+        with self._lock:
+            self._spans.setdefault(trace_id, [])
+
+    def on_end(self, span):
+        with self._lock:
+            if span.context.trace_id in self._spans:
+                self._spans[span.context.trace_id].append(span)
+
+    def pop(self, trace_id):
+        with self._lock:
+            return self._spans.pop(trace_id, [])
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends each span as one line of OpenTelemetry JSON"""
+
+    def __init__(self, path=DEFAULT_TRACE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(json.loads(span.to_json()), separators=(',', ':')) + "\n" for span in spans)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+
+def enable(path=DEFAULT_TRACE_PATH):
+    """Install an SDK tracer provider that feeds the waterfall and the JSONL file"""
+    global _enabled, _collector, _provider
+    _collector = TurnCollector()
+    _provider = TracerProvider(resource=Resource.create({"service.name": TRACER_NAME}))
+    _provider.add_span_processor(_collector)
+    # Batched so file writes stay off the traced code path
+    _provider.add_span_processor(BatchSpanProcessor(JsonlSpanExporter(path)))
+    trace.set_tracer_provider(_provider)
+    _enabled = True
+
+
+def shutdown():
+    """Flush pending spans to the trace file"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def waterfall(spans):
+    """Render one trace as an indented timeline, parents before children"""
+    if not spans:
+        return "🧭 (no spans recorded)"
+    by_parent = {}
+    ids = {s.context.span_id for s in spans}
+    for s in spans:
+        parent = s.parent.span_id if s.parent is not None and s.parent.span_id in ids else None
+        by_parent.setdefault(parent, []).append(s)
+    start = min(s.start_time for s in spans)
+    total = max(max(s.end_time for s in spans) - start, 1)
+
+    lines = [f"🧭 Turn waterfall ({total / 1e9:.2f}s, {len(spans)} spans)"]
+
+    def walk(parent, depth):
+        for s in sorted(by_parent.get(parent, []), key=lambda s: s.start_time):
+            offset = int((s.start_time - start) / total * WATERFALL_WIDTH)
+            width = max(1, int((s.end_time - s.start_time) / total * WATERFALL_WIDTH))
+            label = ("  " * depth + s.name)[:NAME_WIDTH]
+            bar = " " * offset + "█" * width
+            millis = (s.end_time - s.start_time) / 1e6
+            lines.append(f"   {label:<{NAME_WIDTH}} {bar:<{WATERFALL_WIDTH}} {millis:>8.1f} ms")
+            walk(s.context.span_id, depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)